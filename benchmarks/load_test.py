@@ -0,0 +1,437 @@
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import Any
+
+import click
+import httpx
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from benchmarks.reporting import build_report
+from benchmarks.reporting import summarize_latencies
+from benchmarks.reporting import write_report
+from benchmarks.synthetic import financial_statement_html
+from benchmarks.synthetic import PROFIT_AND_LOSS_STATEMENT
+from benchmarks.synthetic import reference_csv
+
+SCENARIOS = ("upload", "list", "analyze", "evaluate")
+QUARTERS = ("Q1", "Q2", "Q3", "Q4")
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT_SECONDS = 60.0
+STOP_TIMEOUT_SECONDS = 15.0
+SEED_CONCURRENCY = 4
+
+Send = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def _start_process(args: list[str], env: dict[str, str], log_file: Any) -> subprocess.Popen:
+    return subprocess.Popen(args, cwd=ROOT_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def _stop_process(process: subprocess.Popen | None) -> None:
+    if process is None or process.poll() is not None:
+        return
+
+    # sanic shuts down gracefully on SIGTERM
+    process.terminate()
+    try:
+        process.wait(timeout=STOP_TIMEOUT_SECONDS)
+
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _check_mongo(mongo_uri: str) -> None:
+    try:
+        with MongoClient(mongo_uri, serverSelectionTimeoutMS=5000) as client:
+            client.admin.command("ping")
+
+    except PyMongoError as e:
+        raise click.ClickException(f"Could not reach the mongodb at {mongo_uri}: {e}") from e
+
+
+def _drop_database(mongo_uri: str, mongo_db: str) -> None:
+    try:
+        with MongoClient(mongo_uri, serverSelectionTimeoutMS=5000) as client:
+            client.drop_database(mongo_db)
+
+    except PyMongoError as e:
+        click.echo(f"⚠️ Could not drop the benchmark database {mongo_db}: {e}", err=True)
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, log_path: str) -> None:
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException(f"The server behind {url} exited early, see {log_path}")
+
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+
+        except httpx.HTTPError:
+            pass
+
+        time.sleep(0.25)
+
+    raise click.ClickException(f"The server behind {url} did not start in time, see {log_path}")
+
+
+async def _measure(
+    client: httpx.AsyncClient,
+    send: Send,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict[str, Any]:
+    """Sends the requests of a scenario from a fixed number of concurrent workers, after an unmeasured warmup.
+
+    Args:
+        client (httpx.AsyncClient): client of the benchmarked server
+        send (Send): sends the request of a given index
+        requests (int): number of measured requests
+        concurrency (int): number of requests in flight at a time
+        warmup (int): number of requests sent before measuring
+
+    Returns:
+        dict[str, Any]: throughput, latencies of the successful requests and response statuses
+    """
+
+    indexes = itertools.count()
+    for _ in range(warmup):
+        await send(client, next(indexes))
+
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        # workers pull from a shared iterator until
+        # all the requests of the scenario are sent
+        for _ in remaining:
+            index = next(indexes)
+            started_at = time.perf_counter()
+            try:
+                result = await send(client, index)
+                statuses[str(result.status_code)] += 1
+                if result.is_success:
+                    latencies.append(time.perf_counter() - started_at)
+
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started_at
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "successful": len(latencies),
+        "error_rate": round(1 - len(latencies) / requests, 4) if requests else 0.0,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 3) if duration else 0.0,
+        "latency_ms": summarize_latencies(latencies),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def _upload(file_name: str, body: bytes) -> Send:
+    async def send(client: httpx.AsyncClient, _index: int) -> httpx.Response:
+        return await client.post("/api/v1/sources/", files={"attachments": (file_name, body, "text/html")})
+
+    return send
+
+
+def _scenario(name: str, documents: list[str], note_paragraphs: int, seed: int) -> Send:
+    run_id = uuid.uuid4().hex[:8]
+
+    async def upload(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        # every upload is a distinct document, so that
+        # none of them skips conversion as a duplicate
+        file_name = f"upload-{run_id}-{index}.html"
+        body = financial_statement_html(file_name, note_paragraphs=note_paragraphs, seed=seed)
+        return await _upload(file_name, body)(client, index)
+
+    async def list_sources(client: httpx.AsyncClient, _index: int) -> httpx.Response:
+        return await client.get("/api/v1/sources/", params={"limit": 100})
+
+    async def analyze(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        # documents and quarters are cycled through, so that
+        # repeated analyses only meet once all pairs are sent
+        return await client.post(
+            "/api/v1/sources/analyze",
+            json={
+                "report": documents[index % len(documents)],
+                "quarter": QUARTERS[(index // len(documents)) % len(QUARTERS)],
+            },
+        )
+
+    extracted_data = json.dumps(PROFIT_AND_LOSS_STATEMENT)
+    reference = reference_csv()
+
+    async def evaluate(client: httpx.AsyncClient, _index: int) -> httpx.Response:
+        return await client.post(
+            "/api/v1/results/evaluate",
+            data={"extracted_data": extracted_data, "source": documents[0], "model": "benchmark"},
+            files={"attachments": ("reference.csv", reference, "text/csv")},
+        )
+
+    return {"upload": upload, "list": list_sources, "analyze": analyze, "evaluate": evaluate}[name]
+
+
+async def _seed_documents(client: httpx.AsyncClient, count: int, note_paragraphs: int, seed: int) -> list[str]:
+    run_id = uuid.uuid4().hex[:8]
+    slots = asyncio.Semaphore(SEED_CONCURRENCY)
+
+    async def seed_document(index: int) -> str:
+        file_name = f"seed-{run_id}-{index}.html"
+        body = financial_statement_html(file_name, note_paragraphs=note_paragraphs, seed=seed)
+        async with slots:
+            result = await _upload(file_name, body)(client, index)
+
+        if not result.is_success:
+            raise click.ClickException(f"Could not upload {file_name}: {result.status_code} {result.text}")
+
+        return file_name
+
+    return await asyncio.gather(*(seed_document(index) for index in range(count)))
+
+
+async def _run_scenarios(
+    base_url: str,
+    scenarios: list[str],
+    concurrency_levels: list[int],
+    requests: int,
+    warmup: int,
+    documents: int,
+    note_paragraphs: int,
+    seed: int,
+    timeout: float,
+) -> list[dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        click.echo(f"🌱 Uploading {documents} document(s) to analyze...", err=True)
+        seeded_documents = await _seed_documents(client, documents, note_paragraphs=note_paragraphs, seed=seed)
+
+        results = []
+        for name in scenarios:
+            for concurrency in concurrency_levels:
+                click.echo(f"⏱️ Running the {name} scenario at a concurrency of {concurrency}...", err=True)
+                send = _scenario(name, seeded_documents, note_paragraphs=note_paragraphs, seed=seed)
+                measurement = await _measure(client, send, requests=requests, concurrency=concurrency, warmup=warmup)
+                results.append({"scenario": name, **measurement})
+
+        return results
+
+
+def _parse_scenarios(_ctx: click.Context, _param: click.Parameter, value: str) -> list[str]:
+    scenarios = [scenario.strip() for scenario in value.split(",") if scenario.strip()]
+    invalid_scenarios = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if invalid_scenarios or not scenarios:
+        raise click.BadParameter(f"Unknown scenarios {invalid_scenarios}. Supported scenarios are {list(SCENARIOS)}")
+
+    return scenarios
+
+
+@click.command()
+@click.option(
+    "--scenarios",
+    default=",".join(SCENARIOS),
+    show_default=True,
+    callback=_parse_scenarios,
+    help="Comma separated scenarios to run, in order.",
+)
+@click.option(
+    "--concurrency",
+    "concurrency_levels",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=(1, 8, 32),
+    show_default=True,
+    help="Requests in flight at a time. Every scenario runs at each given level.",
+)
+@click.option("--requests", type=click.IntRange(min=1), default=100, show_default=True, help="Requests per run.")
+@click.option("--warmup", type=click.IntRange(min=0), default=5, show_default=True, help="Unmeasured requests per run.")
+@click.option("--documents", type=click.IntRange(min=1), default=20, show_default=True, help="Documents to analyze.")
+@click.option(
+    "--note-paragraphs",
+    type=click.IntRange(min=0),
+    default=40,
+    show_default=True,
+    help="Note paragraphs per document, which sets the document size.",
+)
+@click.option(
+    "--mongo-uri",
+    default=lambda: os.environ.get("PLEX_MONGO_URI") or "mongodb://127.0.0.1:27017",
+    help="Local mongodb to benchmark against. A database of its own is created and dropped. [default: PLEX_MONGO_URI]",
+)
+@click.option("--keep-database", is_flag=True, default=False, help="Keep the benchmark database afterwards.")
+@click.option("--port", default=8010, show_default=True, help="Port of the benchmarked server.")
+@click.option("--workers", type=click.IntRange(min=1, max=4), default=1, show_default=True, help="Sanic workers.")
+@click.option(
+    "--result-cache/--no-result-cache",
+    default=False,
+    show_default=True,
+    help="Serve repeated analyses from the result cache.",
+)
+@click.option(
+    "--table-extraction/--no-table-extraction",
+    default=False,
+    show_default=True,
+    help="Extract confident P&L tables without the LLM.",
+)
+@click.option("--llm-port", default=8110, show_default=True, help="Port of the mock LLM.")
+@click.option("--llm-latency", default=0.5, show_default=True, help="Seconds before the first token of the mock LLM.")
+@click.option("--llm-jitter", default=0.1, show_default=True, help="Seconds the mock LLM latency varies by.")
+@click.option("--llm-tokens-per-second", default=60.0, show_default=True, help="Completion token rate of the mock LLM.")
+@click.option("--llm-error-rate", default=0.0, show_default=True, help="Share of the mock LLM requests to fail.")
+@click.option(
+    "--llm-error-status",
+    type=click.Choice(["429", "500", "503"]),
+    default="429",
+    show_default=True,
+    help="Status of the failed mock LLM requests.",
+)
+@click.option("--seed", default=0, show_default=True, help="Seed of the documents and the mock LLM.")
+@click.option("--timeout", default=300.0, show_default=True, help="Seconds before a request times out.")
+@click.option("--output", "-o", default=None, help="File to write the JSON report to. Printed if not given.")
+def load_test(
+    scenarios: list[str],
+    concurrency_levels: tuple[int, ...],
+    requests: int,
+    warmup: int,
+    documents: int,
+    note_paragraphs: int,
+    mongo_uri: str,
+    keep_database: bool,
+    port: int,
+    workers: int,
+    result_cache: bool,
+    table_extraction: bool,
+    llm_port: int,
+    llm_latency: float,
+    llm_jitter: float,
+    llm_tokens_per_second: float,
+    llm_error_rate: float,
+    llm_error_status: str,
+    seed: int,
+    timeout: float,
+    output: str | None,
+) -> None:
+    """Boots the API server against a mock LLM and a local mongodb, drives its endpoints at the given concurrency
+    levels and reports their throughput and latency percentiles as JSON.
+
+    The server runs with the PLEX_ variables of the environment, e.g. the LLM scheduler limits, except for the ones
+    pointing it to the mock LLM and the benchmark database.
+    """
+
+    _check_mongo(mongo_uri)
+
+    mongo_db = f"plex_benchmark_{uuid.uuid4().hex[:8]}"
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    server_url = f"http://127.0.0.1:{port}"
+    server_env = {
+        **os.environ,
+        "PLEX_ROUTER_HOST": "127.0.0.1",
+        "PLEX_ROUTER_PORT": str(port),
+        "PLEX_ROUTER_WORKERS": str(workers),
+        "PLEX_ROUTER_ACCESS_LOG": "false",
+        "PLEX_ROUTER_DEBUG_MODE": "false",
+        "PLEX_MONGO_URI": mongo_uri,
+        "PLEX_MONGO_DB": mongo_db,
+        "PLEX_DEEPSEEK_BASE_URL": llm_url,
+        "PLEX_DEEPSEEK_API_KEY": "benchmark",
+        "PLEX_RESULT_CACHE_ENABLED": str(result_cache).lower(),
+        "PLEX_TABLE_EXTRACTION_ENABLED": str(table_extraction).lower(),
+    }
+    llm_settings = {
+        "latency": llm_latency,
+        "jitter": llm_jitter,
+        "tokens_per_second": llm_tokens_per_second,
+        "error_rate": llm_error_rate,
+        "error_status": int(llm_error_status),
+        "seed": seed,
+    }
+
+    llm_process = server_process = None
+    log_file = tempfile.NamedTemporaryFile("w", prefix="plex_benchmark_", suffix=".log", delete=False)
+    try:
+        click.echo(f"▶️ Starting the mock LLM and the API server, logging to {log_file.name}...", err=True)
+        llm_process = _start_process(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.mock_llm",
+                f"--port={llm_port}",
+                f"--latency={llm_latency}",
+                f"--jitter={llm_jitter}",
+                f"--tokens-per-second={llm_tokens_per_second}",
+                f"--error-rate={llm_error_rate}",
+                f"--error-status={llm_error_status}",
+                f"--seed={seed}",
+            ],
+            env=dict(os.environ),
+            log_file=log_file,
+        )
+        _wait_until_ready(llm_url, llm_process, log_file.name)
+
+        # the server is started through the CLI, which runs
+        # the migrations and loads the app from create_app
+        server_process = _start_process(
+            [sys.executable, "-c", "from plex import run; run()", "run"],
+            env=server_env,
+            log_file=log_file,
+        )
+        _wait_until_ready(server_url, server_process, log_file.name)
+
+        results = asyncio.run(
+            _run_scenarios(
+                base_url=server_url,
+                scenarios=scenarios,
+                concurrency_levels=list(concurrency_levels),
+                requests=requests,
+                warmup=warmup,
+                documents=documents,
+                note_paragraphs=note_paragraphs,
+                seed=seed,
+                timeout=timeout,
+            ),
+        )
+
+    finally:
+        _stop_process(server_process)
+        _stop_process(llm_process)
+        log_file.close()
+
+        if not keep_database:
+            _drop_database(mongo_uri, mongo_db)
+
+    settings = {
+        "requests": requests,
+        "warmup": warmup,
+        "documents": documents,
+        "note_paragraphs": note_paragraphs,
+        "document_bytes": len(financial_statement_html("document", note_paragraphs=note_paragraphs, seed=seed)),
+        "workers": workers,
+        "result_cache": result_cache,
+        "table_extraction": table_extraction,
+        "llm": llm_settings,
+        "environment": {key: value for key, value in sorted(os.environ.items()) if key.startswith("PLEX_LLM_")},
+    }
+    write_report(build_report("load_test", settings=settings, results=results), output=output)
+
+
+if __name__ == "__main__":
+    load_test()
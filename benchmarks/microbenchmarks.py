@@ -0,0 +1,343 @@
+import gc
+import json
+import math
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from collections.abc import Iterator
+from typing import Any
+from typing import TypedDict
+
+import click
+from sanic.request import File
+
+from benchmarks.reporting import build_report
+from benchmarks.reporting import write_report
+from benchmarks.synthetic import financial_statement_pdf
+from benchmarks.synthetic import perturb_table
+from benchmarks.synthetic import profit_and_loss_table
+from benchmarks.synthetic import ragged_table
+from benchmarks.synthetic import reference_csv
+from plex.core.utils import convert_data_to_dict
+from plex.core.utils import convert_to_mappable
+from plex.core.utils import convert_to_markdown
+from plex.core.utils import evaluate_extracted_vs_reference
+from plex.core.utils import generate_content_hash
+from plex.core.utils import load_csv
+
+TABLE_COLUMNS = 12
+EVALUATION_ROWS = 50
+EVALUATION_COLUMNS = 6
+EVALUATION_CHANGE_RATE = 0.1
+# timings below this difference are within
+# the noise of the machine, whatever the ratio
+MIN_TIME_DELTA_SECONDS = 0.001
+
+
+class Benchmark(TypedDict):
+    name: str
+    size: int
+    unit: str
+    inputs: Callable[[], tuple]
+    run: Callable[..., Any]
+
+
+def _csv_file(table: list[list[str]]) -> File:
+    return File(type="text/csv", body=reference_csv(table), name="reference.csv")
+
+
+def _evaluation_inputs(rows: int, columns: int) -> tuple:
+    # the reference is parsed from its CSV, as the evaluation routes do
+    reference = profit_and_loss_table(rows, columns)
+    extracted = perturb_table(reference, change_rate=EVALUATION_CHANGE_RATE)
+    return extracted, load_csv(_csv_file(reference))
+
+
+def _evaluate(extracted: list[list[str]], reference: Any) -> dict[str, Any]:
+    return evaluate_extracted_vs_reference(
+        extracted_data=extracted,
+        reference_data=reference,
+        source="benchmark.pdf",
+        reference="reference.csv",
+    )
+
+
+def _benchmarks(quick: bool) -> Iterator[Benchmark]:
+    def sizes(*values: int) -> tuple[int, ...]:
+        return values[:-1] if quick else values
+
+    for pages in sizes(1, 4, 16):
+        yield {
+            "name": "convert_to_markdown",
+            "size": pages,
+            "unit": "pages",
+            "inputs": lambda pages=pages: (
+                File(type="application/pdf", body=financial_statement_pdf(pages), name="statement.pdf"),
+            ),
+            "run": convert_to_markdown,
+        }
+
+    for kilobytes in sizes(64, 1024, 16384):
+        yield {
+            "name": "generate_content_hash",
+            "size": kilobytes,
+            "unit": "KiB",
+            "inputs": lambda kilobytes=kilobytes: (("| Revenue | 1,250,400 | 1,108,250 |\n" * 32)[:1024] * kilobytes,),
+            "run": generate_content_hash,
+        }
+
+    for rows in sizes(100, 1000, 10000):
+        yield {
+            "name": "convert_to_mappable",
+            "size": rows,
+            "unit": "rows",
+            "inputs": lambda rows=rows: (ragged_table(rows, TABLE_COLUMNS),),
+            "run": convert_to_mappable,
+        }
+
+    for rows in sizes(100, 1000, 10000):
+        yield {
+            "name": "load_csv",
+            "size": rows,
+            "unit": "rows",
+            "inputs": lambda rows=rows: (_csv_file(profit_and_loss_table(rows, TABLE_COLUMNS)),),
+            "run": load_csv,
+        }
+
+    for rows in sizes(100, 1000, 10000):
+        yield {
+            "name": "convert_data_to_dict",
+            "size": rows,
+            "unit": "rows",
+            "inputs": lambda rows=rows: (profit_and_loss_table(rows, TABLE_COLUMNS),),
+            "run": convert_data_to_dict,
+        }
+
+    # long statements stress the line item alignment,
+    # and wide ones the column alignment and flattening
+    for rows in sizes(25, 100, 400):
+        yield {
+            "name": "evaluate_extracted_vs_reference/long",
+            "size": rows,
+            "unit": "rows",
+            "inputs": lambda rows=rows: _evaluation_inputs(rows, EVALUATION_COLUMNS),
+            "run": _evaluate,
+        }
+
+    for columns in sizes(4, 16, 64):
+        yield {
+            "name": "evaluate_extracted_vs_reference/wide",
+            "size": columns,
+            "unit": "columns",
+            "inputs": lambda columns=columns: _evaluation_inputs(EVALUATION_ROWS, columns),
+            "run": _evaluate,
+        }
+
+
+def _measure(benchmark: Benchmark, repeat: int) -> dict[str, Any]:
+    """Times a benchmark over several runs after a warmup run, then traces the peak memory it allocates in a run of
+    its own, since tracing slows the allocations down.
+
+    Args:
+        benchmark (Benchmark): function to measure, along with its inputs
+        repeat (int): number of timed runs
+
+    Returns:
+        dict[str, Any]: timings in seconds and peak traced memory in bytes
+    """
+
+    inputs = benchmark["inputs"]()
+    benchmark["run"](*inputs)
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started_at = time.perf_counter()
+        benchmark["run"](*inputs)
+        timings.append(time.perf_counter() - started_at)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark["run"](*inputs)
+        _, peak_memory = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": benchmark["name"],
+        "size": benchmark["size"],
+        "unit": benchmark["unit"],
+        "repeat": repeat,
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "mean_seconds": round(statistics.fmean(timings), 6),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def _scaling_exponents(results: list[dict[str, Any]]) -> dict[str, float | None]:
+    # slope of the median time over the size on a log-log scale,
+    # i.e. about 1 for linear and 2 for quadratic functions
+    exponents: dict[str, float | None] = {}
+    for name in dict.fromkeys(result["name"] for result in results):
+        points = [
+            (math.log(result["size"]), math.log(result["median_seconds"]))
+            for result in results
+            if result["name"] == name and result["median_seconds"] > 0
+        ]
+        if len(points) < 2:
+            exponents[name] = None
+            continue
+
+        mean_x = statistics.fmean(x for x, _ in points)
+        mean_y = statistics.fmean(y for _, y in points)
+        variance = sum((x - mean_x) ** 2 for x, _ in points)
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        exponents[name] = round(covariance / variance, 3) if variance else None
+
+    return exponents
+
+
+def _find_regressions(
+    results: list[dict[str, Any]],
+    baseline: dict[str, Any],
+    time_threshold: float,
+    memory_threshold: float,
+) -> list[dict[str, Any]]:
+    """Compares the measurements against the ones of a baseline report for the same benchmarks and sizes.
+
+    Args:
+        results (list[dict[str, Any]]): current measurements
+        baseline (dict[str, Any]): earlier report of the microbenchmarks
+        time_threshold (float): relative increase of the median time flagged as a regression
+        memory_threshold (float): relative increase of the peak memory flagged as a regression
+
+    Returns:
+        list[dict[str, Any]]: regressed metrics, along with their baseline and current values
+    """
+
+    baseline_results = {(result["name"], result["size"]): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        baseline_result = baseline_results.get((result["name"], result["size"]))
+        if not baseline_result:
+            continue
+
+        for metric, threshold, min_delta in (
+            ("median_seconds", time_threshold, MIN_TIME_DELTA_SECONDS),
+            ("peak_memory_bytes", memory_threshold, 0),
+        ):
+            baseline_value = baseline_result[metric]
+            current_value = result[metric]
+            if baseline_value <= 0 or current_value - baseline_value <= min_delta:
+                continue
+
+            ratio = current_value / baseline_value
+            if ratio > 1 + threshold:
+                regressions.append(
+                    {
+                        "name": result["name"],
+                        "size": result["size"],
+                        "metric": metric,
+                        "baseline": baseline_value,
+                        "current": current_value,
+                        "ratio": round(ratio, 3),
+                    },
+                )
+
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--functions",
+    default="",
+    help="Comma separated benchmarks to run, matched by prefix, e.g. load_csv. All are run if not given.",
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True, help="Timed runs per size.")
+@click.option("--quick", is_flag=True, default=False, help="Skip the largest size of each benchmark.")
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Earlier report to flag regressions against. Exits with 1 if any is found.",
+)
+@click.option(
+    "--time-threshold",
+    type=click.FloatRange(min=0),
+    default=0.25,
+    show_default=True,
+    help="Relative increase of the median time flagged as a regression.",
+)
+@click.option(
+    "--memory-threshold",
+    type=click.FloatRange(min=0),
+    default=0.1,
+    show_default=True,
+    help="Relative increase of the peak memory flagged as a regression.",
+)
+@click.option("--output", "-o", default=None, help="File to write the JSON report to. Printed if not given.")
+def microbenchmarks(
+    functions: str,
+    repeat: int,
+    quick: bool,
+    baseline: str | None,
+    time_threshold: float,
+    memory_threshold: float,
+    output: str | None,
+) -> None:
+    """Measures the time and peak memory of the pure functions of the pipeline on synthetic inputs of growing sizes,
+    and reports them as JSON along with how each of them scales."""
+
+    prefixes = [prefix.strip() for prefix in functions.split(",") if prefix.strip()]
+    results = []
+    for benchmark in _benchmarks(quick=quick):
+        if prefixes and not any(benchmark["name"].startswith(prefix) for prefix in prefixes):
+            continue
+
+        click.echo(f"⏱️ Measuring {benchmark['name']} on {benchmark['size']} {benchmark['unit']}...", err=True)
+        results.append(_measure(benchmark, repeat=repeat))
+
+    report = build_report(
+        "microbenchmarks",
+        settings={
+            "repeat": repeat,
+            "quick": quick,
+            "time_threshold": time_threshold,
+            "memory_threshold": memory_threshold,
+        },
+        results=results,
+    )
+    report["scaling_exponents"] = _scaling_exponents(results)
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as file:
+            baseline_report = json.load(file)
+
+        report["baseline"] = {"path": baseline, "commit": baseline_report.get("commit")}
+        report["regressions"] = _find_regressions(
+            results,
+            baseline=baseline_report,
+            time_threshold=time_threshold,
+            memory_threshold=memory_threshold,
+        )
+
+    write_report(report, output=output)
+
+    for regression in report.get("regressions", []):
+        click.echo(
+            f"❌ {regression['name']} on {regression['size']} regressed in {regression['metric']} "
+            f"by x{regression['ratio']}",
+            err=True,
+        )
+
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    microbenchmarks()
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any
+from typing import TypedDict
+
+import click
+from sanic import HTTPResponse
+from sanic import Request
+from sanic import response
+from sanic import Sanic
+
+from benchmarks.synthetic import PROFIT_AND_LOSS_STATEMENT
+from plex.core.retrieval import estimate_tokens
+
+MOCK_LLM_APP_NAME = "plex_mock_llm"
+TOOL_NAME = "save_profit_and_loss_statement"
+SELECTIVE_EXTRACTION_MARKER = "ONLY extract these line items"
+# deepseek caches prompt prefixes in units of 64 tokens
+CACHE_UNIT_TOKENS = 64
+CACHE_MAX_PREFIXES = 1024
+STREAM_CHUNK_CHARS = 24
+SELECTED_LINE_ITEMS = ("Gross Profit", "Profit Before Tax", "Profit for the Period")
+
+
+class MockLLMSettings(TypedDict):
+    latency: float
+    jitter: float
+    tokens_per_second: float
+    error_rate: float
+    error_status: int
+    retry_after: float
+    seed: int | None
+
+
+def _extracted_items(prompt: str) -> list[list[str]]:
+    if SELECTIVE_EXTRACTION_MARKER in prompt:
+        header, *rows = PROFIT_AND_LOSS_STATEMENT
+        return [header, *(row for row in rows if row[0] in SELECTED_LINE_ITEMS)]
+
+    return PROFIT_AND_LOSS_STATEMENT
+
+
+def _prompt_text(messages: list[dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content)
+
+    return "\n".join(parts)
+
+
+class MockLLM:
+    """Stands in for an OpenAI compatible chat completions API, answering every request with a forced call of the P&L
+    tool after a configurable latency and token rate, and failing a configurable share of the requests.
+
+    Prompt prefixes are remembered like the prefix cache of deepseek does, so that cache hits are reported in the
+    usage of the responses.
+    """
+
+    def __init__(self, settings: MockLLMSettings) -> None:
+        self.settings = settings
+        self._random = random.Random(settings["seed"])
+        self._prefixes: OrderedDict[int, None] = OrderedDict()
+
+    def _cached_tokens(self, prefix: str) -> int:
+        prefix_tokens = (estimate_tokens(prefix) // CACHE_UNIT_TOKENS) * CACHE_UNIT_TOKENS
+        if not prefix_tokens:
+            return 0
+
+        key = hash(prefix[: prefix_tokens * 4])
+        if key in self._prefixes:
+            self._prefixes.move_to_end(key)
+            return prefix_tokens
+
+        self._prefixes[key] = None
+        if len(self._prefixes) > CACHE_MAX_PREFIXES:
+            self._prefixes.popitem(last=False)
+
+        return 0
+
+    def _usage(self, prompt: str, arguments: str) -> dict[str, int]:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(arguments)
+        # the document comes first in the prompt, so the prefix
+        # shared by its analyses ends where the instructions start
+        cached_tokens = min(self._cached_tokens(prompt.split("</financial_statement>")[0]), prompt_tokens)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": cached_tokens,
+            "prompt_cache_miss_tokens": prompt_tokens - cached_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+    def _generation_seconds(self, arguments: str) -> float:
+        if self.settings["tokens_per_second"] <= 0:
+            return 0.0
+
+        return estimate_tokens(arguments) / self.settings["tokens_per_second"]
+
+    def _first_token_seconds(self) -> float:
+        return max(0.0, self.settings["latency"] + self._random.uniform(-1, 1) * self.settings["jitter"])
+
+    def _error_response(self) -> HTTPResponse | None:
+        if self._random.random() >= self.settings["error_rate"]:
+            return None
+
+        return response.json(
+            {"error": {"message": "Injected failure of the mock LLM", "type": "mock_error", "code": None}},
+            status=self.settings["error_status"],
+            headers={"Retry-After": str(self.settings["retry_after"])},
+        )
+
+    async def complete(self, request: Request) -> HTTPResponse | None:
+        body = request.json or {}
+        error = self._error_response()
+        if error is not None:
+            return error
+
+        prompt = _prompt_text(body.get("messages") or [])
+        arguments = json.dumps({"extracted_items": _extracted_items(prompt)})
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        usage = self._usage(prompt, arguments)
+
+        if body.get("stream"):
+            await self._stream(request, completion_id, created, model, arguments, usage, body)
+            return None
+
+        await asyncio.sleep(self._first_token_seconds() + self._generation_seconds(arguments))
+        return response.json(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {
+                            "role": "assistant",
+                            "content": None,
+                            "tool_calls": [
+                                {
+                                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                                    "type": "function",
+                                    "function": {"name": TOOL_NAME, "arguments": arguments},
+                                },
+                            ],
+                        },
+                        "finish_reason": "tool_calls",
+                    },
+                ],
+                "usage": usage,
+            },
+        )
+
+    async def _stream(
+        self,
+        request: Request,
+        completion_id: str,
+        created: int,
+        model: str,
+        arguments: str,
+        usage: dict[str, int],
+        body: dict[str, Any],
+    ) -> None:
+        def chunk(delta: dict[str, Any], finish_reason: str | None = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        stream = await request.respond(content_type="text/event-stream")
+        await asyncio.sleep(self._first_token_seconds())
+
+        await stream.send(
+            chunk(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "index": 0,
+                            "id": f"call_{uuid.uuid4().hex[:24]}",
+                            "type": "function",
+                            "function": {"name": TOOL_NAME, "arguments": ""},
+                        },
+                    ],
+                },
+            ),
+        )
+
+        # the arguments are spread over the generation
+        # time at the configured token rate
+        pieces = [arguments[i : i + STREAM_CHUNK_CHARS] for i in range(0, len(arguments), STREAM_CHUNK_CHARS)]
+        delay = self._generation_seconds(arguments) / len(pieces)
+        for piece in pieces:
+            if delay:
+                await asyncio.sleep(delay)
+            await stream.send(chunk({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]}))
+
+        await stream.send(chunk({}, finish_reason="tool_calls"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage_payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            await stream.send(f"data: {json.dumps(usage_payload)}\n\n")
+
+        await stream.send("data: [DONE]\n\n")
+        await stream.eof()
+
+
+def create_mock_llm_app(settings: MockLLMSettings) -> Sanic:
+    app = Sanic(MOCK_LLM_APP_NAME)
+    mock_llm = MockLLM(settings)
+
+    async def chat_completions(request: Request) -> HTTPResponse | None:
+        return await mock_llm.complete(request)
+
+    # the openai client appends the path to the base url,
+    # which may or may not already hold the version prefix
+    app.add_route(chat_completions, "/chat/completions", methods=["POST"])
+    app.add_route(chat_completions, "/v1/chat/completions", methods=["POST"], name="v1_chat_completions")
+
+    # noinspection PyUnusedLocal
+    @app.get("/")
+    async def healthcheck(request: Request) -> HTTPResponse:
+        return response.json({"status": "ok"})
+
+    return app
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Host to listen on.")
+@click.option("--port", default=8100, show_default=True, help="Port to listen on.")
+@click.option("--latency", default=0.5, show_default=True, help="Seconds before the first token of a response.")
+@click.option("--jitter", default=0.1, show_default=True, help="Seconds the latency randomly varies by.")
+@click.option(
+    "--tokens-per-second",
+    default=60.0,
+    show_default=True,
+    help="Completion token rate. Responses are not slowed down by their length if 0.",
+)
+@click.option("--error-rate", default=0.0, show_default=True, help="Share of the requests to fail, from 0 to 1.")
+@click.option(
+    "--error-status",
+    type=click.Choice(["429", "500", "503"]),
+    default="429",
+    show_default=True,
+    help="Status of the failed requests.",
+)
+@click.option("--retry-after", default=1.0, show_default=True, help="Retry-After seconds of the failed requests.")
+@click.option("--seed", type=int, default=None, help="Seed of the latency jitter and error injection.")
+def serve(
+    host: str,
+    port: int,
+    latency: float,
+    jitter: float,
+    tokens_per_second: float,
+    error_rate: float,
+    error_status: str,
+    retry_after: float,
+    seed: int | None,
+) -> None:
+    """Runs a local OpenAI compatible stand-in of the LLM API, to point PLEX_DEEPSEEK_BASE_URL to."""
+
+    app = create_mock_llm_app(
+        {
+            "latency": max(0.0, latency),
+            "jitter": max(0.0, jitter),
+            "tokens_per_second": max(0.0, tokens_per_second),
+            "error_rate": min(1.0, max(0.0, error_rate)),
+            "error_status": int(error_status),
+            "retry_after": max(0.0, retry_after),
+            "seed": seed,
+        },
+    )
+    app.run(host=host, port=port, single_process=True, access_log=False, debug=False, motd=False)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,100 @@
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+
+import click
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Computes a percentile of the given values, interpolating linearly between the closest ranks.
+
+    Args:
+        values (list[float]): measured values, in any order
+        q (float): percentile to compute, from 0 to 100
+
+    Returns:
+        float: percentile of the values, 0 if there are none
+    """
+
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize_latencies(latencies: list[float]) -> dict[str, float]:
+    """Summarizes measured latencies, given in seconds, in milliseconds.
+
+    Args:
+        latencies (list[float]): latencies in seconds
+
+    Returns:
+        dict[str, float]: minimum, mean, p50, p95, p99 and maximum latencies in milliseconds
+    """
+
+    if not latencies:
+        return {"min": 0.0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    return {
+        "min": round(min(latencies) * 1000, 3),
+        "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50": round(percentile(latencies, 50) * 1000, 3),
+        "p95": round(percentile(latencies, 95) * 1000, 3),
+        "p99": round(percentile(latencies, 99) * 1000, 3),
+        "max": round(max(latencies) * 1000, 3),
+    }
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True, timeout=10).stdout.strip()
+
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(benchmark: str, settings: dict[str, Any], results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Wraps the results of a benchmark run with the commit and environment it ran on, so that runs can be compared
+    across commits.
+
+    Args:
+        benchmark (str): name of the benchmark suite
+        settings (dict[str, Any]): settings the suite ran with
+        results (list[dict[str, Any]]): measurements of the suite
+
+    Returns:
+        dict[str, Any]: JSON serializable report
+    """
+
+    return {
+        "benchmark": benchmark,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+        "results": results,
+    }
+
+
+def write_report(report: dict[str, Any], output: str | None) -> None:
+    """Writes a benchmark report as JSON to the given file, or to the standard output if not given."""
+
+    content = json.dumps(report, indent=2)
+    if not output:
+        click.echo(content)
+        return
+
+    with open(output, "w", encoding="utf-8") as file:
+        file.write(content + "\n")
+
+    click.echo(f"✅ Benchmark report written to {output}", err=True)
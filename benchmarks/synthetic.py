@@ -0,0 +1,230 @@
+import csv
+import io
+import random
+from html import escape
+
+PROFIT_AND_LOSS_STATEMENT = [
+    ["Line Item", "3 months to 30.09.2024", "3 months to 30.09.2023", "Change %"],
+    ["Revenue", "1,250,400", "1,108,250", "12.8"],
+    ["Cost of sales", "(812,760)", "(731,445)", "11.1"],
+    ["Gross Profit", "437,640", "376,805", "16.1"],
+    ["Other operating income", "12,310", "9,870", "24.7"],
+    ["Distribution costs", "(58,220)", "(51,630)", "12.8"],
+    ["Administrative expenses", "(121,905)", "(110,440)", "10.4"],
+    ["Finance costs", "(24,115)", "(29,870)", "(19.3)"],
+    ["Profit Before Tax", "245,710", "194,735", "26.2"],
+    ["Income tax expense", "(73,713)", "(58,421)", "26.2"],
+    ["Profit for the Period", "171,997", "136,314", "26.2"],
+]
+BALANCE_SHEET_ITEMS = (
+    "Property, plant and equipment",
+    "Intangible assets",
+    "Inventories",
+    "Trade and other receivables",
+    "Cash and cash equivalents",
+    "Stated capital",
+    "Retained earnings",
+    "Interest bearing borrowings",
+    "Trade and other payables",
+)
+LINE_ITEM_WORDS = (
+    "revenue",
+    "cost of sales",
+    "other income",
+    "distribution costs",
+    "administrative expenses",
+    "finance income",
+    "finance costs",
+    "share of profit of associates",
+    "impairment of receivables",
+    "depreciation and amortisation",
+    "staff costs",
+    "fair value gains",
+)
+LINE_ITEM_QUALIFIERS = ("Group", "Segment", "Region", "Subsidiary", "Division")
+NOTE_SENTENCES = (
+    "The Group continued to invest in its distribution network during the period under review.",
+    "Finance costs declined following the settlement of short term borrowings.",
+    "The interim financial statements have been prepared in accordance with LKAS 34.",
+    "There were no material events after the reporting date requiring adjustment or disclosure.",
+    "Contingent liabilities as at the reporting date remain unchanged from the last annual report.",
+    "The effective tax rate of the Group was in line with the statutory rate.",
+)
+
+
+def _table_html(title: str, rows: list[list[str]]) -> str:
+    header, *body = rows
+    return "\n".join(
+        [
+            f"<h2>{escape(title)}</h2>",
+            "<table>",
+            "<tr>" + "".join(f"<th>{escape(cell)}</th>" for cell in header) + "</tr>",
+            *("<tr>" + "".join(f"<td>{escape(cell)}</td>" for cell in row) + "</tr>" for row in body),
+            "</table>",
+        ],
+    )
+
+
+def financial_statement_html(name: str, note_paragraphs: int = 40, seed: int = 0) -> bytes:
+    """Generates an interim financial statement as an HTML document, holding a consolidated P&L statement between a
+    balance sheet and notes. Documents of different names differ in content, hence in hash.
+
+    Args:
+        name (str): name of the document
+        note_paragraphs (int): number of note paragraphs, which sets the size of the document
+        seed (int): seed of the generated figures and notes
+
+    Returns:
+        bytes: HTML document
+    """
+
+    generator = random.Random(f"{seed}-{name}")
+    balance_sheet = [
+        ["Line Item", "As at 30.09.2024", "As at 31.03.2024"],
+        *(
+            [item, f"{generator.randint(10_000, 2_000_000):,}", f"{generator.randint(10_000, 2_000_000):,}"]
+            for item in BALANCE_SHEET_ITEMS
+        ),
+    ]
+    notes = [
+        f"<p>{paragraph + 1}. " + " ".join(generator.choices(NOTE_SENTENCES, k=4)) + "</p>"
+        for paragraph in range(note_paragraphs)
+    ]
+
+    return "\n".join(
+        [
+            "<html><body>",
+            f"<h1>{escape(name)}</h1>",
+            "<p>Interim Financial Statements for the quarter ended 30 September 2024</p>",
+            _table_html("Consolidated Statement of Financial Position", balance_sheet),
+            _table_html("Consolidated Statement of Profit or Loss", PROFIT_AND_LOSS_STATEMENT),
+            "<h2>Notes to the Financial Statements</h2>",
+            *notes,
+            "</body></html>",
+        ],
+    ).encode()
+
+
+def reference_csv(rows: list[list[str]] = PROFIT_AND_LOSS_STATEMENT) -> bytes:
+    """Writes a P&L statement as the reference CSV of an evaluation."""
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def financial_statement_pdf(pages: int, lines_per_page: int = 50, seed: int = 0) -> bytes:
+    """Generates a text-only PDF financial statement of the given number of pages, each holding a P&L statement laid
+    out as text lines followed by notes. The PDF is written by hand, with one content stream per page.
+
+    Args:
+        pages (int): number of pages
+        lines_per_page (int): number of text lines per page
+        seed (int): seed of the generated notes
+
+    Returns:
+        bytes: PDF document
+    """
+
+    generator = random.Random(seed)
+    statement_lines = ["    ".join(row) for row in PROFIT_AND_LOSS_STATEMENT]
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{kids}] /Count {pages} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Consolidated Statement of Profit or Loss - page {page + 1}", *statement_lines]
+        lines += [generator.choice(NOTE_SENTENCES) for _ in range(max(0, lines_per_page - len(lines)))]
+        text = " ".join(f"({_pdf_text(line)}) Tj T*" for line in lines)
+        stream = f"BT /F1 9 Tf 12 TL 36 806 Td {text} ET"
+
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {len(objects)} 0 R >>",
+        )
+        page_ids.append(len(objects))
+
+    objects[1] = objects[1].format(kids=" ".join(f"{page_id} 0 R" for page_id in page_ids), pages=pages)
+
+    # object offsets are listed in the cross-reference
+    # table, hence the document is assembled in bytes
+    document = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for object_id, body in enumerate(objects, start=1):
+        offsets.append(len(document))
+        document += f"{object_id} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref_offset = len(document)
+    document += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    document += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    document += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(document)
+
+
+def _financial_number(generator: random.Random) -> str:
+    value = generator.randint(-5_000_000, 20_000_000)
+    return f"({-value:,})" if value < 0 else f"{value:,}"
+
+
+def profit_and_loss_table(rows: int, columns: int, seed: int = 0) -> list[list[str]]:
+    """Generates a P&L table of the given size, with distinct line items and formatted financial numbers.
+
+    Args:
+        rows (int): number of line items
+        columns (int): number of value columns
+        seed (int): seed of the generated line items and values
+
+    Returns:
+        list[list[str]]: header followed by the line item rows
+    """
+
+    generator = random.Random(seed)
+    header = ["Line Item", *(f"3 months to 30.09.{2024 - column}" for column in range(columns))]
+    line_items = [
+        f"{generator.choice(LINE_ITEM_WORDS).capitalize()} - {generator.choice(LINE_ITEM_QUALIFIERS)} {row + 1}"
+        for row in range(rows)
+    ]
+    return [header, *([line_item, *(_financial_number(generator) for _ in range(columns))] for line_item in line_items)]
+
+
+def perturb_table(table: list[list[str]], change_rate: float = 0.1, seed: int = 0) -> list[list[str]]:
+    """Perturbs a table the way an extraction differs from its reference, rewording some of the line items, changing
+    some of the values and shuffling the rows.
+
+    Args:
+        table (list[list[str]]): header followed by the line item rows
+        change_rate (float): share of the line items and values to perturb
+        seed (int): seed of the perturbations
+
+    Returns:
+        list[list[str]]: perturbed copy of the table
+    """
+
+    generator = random.Random(seed)
+    header, *rows = table
+    perturbed_rows = []
+    for line_item, *values in rows:
+        if generator.random() < change_rate:
+            line_item = line_item.replace(" and ", " & ").replace(" - ", " ").upper()
+
+        values = [_financial_number(generator) if generator.random() < change_rate else value for value in values]
+        perturbed_rows.append([line_item, *values])
+
+    generator.shuffle(perturbed_rows)
+    return [list(header), *perturbed_rows]
+
+
+def ragged_table(rows: int, columns: int, seed: int = 0) -> list[list[str]]:
+    """Generates a table whose rows miss some of their trailing values, as LLM extractions sometimes do."""
+
+    generator = random.Random(seed)
+    table = profit_and_loss_table(rows, columns, seed=seed)
+    return [table[0], *(row[: generator.randint(1, columns + 1)] for row in table[1:])]
@@ -7,6 +7,7 @@ from sanic import response
 from sanic import Sanic
 
 from plex.api.v1.routes import v1_routes
+from plex.core.analyzer import SanicAnalyzer
 from plex.core.constants import ACCESS_LOG
 from plex.core.constants import CORS_ORIGIN_STR
 from plex.core.constants import DEBUG_MODE
@@ -15,7 +16,9 @@ from plex.core.constants import MONGO_DB
 from plex.core.constants import MONGO_URI
 from plex.core.constants import PORT
 from plex.core.constants import WORKERS
+from plex.core.conversion import ConversionPool
 from plex.core.db.utils import SanicMotor
+from plex.core.jobs import AnalysisJobQueue
 from plex.core.utils import build_cors_origins
 
 
@@ -40,6 +43,18 @@ def create_app(app_name: str) -> Sanic:
     # in memory database client
     SanicMotor().init_app(app=app)
 
+    # share a single analyzer and LLM
+    # http client across all requests
+    SanicAnalyzer().init_app(app=app)
+
+    # convert uploaded source files
+    # without blocking the event loop
+    ConversionPool().init_app(app=app)
+
+    # run queued analysis jobs on a
+    # bounded pool of background tasks
+    AnalysisJobQueue().init_app(app=app)
+
     # noinspection PyUnusedLocal
     @app.get("/")
     async def healthcheck(request: Request) -> HTTPResponse:
@@ -0,0 +1,64 @@
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+
+from sanic import Request
+
+from plex.shared.exceptions.source import InvalidQueryParameterError
+
+
+def parse_group_by(request: Request, fields: tuple[str, ...]) -> list[str]:
+    """Parses the comma separated `group_by` query parameter of an aggregation endpoint.
+
+    Args:
+        request (Request): incoming request
+        fields (tuple[str, ...]): supported grouping fields, all of which are used if the parameter is not given
+
+    Returns:
+        list[str]: fields to group by
+
+    Raises:
+        InvalidQueryParameterError: If an unsupported field is given
+    """
+
+    if not request.args.get("group_by"):
+        return list(fields)
+
+    group_by = [field.strip() for field in request.args.get("group_by").split(",") if field.strip()]
+    invalid_fields = [field for field in group_by if field not in fields]
+    if invalid_fields or not group_by:
+        raise InvalidQueryParameterError(
+            f"Unknown grouping fields {invalid_fields}. Supported fields are {list(fields)}",
+        )
+
+    return group_by
+
+
+def parse_created_at_range(request: Request) -> dict[str, Any]:
+    """Parses the `since` and `until` query parameters into a mongodb filter on the creation timestamp.
+
+    Args:
+        request (Request): incoming request
+
+    Returns:
+        dict[str, Any]: filter on `created_at`, empty if neither bound is given
+
+    Raises:
+        InvalidQueryParameterError: If a bound is not an ISO 8601 timestamp
+    """
+
+    created_at: dict[str, datetime] = {}
+    for bound, operator in (("since", "$gte"), ("until", "$lt")):
+        if not request.args.get(bound):
+            continue
+
+        try:
+            timestamp = datetime.fromisoformat(request.args.get(bound))
+
+        except ValueError as e:
+            raise InvalidQueryParameterError(f"The {bound} timestamp must be in the ISO 8601 format") from e
+
+        # naive timestamps are taken as UTC
+        created_at[operator] = timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=UTC)
+
+    return {"created_at": created_at} if created_at else {}
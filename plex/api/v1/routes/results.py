@@ -1,22 +1,92 @@
+import asyncio
 import json
+import uuid
+from typing import Any
 
 from sanic import Blueprint
 from sanic import HTTPResponse
 from sanic import Request
+from sanic import Sanic
 from sanic import response
 from sanic.log import logger
 from sanic.request import File
 
+from plex.api.v1.queries import parse_created_at_range
+from plex.api.v1.queries import parse_group_by
+from plex.core.constants import DEEPSEEK_LLM_MODEL
+from plex.core.constants import EVALUATION_BATCH_CONCURRENCY
+from plex.core.constants import EVALUATION_BATCH_MAX_PAIRS
+from plex.core.constants import EXTRACTOR_PROMPT_VERSION
+from plex.core.constants import UPLOAD_MAX_SIZE
+from plex.core.db.collections.evaluation import EVALUATION_GROUP_FIELDS
+from plex.core.db.collections.evaluation import EVALUATION_TREND_INTERVALS
+from plex.core.db.collections.evaluation import EvaluationCollection
+from plex.core.evaluation import aggregate_evaluations
+from plex.core.evaluation import evaluate_pair
+from plex.core.evaluation import read_evaluation_archive
+from plex.core.evaluation import read_evaluation_manifest
+from plex.core.types import EvaluationPair
+from plex.core.types import EvaluationRecord
 from plex.core.utils import evaluate_extracted_vs_reference
 from plex.core.utils import load_csv
+from plex.shared.exceptions.base import PLEXError
 from plex.shared.exceptions.results import ColumnCountMismatchError
 from plex.shared.exceptions.results import CSVParsingError
 from plex.shared.exceptions.results import DataFileNotSpecifiedError
 from plex.shared.exceptions.results import InsufficientDataPointsError
+from plex.shared.exceptions.results import InvalidEvaluationManifestError
+from plex.shared.exceptions.results import TooManyEvaluationPairsError
+from plex.shared.exceptions.source import InvalidQueryParameterError
 
 results = Blueprint("results", url_prefix="/results")
 
 
+def _evaluation_record(
+    request: Request,
+    source: str,
+    reference: str,
+    evaluation_result: dict[str, Any],
+    batch_id: str | None = None,
+) -> EvaluationRecord:
+    # extracted data is assumed to come from the current
+    # model and prompt unless the client states otherwise
+    record: EvaluationRecord = {
+        "evaluation_id": uuid.uuid4().hex,
+        "source": source,
+        "reference": reference,
+        "model": request.form.get("model") or DEEPSEEK_LLM_MODEL,
+        "prompt_version": request.form.get("prompt_version") or EXTRACTOR_PROMPT_VERSION,
+        # the alignment report grows with the tables,
+        # hence only the scores and counts are kept
+        "results": {key: value for key, value in evaluation_result.items() if key != "alignment"},
+    }
+
+    if batch_id:
+        record["batch_id"] = batch_id
+
+    return record
+
+
+# noinspection PyBroadException
+async def _store_evaluations(evaluations: list[EvaluationRecord], app: Sanic) -> None:
+    # evaluations are returned even
+    # if they could not be stored
+    try:
+        await EvaluationCollection.add_many(evaluations=evaluations, app=app)
+
+    except Exception:
+        logger.exception("Failed to store the evaluations")
+
+
+def _parse_evaluation_filters(request: Request) -> dict[str, Any]:
+    filters: dict[str, Any] = {
+        field: request.args.get(field)
+        for field in ("model", "prompt_version", "source", "reference")
+        if request.args.get(field)
+    }
+    return {**filters, **parse_created_at_range(request)}
+
+
 # noinspection PyBroadException
 @results.post("/evaluate")
 async def evaluate_results(request: Request) -> HTTPResponse:
@@ -40,7 +110,7 @@ async def evaluate_results(request: Request) -> HTTPResponse:
         source_file_name = request.form.get("source", "Unknown")
         reference_file_name = file.name
 
-        if not extracted_data or not reference_data:
+        if not extracted_data or reference_data.empty:
             raise DataFileNotSpecifiedError("Extracted and reference data cannot be empty")
 
         evaluation_result = evaluate_extracted_vs_reference(
@@ -50,7 +120,15 @@ async def evaluate_results(request: Request) -> HTTPResponse:
             reference=reference_file_name,
         )
 
-        return response.json({"results": evaluation_result})
+        record = _evaluation_record(
+            request=request,
+            source=source_file_name,
+            reference=reference_file_name,
+            evaluation_result=evaluation_result,
+        )
+        await _store_evaluations(evaluations=[record], app=request.app)
+
+        return response.json({"results": evaluation_result, "evaluation_id": record["evaluation_id"]})
 
     except (DataFileNotSpecifiedError, InsufficientDataPointsError, ColumnCountMismatchError) as e:
         logger.exception(e)
@@ -66,3 +144,136 @@ async def evaluate_results(request: Request) -> HTTPResponse:
     except Exception:
         logger.exception("An error occurred during the evaluation")
         return response.json({"error": "An error occurred during the evaluation"}, status=500)
+
+
+async def _evaluate_batch_pair(pair: EvaluationPair, evaluation_slots: asyncio.Semaphore) -> dict[str, Any]:
+    async with evaluation_slots:
+        return await asyncio.to_thread(evaluate_pair, pair)
+
+
+# noinspection PyBroadException
+@results.post("/evaluate/batch")
+async def evaluate_results_batch(request: Request) -> HTTPResponse:
+    try:
+        # pairs are either listed in a manifest with the
+        # reference files attached, or bundled in a zip
+        if "archive" in request.files:
+            archive: File = request.files.get("archive")
+            pairs = await asyncio.to_thread(read_evaluation_archive, archive.body, UPLOAD_MAX_SIZE)
+
+        elif request.form.get("manifest"):
+            pairs = read_evaluation_manifest(
+                manifest=request.form.get("manifest"),
+                attachments=request.files.getlist("attachments") or [],
+            )
+
+        else:
+            raise DataFileNotSpecifiedError("Either an evaluation manifest or an archive must be specified")
+
+        if not pairs:
+            raise DataFileNotSpecifiedError("At least one extracted and reference data pair must be specified")
+
+        if len(pairs) > EVALUATION_BATCH_MAX_PAIRS:
+            raise TooManyEvaluationPairsError(f"At most {EVALUATION_BATCH_MAX_PAIRS} pairs can be evaluated at once")
+
+        evaluation_slots = asyncio.Semaphore(EVALUATION_BATCH_CONCURRENCY)
+        outcomes = await asyncio.gather(
+            *(_evaluate_batch_pair(pair=pair, evaluation_slots=evaluation_slots) for pair in pairs),
+            return_exceptions=True,
+        )
+
+        batch_id = uuid.uuid4().hex
+        statuses: list[dict[str, Any]] = []
+        evaluations: list[dict[str, Any]] = []
+        records: list[EvaluationRecord] = []
+        for pair, outcome in zip(pairs, outcomes):
+            status: dict[str, Any] = {"source": pair["source"], "reference": pair["reference"]}
+
+            if isinstance(outcome, CSVParsingError):
+                logger.warning(outcome.message)
+                status.update(status="failed", error="Could not parse the reference CSV")
+
+            elif isinstance(outcome, PLEXError):
+                logger.warning(outcome.message)
+                status.update(status="failed", error=outcome.message)
+
+            elif isinstance(outcome, BaseException):
+                logger.error(f"An error occurred during the evaluation of '{pair['source']}'", exc_info=outcome)
+                status.update(status="failed", error="An error occurred during the evaluation")
+
+            else:
+                record = _evaluation_record(
+                    request=request,
+                    source=pair["source"],
+                    reference=pair["reference"],
+                    evaluation_result=outcome,
+                    batch_id=batch_id,
+                )
+                status.update(status="evaluated", results=outcome, evaluation_id=record["evaluation_id"])
+                evaluations.append(outcome)
+                records.append(record)
+
+            statuses.append(status)
+
+        await _store_evaluations(evaluations=records, app=request.app)
+
+        return response.json(
+            {"results": statuses, "summary": aggregate_evaluations(evaluations), "batch_id": batch_id},
+        )
+
+    except (DataFileNotSpecifiedError, InvalidEvaluationManifestError, TooManyEvaluationPairsError) as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except Exception:
+        logger.exception("An error occurred during the batch evaluation")
+        return response.json({"error": "An error occurred during the batch evaluation"}, status=500)
+
+
+# noinspection PyBroadException
+@results.get("/evaluations/summary")
+async def summarize_evaluations(request: Request) -> HTTPResponse:
+    try:
+        summary = await EvaluationCollection.summarize(
+            group_by=parse_group_by(request, fields=EVALUATION_GROUP_FIELDS),
+            filters=_parse_evaluation_filters(request),
+            app=request.app,
+        )
+
+        return response.json({"summary": summary})
+
+    except InvalidQueryParameterError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except Exception:
+        logger.exception("An error occurred while summarizing the evaluations")
+        return response.json({"error": "An error occurred while summarizing the evaluations"}, status=500)
+
+
+# noinspection PyBroadException
+@results.get("/evaluations/trends")
+async def evaluation_trends(request: Request) -> HTTPResponse:
+    try:
+        interval = request.args.get("interval", "day")
+        if interval not in EVALUATION_TREND_INTERVALS:
+            raise InvalidQueryParameterError(
+                f"Unknown interval '{interval}'. Supported intervals are {list(EVALUATION_TREND_INTERVALS)}",
+            )
+
+        trends = await EvaluationCollection.trends(
+            group_by=parse_group_by(request, fields=EVALUATION_GROUP_FIELDS),
+            interval=interval,
+            filters=_parse_evaluation_filters(request),
+            app=request.app,
+        )
+
+        return response.json({"interval": interval, "trends": trends})
+
+    except InvalidQueryParameterError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except Exception:
+        logger.exception("An error occurred while computing the evaluation trends")
+        return response.json({"error": "An error occurred while computing the evaluation trends"}, status=500)
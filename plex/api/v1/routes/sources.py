@@ -1,33 +1,107 @@
+import asyncio
+import hashlib
+import math
+from collections.abc import Awaitable
+from collections.abc import Callable
 from datetime import datetime
 from datetime import UTC
+from functools import partial
+from typing import Any
 
 from sanic import Blueprint
 from sanic import HTTPResponse
 from sanic import Request
 from sanic import response
+from sanic import Sanic
 from sanic.log import logger
 from sanic.request import File
 
-from plex.core.analyzer import ReportAnalyzer
+from plex.api.v1.queries import parse_created_at_range
+from plex.api.v1.queries import parse_group_by
+from plex.core.cache import result_cache
+from plex.core.coalescing import analysis_coalescer
+from plex.core.constants import BULK_UPLOAD_CONCURRENCY
+from plex.core.constants import BULK_UPLOAD_MAX_FILES
+from plex.core.constants import CONVERSION_RETRY_AFTER_SECONDS
+from plex.core.constants import SOURCE_MAX_PAGE_SIZE
+from plex.core.constants import SOURCE_PAGE_SIZE
+from plex.core.constants import UPLOAD_MAX_SIZE
+from plex.core.db.collections.analysis_job import AnalysisJobCollection
+from plex.core.db.collections.analysis_usage import ANALYSIS_USAGE_GROUP_FIELDS
+from plex.core.db.collections.analysis_usage import AnalysisUsageCollection
+from plex.core.db.collections.source import SOURCE_FIELDS
+from plex.core.db.collections.source import SOURCE_METADATA_FIELDS
 from plex.core.db.collections.source import SourceCollection
 from plex.core.db.collections.source import SourceFile
+from plex.core.retrieval import split_into_chunks
+from plex.core.streaming import format_sse_event
+from plex.core.types import AnalysisJob
 from plex.core.types import ResultFile
-from plex.core.utils import convert_to_markdown
+from plex.core.uploads import spool_upload
 from plex.core.utils import generate_content_hash
+from plex.shared.exceptions.analyzer import AnalysisJobNotFoundError
+from plex.shared.exceptions.analyzer import LLMRateLimitedError
+from plex.shared.exceptions.analyzer import LLMUnavailableError
+from plex.shared.exceptions.base import PLEXError
+from plex.shared.exceptions.source import ConversionPoolSaturatedError
+from plex.shared.exceptions.source import ConversionTimeoutError
 from plex.shared.exceptions.source import EmptySourceFileContentError
+from plex.shared.exceptions.source import InvalidQueryParameterError
+from plex.shared.exceptions.source import MalformedSourceFileError
+from plex.shared.exceptions.source import PageLimitExceededError
 from plex.shared.exceptions.source import QuarterNotSpecifiedError
 from plex.shared.exceptions.source import SourceFileExistsError
 from plex.shared.exceptions.source import SourceFileNotFoundError
 from plex.shared.exceptions.source import SourceFileNotSpecifiedError
+from plex.shared.exceptions.source import SourceFileTooLargeError
+from plex.shared.exceptions.source import TooManySourceFilesError
 
 sources = Blueprint("sources", url_prefix="/sources")
 
 
+def _parse_pagination(request: Request) -> tuple[int, str | None]:
+    try:
+        limit = int(request.args.get("limit", SOURCE_PAGE_SIZE))
+
+    except ValueError as e:
+        raise InvalidQueryParameterError("The limit must be an integer") from e
+
+    if not 1 <= limit <= SOURCE_MAX_PAGE_SIZE:
+        raise InvalidQueryParameterError(f"The limit must be between 1 and {SOURCE_MAX_PAGE_SIZE}")
+
+    return limit, request.args.get("after") or None
+
+
+def _parse_fields(request: Request) -> list[str] | None:
+    if not request.args.get("fields"):
+        return None
+
+    fields = [field.strip() for field in request.args.get("fields").split(",") if field.strip()]
+    invalid_fields = [field for field in fields if field not in SOURCE_FIELDS]
+    if invalid_fields:
+        raise InvalidQueryParameterError(
+            f"Unknown source fields {invalid_fields}. Supported fields are {SOURCE_FIELDS}",
+        )
+
+    return fields
+
+
 # noinspection PyBroadException
 @sources.get("/")
 async def retrieve_sources(request: Request) -> HTTPResponse:
     try:
-        return response.json({"sources": await SourceCollection.retrieve_all(app=request.app)})
+        limit, after = _parse_pagination(request)
+        source_page, next_after = await SourceCollection.retrieve_all(
+            app=request.app,
+            limit=limit,
+            after=after,
+            fields=_parse_fields(request),
+        )
+        return response.json({"sources": source_page, "next": next_after})
+
+    except InvalidQueryParameterError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
 
     except Exception:
         logger.exception("An error occurred while retrieving sources")
@@ -38,13 +112,56 @@ async def retrieve_sources(request: Request) -> HTTPResponse:
 @sources.get("/names")
 async def retrieve_source_names(request: Request) -> HTTPResponse:
     try:
-        return response.json({"sources": await SourceCollection.retrieve_all_names(app=request.app)})
+        limit, after = _parse_pagination(request)
+        source_names, next_after = await SourceCollection.retrieve_all_names(app=request.app, limit=limit, after=after)
+        return response.json({"sources": source_names, "next": next_after})
+
+    except InvalidQueryParameterError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
 
     except Exception:
         logger.exception("An error occurred while retrieving source names")
         return response.json({"error": "An error occurred while retrieving source names"}, status=500)
 
 
+async def _store_source(
+    file_name: str,
+    file_size: int,
+    raw_hash: str,
+    convert: Callable[[], Awaitable[str]],
+    app: Sanic,
+) -> SourceFile:
+    # re-uploaded files are stored without
+    # converting their content once again
+    duplicate_source = await SourceCollection.retrieve_one_by_raw_hash(raw_hash=raw_hash, app=app)
+
+    if duplicate_source:
+        content = duplicate_source["content"]
+        content_hash = duplicate_source["content_hash"]
+        chunk_index = duplicate_source.get("chunk_index") or await asyncio.to_thread(split_into_chunks, content)
+
+    else:
+        content = await convert()
+        if not content:
+            raise EmptySourceFileContentError("The provided source file content is empty")
+
+        content_hash = generate_content_hash(content)
+        chunk_index = await asyncio.to_thread(split_into_chunks, content)
+
+    source_data: SourceFile = {
+        "file_name": file_name,
+        "file_size": file_size,
+        "content": content,
+        "content_hash": content_hash,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "raw_hash": raw_hash,
+        "chunk_index": chunk_index,
+    }
+
+    return await SourceCollection.add_one(source_data=source_data, app=app)
+
+
 # noinspection PyBroadException
 @sources.post("/")
 async def add_source(request: Request) -> HTTPResponse:
@@ -57,35 +174,270 @@ async def add_source(request: Request) -> HTTPResponse:
             raise SourceFileNotSpecifiedError("A valid source file is not specified")
 
         file: File = attachments[0]
-        content = convert_to_markdown(file)
+        inserted_source = await _store_source(
+            file_name=file.name,
+            file_size=len(file.body),
+            raw_hash=hashlib.sha256(file.body).hexdigest(),
+            convert=partial(
+                request.app.ctx.conversion_pool.convert,
+                body=file.body,
+                file_extension=file.name.split(".")[-1],
+            ),
+            app=request.app,
+        )
+        return response.json({"source": inserted_source})
 
-        if not content:
-            raise EmptySourceFileContentError("The provided source file content is empty")
+    except (SourceFileNotSpecifiedError, EmptySourceFileContentError, MalformedSourceFileError) as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
 
-        source_data: SourceFile = {
-            "file_name": file.name,
-            "file_size": len(file.body),
-            "content": content,
-            "content_hash": generate_content_hash(content),
-            "timestamp": datetime.now(UTC).isoformat(),
-        }
+    except PageLimitExceededError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=413)
+
+    except ConversionTimeoutError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=422)
+
+    except SourceFileExistsError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=409)
+
+    except ConversionPoolSaturatedError as e:
+        logger.warning(e.message)
+        return response.json(
+            {"error": e.message},
+            status=503,
+            headers={"Retry-After": str(CONVERSION_RETRY_AFTER_SECONDS)},
+        )
+
+    except Exception:
+        logger.exception("An error occurred while uploading the source file")
+        return response.json({"error": "An error occurred while uploading the source file"}, status=500)
+
+
+# noinspection PyBroadException
+@sources.post("/stream", stream=True)
+async def add_source_stream(request: Request) -> HTTPResponse:
+    try:
+        upload = await spool_upload(request=request, field_name="attachments", max_size=UPLOAD_MAX_SIZE)
+
+        try:
+            inserted_source = await _store_source(
+                file_name=upload.file_name,
+                file_size=upload.file_size,
+                raw_hash=upload.raw_hash,
+                convert=partial(
+                    request.app.ctx.conversion_pool.convert_file,
+                    path=upload.path,
+                    file_extension=upload.file_extension,
+                ),
+                app=request.app,
+            )
+
+        finally:
+            upload.close()
 
-        inserted_source = await SourceCollection.add_one(source_data=source_data, app=request.app)
         return response.json({"source": inserted_source})
 
-    except (SourceFileNotSpecifiedError, EmptySourceFileContentError) as e:
+    except (SourceFileNotSpecifiedError, EmptySourceFileContentError, MalformedSourceFileError) as e:
         logger.exception(e)
         return response.json({"error": e.message}, status=400)
 
+    except (SourceFileTooLargeError, PageLimitExceededError) as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=413)
+
+    except ConversionTimeoutError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=422)
+
     except SourceFileExistsError as e:
         logger.exception(e)
         return response.json({"error": e.message}, status=409)
 
+    except ConversionPoolSaturatedError as e:
+        logger.warning(e.message)
+        return response.json(
+            {"error": e.message},
+            status=503,
+            headers={"Retry-After": str(CONVERSION_RETRY_AFTER_SECONDS)},
+        )
+
     except Exception:
         logger.exception("An error occurred while uploading the source file")
         return response.json({"error": "An error occurred while uploading the source file"}, status=500)
 
 
+async def _prepare_bulk_source(
+    file: File,
+    raw_hash: str,
+    duplicate_source: SourceFile | None,
+    conversion_slots: asyncio.Semaphore,
+    app: Sanic,
+) -> SourceFile:
+    if duplicate_source:
+        content = duplicate_source["content"]
+        content_hash = duplicate_source["content_hash"]
+        chunk_index = duplicate_source.get("chunk_index") or await asyncio.to_thread(split_into_chunks, content)
+
+    else:
+        async with conversion_slots:
+            content = await app.ctx.conversion_pool.convert(
+                body=file.body,
+                file_extension=file.name.split(".")[-1],
+                wait=True,
+            )
+
+        if not content:
+            raise EmptySourceFileContentError("The provided source file content is empty")
+
+        content_hash = generate_content_hash(content)
+        chunk_index = await asyncio.to_thread(split_into_chunks, content)
+
+    return {
+        "file_name": file.name,
+        "file_size": len(file.body),
+        "content": content,
+        "content_hash": content_hash,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "raw_hash": raw_hash,
+        "chunk_index": chunk_index,
+    }
+
+
+# noinspection PyBroadException
+@sources.post("/bulk")
+async def add_sources(request: Request) -> HTTPResponse:
+    try:
+        if "attachments" not in request.files:
+            raise SourceFileNotSpecifiedError("A valid source file is not specified")
+
+        attachments: list[File] = request.files.getlist("attachments")
+        if not attachments:
+            raise SourceFileNotSpecifiedError("A valid source file is not specified")
+
+        if len(attachments) > BULK_UPLOAD_MAX_FILES:
+            raise TooManySourceFilesError(f"At most {BULK_UPLOAD_MAX_FILES} source files can be uploaded at once")
+
+        statuses: list[dict[str, Any]] = [{"file_name": file.name, "status": "pending"} for file in attachments]
+
+        # only the first attachment of a file name is kept
+        candidates: list[tuple[int, File]] = []
+        file_names = set()
+        for position, file in enumerate(attachments):
+            if file.name in file_names:
+                statuses[position].update(status="failed", error="The source file is attached more than once")
+                continue
+
+            file_names.add(file.name)
+            candidates.append((position, file))
+
+        raw_hashes = [hashlib.sha256(file.body).hexdigest() for _, file in candidates]
+        duplicate_sources = await SourceCollection.retrieve_many_by_raw_hashes(
+            raw_hashes=list(set(raw_hashes)),
+            app=request.app,
+        )
+
+        conversion_slots = asyncio.Semaphore(BULK_UPLOAD_CONCURRENCY)
+        prepared_sources = await asyncio.gather(
+            *(
+                _prepare_bulk_source(
+                    file=file,
+                    raw_hash=raw_hash,
+                    duplicate_source=duplicate_sources.get(raw_hash),
+                    conversion_slots=conversion_slots,
+                    app=request.app,
+                )
+                for (_, file), raw_hash in zip(candidates, raw_hashes)
+            ),
+            return_exceptions=True,
+        )
+
+        converted_sources: list[tuple[int, SourceFile]] = []
+        for (position, file), prepared_source in zip(candidates, prepared_sources):
+            if isinstance(prepared_source, PLEXError):
+                logger.warning(prepared_source.message)
+                statuses[position].update(status="failed", error=prepared_source.message)
+
+            elif isinstance(prepared_source, BaseException):
+                logger.error(
+                    f"An error occurred while converting the source file '{file.name}'",
+                    exc_info=prepared_source,
+                )
+                statuses[position].update(status="failed", error="An error occurred while converting the source file")
+
+            else:
+                converted_sources.append((position, prepared_source))
+
+        existing_hashes = await SourceCollection.retrieve_existing_hashes(
+            content_hashes=[source_data["content_hash"] for _, source_data in converted_sources],
+            app=request.app,
+        )
+
+        new_sources: list[tuple[int, SourceFile]] = []
+        for position, source_data in converted_sources:
+            if (source_data["file_name"], source_data["content_hash"]) in existing_hashes:
+                statuses[position].update(
+                    status="exists",
+                    error="The source file already exists with identical content",
+                )
+            else:
+                new_sources.append((position, source_data))
+
+        write_errors = await SourceCollection.add_many(
+            sources_data=[source_data for _, source_data in new_sources],
+            app=request.app,
+        )
+
+        for index, (position, source_data) in enumerate(new_sources):
+            if index in write_errors:
+                logger.error(f"Failed to persist the source file '{source_data['file_name']}': {write_errors[index]}")
+                statuses[position].update(status="failed", error="Failed to persist the source file")
+                continue
+
+            statuses[position].update(
+                status="created",
+                source={field: source_data[field] for field in SOURCE_METADATA_FIELDS},
+            )
+
+        return response.json({"sources": statuses})
+
+    except (SourceFileNotSpecifiedError, TooManySourceFilesError) as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except Exception:
+        logger.exception("An error occurred while uploading the source files")
+        return response.json({"error": "An error occurred while uploading the source files"}, status=500)
+
+
+def _format_analysis(results: ResultFile) -> dict:
+    return {
+        **results,
+        "timestamp": datetime.fromisoformat(results["timestamp"]).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+async def _enqueue_analyses(
+    request: Request,
+    quarters: list[str],
+    selected_extraction: bool,
+) -> list[AnalysisJob]:
+    if not await SourceCollection.exists(file_name=request.json["report"], app=request.app):
+        raise SourceFileNotFoundError(f"There is no source file named '{request.json['report']}'")
+
+    return [
+        await request.app.ctx.analysis_jobs.enqueue(
+            report=request.json["report"],
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            app=request.app,
+        )
+        for quarter in quarters
+    ]
+
+
 # noinspection PyBroadException
 @sources.post("/analyze")
 async def analyze_source(request: Request) -> HTTPResponse:
@@ -93,28 +445,97 @@ async def analyze_source(request: Request) -> HTTPResponse:
         if "report" not in request.json:
             raise SourceFileNotSpecifiedError("A valid source file is not specified")
 
+        # several quarters can be extracted in one pass
+        if "quarters" in request.json:
+            quarters = request.json["quarters"]
+            if not quarters or not isinstance(quarters, list) or not all(isinstance(_, str) for _ in quarters):
+                raise QuarterNotSpecifiedError("The quarters must be a non-empty list of quarters")
+
+            # job mode enqueues one job per quarter
+            if request.json.get("job", False):
+                jobs = await _enqueue_analyses(
+                    request,
+                    quarters=quarters,
+                    selected_extraction=request.json.get("selected_extraction", False),
+                )
+                return response.json({"jobs": jobs}, status=202)
+
+            source = await SourceCollection.retrieve_one(file_name=request.json["report"], app=request.app)
+            quarter_results = await request.app.ctx.analyzer.run_many(
+                source=source,
+                quarters=quarters,
+                selected_extraction=request.json.get("selected_extraction", False),
+                app=request.app,
+            )
+
+            return response.json(
+                {"analyses": {quarter: _format_analysis(result) for quarter, result in quarter_results.items()}},
+            )
+
         if "quarter" not in request.json:
             raise QuarterNotSpecifiedError("A specific quarter is not specified")
 
-        source = await SourceCollection.retrieve_one(file_name=request.json["report"], app=request.app)
         quarter = request.json["quarter"]
         selected_extraction = request.json.get("selected_extraction", False)
 
-        results: ResultFile = await ReportAnalyzer().run(
+        # job mode returns immediately and the
+        # analysis runs on the background pool
+        if request.json.get("job", False):
+            [job] = await _enqueue_analyses(request, quarters=[quarter], selected_extraction=selected_extraction)
+            return response.json({"job": job}, status=202)
+
+        source = await SourceCollection.retrieve_one(file_name=request.json["report"], app=request.app)
+
+        results: ResultFile = await request.app.ctx.analyzer.run(
             source=source,
             quarter=quarter,
             selected_extraction=selected_extraction,
+            app=request.app,
+        )
+
+        return response.json({"analysis": _format_analysis(results)})
+
+    except (SourceFileNotSpecifiedError, QuarterNotSpecifiedError) as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except SourceFileNotFoundError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=404)
+
+    except LLMRateLimitedError as e:
+        logger.warning(e.message)
+        return response.json(
+            {"error": e.message},
+            status=429,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
         )
 
+    except LLMUnavailableError as e:
+        logger.warning(e.message)
         return response.json(
-            {
-                "analysis": {
-                    **results,
-                    "timestamp": datetime.fromisoformat(results["timestamp"]).strftime("%Y-%m-%d %H:%M:%S"),
-                },
-            },
+            {"error": e.message},
+            status=503,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
         )
 
+    except Exception:
+        logger.exception("An error occurred while analyzing the source file")
+        return response.json({"error": "An error occurred while analyzing the source file"}, status=500)
+
+
+# noinspection PyBroadException
+@sources.post("/analyze/stream")
+async def stream_source_analysis(request: Request) -> HTTPResponse | None:
+    try:
+        if "report" not in request.json:
+            raise SourceFileNotSpecifiedError("A valid source file is not specified")
+
+        if "quarter" not in request.json:
+            raise QuarterNotSpecifiedError("A specific quarter is not specified")
+
+        source = await SourceCollection.retrieve_one(file_name=request.json["report"], app=request.app)
+
     except (SourceFileNotSpecifiedError, QuarterNotSpecifiedError) as e:
         logger.exception(e)
         return response.json({"error": e.message}, status=400)
@@ -126,3 +547,100 @@ async def analyze_source(request: Request) -> HTTPResponse:
     except Exception:
         logger.exception("An error occurred while analyzing the source file")
         return response.json({"error": "An error occurred while analyzing the source file"}, status=500)
+
+    # errors past this point are reported as
+    # events, since the status is already sent
+    stream = await request.respond(
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    await stream.send(format_sse_event("source_loaded", {"report": source["file_name"]}))
+
+    try:
+        async for event, data in request.app.ctx.analyzer.stream(
+            source=source,
+            quarter=request.json["quarter"],
+            selected_extraction=request.json.get("selected_extraction", False),
+            app=request.app,
+        ):
+            if event == "result":
+                data = {"analysis": _format_analysis(data)}
+
+            await stream.send(format_sse_event(event, data))
+
+    except (LLMRateLimitedError, LLMUnavailableError) as e:
+        logger.warning(e.message)
+        await stream.send(format_sse_event("error", {"error": e.message, "retry_after": math.ceil(e.retry_after)}))
+
+    except PLEXError as e:
+        logger.exception(e)
+        await stream.send(format_sse_event("error", {"error": e.message}))
+
+    except Exception:
+        logger.exception("An error occurred while analyzing the source file")
+        await stream.send(format_sse_event("error", {"error": "An error occurred while analyzing the source file"}))
+
+    await stream.eof()
+    return None
+
+
+# noinspection PyBroadException
+@sources.get("/analyze/<job_id:str>")
+async def retrieve_analysis_job(request: Request, job_id: str) -> HTTPResponse:
+    try:
+        job = await AnalysisJobCollection.retrieve_one(job_id=job_id, app=request.app)
+        result = job.pop("result", None)
+
+        return response.json(
+            {
+                "job": {
+                    **job,
+                    "analysis": _format_analysis(result) if result else None,
+                },
+            },
+        )
+
+    except AnalysisJobNotFoundError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=404)
+
+    except Exception:
+        logger.exception("An error occurred while retrieving the analysis job")
+        return response.json({"error": "An error occurred while retrieving the analysis job"}, status=500)
+
+
+# noinspection PyBroadException,PyUnusedLocal
+@sources.get("/analyze/cache")
+async def retrieve_analysis_cache_stats(request: Request) -> HTTPResponse:
+    try:
+        return response.json({"cache": result_cache.stats(), "coalescing": analysis_coalescer.stats()})
+
+    except Exception:
+        logger.exception("An error occurred while retrieving the analysis cache stats")
+        return response.json({"error": "An error occurred while retrieving the analysis cache stats"}, status=500)
+
+
+# noinspection PyBroadException
+@sources.get("/analyze/usage")
+async def retrieve_analysis_usage_stats(request: Request) -> HTTPResponse:
+    try:
+        filters: dict[str, Any] = {
+            field: request.args.get(field)
+            for field in ("model", "prompt_version", "file_name")
+            if request.args.get(field)
+        }
+        usage = await AnalysisUsageCollection.summarize(
+            group_by=parse_group_by(request, fields=ANALYSIS_USAGE_GROUP_FIELDS),
+            filters={**filters, **parse_created_at_range(request)},
+            app=request.app,
+        )
+
+        return response.json({"usage": usage})
+
+    except InvalidQueryParameterError as e:
+        logger.exception(e)
+        return response.json({"error": e.message}, status=400)
+
+    except Exception:
+        logger.exception("An error occurred while retrieving the analysis usage stats")
+        return response.json({"error": "An error occurred while retrieving the analysis usage stats"}, status=500)
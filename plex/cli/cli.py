@@ -17,6 +17,15 @@ def plex_cli() -> None:
     """CLI entrypoint."""
 
 
+def _load_env() -> None:
+    if os.path.isfile(".env"):
+        from plex.core import constants
+
+        click.echo("🔄️ Loading .env variables...")
+        load_dotenv(".env")
+        importlib.reload(constants)
+
+
 # noinspection PyBroadException
 @plex_cli.command()
 def run() -> None:
@@ -25,12 +34,7 @@ def run() -> None:
     try:
         click.echo("▶️ Starting the API Server...")
 
-        if os.path.isfile(".env"):
-            from plex.core import constants
-
-            click.echo("🔄️ Loading .env variables...")
-            load_dotenv(".env")
-            importlib.reload(constants)
+        _load_env()
 
         from plex.shared.db.migrations import MongoMigrations
 
@@ -56,3 +60,51 @@ def run() -> None:
 
     except Exception:
         logger.exception("Unhandled exception occurred")
+
+
+# noinspection PyBroadException
+@plex_cli.command()
+@click.option("--force", is_flag=True, default=False, help="Rebuild the existing chunk indexes as well.")
+def reindex(force: bool) -> None:
+    """Builds the chunk indexes of the source documents."""
+
+    try:
+        _load_env()
+
+        from plex.shared.db.migrations import MongoMigrations
+
+        click.echo("🗂️ Building source chunk indexes...")
+        with MongoMigrations() as migrations:
+            indexed_count = migrations.rebuild_chunk_indexes(force=force)
+
+        click.echo(f"✅ Indexed {indexed_count} source file(s)")
+
+    except Exception:
+        logger.exception("Unhandled exception occurred")
+
+
+# noinspection PyBroadException
+@plex_cli.command()
+@click.option(
+    "--codec",
+    type=click.Choice(["plain", "zlib", "zstd"]),
+    default=None,
+    help="Storage codec to re-encode with. Defaults to PLEX_SOURCE_CONTENT_CODEC.",
+)
+def recompress(codec: str | None) -> None:
+    """Re-encodes the content of the source documents with the configured storage codec."""
+
+    try:
+        _load_env()
+
+        from plex.core.constants import SOURCE_CONTENT_CODEC
+        from plex.shared.db.migrations import MongoMigrations
+
+        click.echo("🗜️ Re-encoding source contents...")
+        with MongoMigrations() as migrations:
+            recompressed_count = migrations.recompress_sources(codec=codec or SOURCE_CONTENT_CODEC)
+
+        click.echo(f"✅ Re-encoded {recompressed_count} source file(s)")
+
+    except Exception:
+        logger.exception("Unhandled exception occurred")
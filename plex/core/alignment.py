@@ -0,0 +1,124 @@
+import re
+from collections import Counter
+from collections import defaultdict
+
+NGRAM_SIZE = 3
+# postings longer than this belong to n-grams too common to
+# discriminate labels, and would make lookups quadratic
+MAX_POSTINGS = 64
+MAX_CANDIDATES = 8
+
+_NON_ALPHANUMERIC_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_label(label: str) -> str:
+    return _NON_ALPHANUMERIC_PATTERN.sub(" ", str(label).lower()).strip()
+
+
+def _ngrams(label: str) -> frozenset[str]:
+    padded = f" {label} "
+    if len(padded) <= NGRAM_SIZE:
+        return frozenset([padded])
+
+    return frozenset(padded[index : index + NGRAM_SIZE] for index in range(len(padded) - NGRAM_SIZE + 1))
+
+
+def _similarity(ngrams: frozenset[str], other_ngrams: frozenset[str]) -> float:
+    return 2 * len(ngrams & other_ngrams) / (len(ngrams) + len(other_ngrams))
+
+
+class NGramIndex:
+    """An inverted index of the character n-grams of labels, i.e. table line items or headers, to look up the labels
+    most similar to a given one without comparing it against all of them."""
+
+    def __init__(self, labels: list[str]) -> None:
+        self._ngrams = [_ngrams(normalize_label(label)) for label in labels]
+        self._postings: defaultdict[str, list[int]] = defaultdict(list)
+        for position, ngrams in enumerate(self._ngrams):
+            for ngram in ngrams:
+                self._postings[ngram].append(position)
+
+    def search(self, label: str, threshold: float) -> list[tuple[float, int]]:
+        """Searches the labels similar to a given one by the dice coefficient of their n-grams.
+
+        Args:
+            label (str): label to search for
+            threshold (float): minimum similarity, between 0 and 1
+
+        Returns:
+            list[tuple[float, int]]: similarities and positions of the most similar labels
+        """
+
+        ngrams = _ngrams(normalize_label(label))
+        shared_counts: Counter[int] = Counter()
+        for ngram in ngrams:
+            postings = self._postings.get(ngram, [])
+            if len(postings) <= MAX_POSTINGS:
+                shared_counts.update(postings)
+
+        # candidates are shortlisted by their shared rare n-grams,
+        # and scored exactly on all of their n-grams afterwards
+        matches = []
+        for position, _ in shared_counts.most_common(MAX_CANDIDATES):
+            similarity = _similarity(ngrams, self._ngrams[position])
+            if similarity >= threshold:
+                matches.append((similarity, position))
+
+        return matches
+
+
+def align_labels(labels: list[str], reference_labels: list[str], threshold: float) -> dict[int, tuple[int, float]]:
+    """Aligns labels one-to-one with the reference labels. Identical labels are aligned first, then labels equal once
+    normalized, then the remaining ones greedily from the most similar pair.
+
+    Args:
+        labels (list[str]): labels to align, i.e. extracted line items
+        reference_labels (list[str]): labels to align with, i.e. reference line items
+        threshold (float): minimum similarity of the aligned labels, between 0 and 1
+
+    Returns:
+        dict[int, tuple[int, float]]: position of the aligned reference label and the similarity by label position
+    """
+
+    alignment: dict[int, tuple[int, float]] = {}
+    aligned_references: set[int] = set()
+
+    for key in (str, normalize_label):
+        reference_positions: dict[str, int] = {}
+        for position, reference_label in enumerate(reference_labels):
+            if position not in aligned_references:
+                reference_positions.setdefault(key(reference_label), position)
+
+        for position, label in enumerate(labels):
+            reference_position = reference_positions.get(key(label))
+            if position in alignment or reference_position is None or reference_position in aligned_references:
+                continue
+
+            alignment[position] = (reference_position, 1.0)
+            aligned_references.add(reference_position)
+
+    if len(alignment) == len(labels) or len(aligned_references) == len(reference_labels):
+        return alignment
+
+    # only the labels left unaligned are indexed
+    # and searched, as most align exactly
+    reference_positions = [position for position in range(len(reference_labels)) if position not in aligned_references]
+    index = NGramIndex([reference_labels[position] for position in reference_positions])
+    candidates = sorted(
+        (
+            (similarity, position, reference_positions[index_position])
+            for position, label in enumerate(labels)
+            if position not in alignment
+            for similarity, index_position in index.search(label, threshold=threshold)
+        ),
+        key=lambda candidate: (-candidate[0], candidate[1], candidate[2]),
+    )
+
+    for similarity, position, reference_position in candidates:
+        if position in alignment or reference_position in aligned_references:
+            continue
+
+        alignment[position] = (reference_position, similarity)
+        aligned_references.add(reference_position)
+
+    return alignment
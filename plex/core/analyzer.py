@@ -1,23 +1,60 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
 from datetime import datetime
 from datetime import UTC
+from functools import partial
 from typing import Annotated
 from typing import Any
 
+import httpx
 from langchain_core.globals import set_debug
 from langchain_core.globals import set_verbose
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
+from sanic import Sanic
+from sanic.log import logger
 
+from plex.core.cache import result_cache
+from plex.core.coalescing import analysis_coalescer
+from plex.core.constants import COALESCING_ENABLED
 from plex.core.constants import DEBUG_MODE
 from plex.core.constants import DEEPSEEK_API_KEY
 from plex.core.constants import DEEPSEEK_LLM_MODEL
 from plex.core.constants import EXTRACTOR_PROMPT
+from plex.core.constants import EXTRACTOR_PROMPT_VERSION
+from plex.core.constants import LLM_HTTP_MAX_CONNECTIONS
+from plex.core.constants import LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS
+from plex.core.constants import LLM_HTTP_TIMEOUT_SECONDS
 from plex.core.constants import LLM_MAX_TOKENS
 from plex.core.constants import LLM_TEMPERATURE
+from plex.core.constants import MAP_REDUCE_CONCURRENCY
+from plex.core.constants import MAP_REDUCE_ENABLED
+from plex.core.constants import MAP_REDUCE_MIN_TOKENS
+from plex.core.constants import MAP_REDUCE_WINDOW_TOKENS
 from plex.core.constants import PLEX_DEEPSEEK_BASE_URL
+from plex.core.constants import PREFILTER_ENABLED
+from plex.core.constants import RESULT_CACHE_ENABLED
+from plex.core.constants import TABLE_EXTRACTION_ENABLED
+from plex.core.constants import TABLE_EXTRACTION_MIN_CONFIDENCE
+from plex.core.db.collections.analysis_usage import AnalysisUsageCollection
 from plex.core.langchain.llm import get_llm
+from plex.core.langchain.scheduler import llm_scheduler
+from plex.core.langchain.usage import add_call_usage
+from plex.core.langchain.usage import empty_usage
+from plex.core.retrieval import estimate_tokens
+from plex.core.retrieval import select_shared_content
+from plex.core.retrieval import split_into_windows
+from plex.core.streaming import PartialRowParser
+from plex.core.tables import extract_profit_and_loss_table
+from plex.core.tables import merge_extractions
+from plex.core.tables import parse_markdown_tables
 from plex.core.types import ResultFile
 from plex.core.types import SourceFile
+from plex.core.types import TableExtraction
+from plex.core.types import TokenUsage
 from plex.core.utils import convert_to_mappable
 
 
@@ -30,11 +67,24 @@ def save_profit_and_loss_statement(
     return None
 
 
+SELECTED_LINE_ITEMS = (
+    'ONLY extract these line items for the {quarter}: "Gross Profit", "Profit Before Tax", "Profit for the Period".'
+)
+
+
+def _estimate_call_tokens(content: str) -> int:
+    return estimate_tokens(EXTRACTOR_PROMPT) + estimate_tokens(content) + LLM_MAX_TOKENS
+
+
+def _needs_map_reduce(content: str) -> bool:
+    return MAP_REDUCE_ENABLED and estimate_tokens(content) > MAP_REDUCE_MIN_TOKENS
+
+
 class ReportAnalyzer:
-    """Given a source financial document, attempts to extract the Profit and Loss statement using forced tool
-    calling."""
+    """Given a source financial document, attempts to extract the Profit and Loss statement from its markdown tables,
+    falling back to forced tool calling when the tables do not confidently hold it."""
 
-    def __init__(self) -> None:
+    def __init__(self, http_async_client: httpx.AsyncClient | None = None) -> None:
         set_verbose(DEBUG_MODE)
         set_debug(DEBUG_MODE)
 
@@ -44,43 +94,158 @@ class ReportAnalyzer:
             temperature=LLM_TEMPERATURE,
             max_tokens=LLM_MAX_TOKENS,
             base_url=PLEX_DEEPSEEK_BASE_URL,
+            http_async_client=http_async_client,
+            # retries are owned by the scheduler, which
+            # honors the limits shared by all the calls
+            max_retries=0,
+        )
+
+        # chains are built once and reused
+        # since they are stateless
+        llm_with_tools = self._llm.bind_tools(
+            [save_profit_and_loss_statement],
+            tool_choice="save_profit_and_loss_statement",
+        )
+        extraction_prompt = ChatPromptTemplate.from_template(EXTRACTOR_PROMPT)
+        self._full_extraction_chain = extraction_prompt.partial(line_items="") | llm_with_tools
+        self._selective_extraction_chain = extraction_prompt.partial(line_items=SELECTED_LINE_ITEMS) | llm_with_tools
+
+        # streamed responses only report their token usage when asked
+        # to, and the option is rejected by non-streamed requests
+        streaming_llm_with_tools = llm_with_tools.bind(stream_options={"include_usage": True})
+        self._full_streaming_chain = extraction_prompt.partial(line_items="") | streaming_llm_with_tools
+        self._selective_streaming_chain = (
+            extraction_prompt.partial(line_items=SELECTED_LINE_ITEMS) | streaming_llm_with_tools
         )
 
+    async def _select_content(self, source: SourceFile, quarters: list[str]) -> str:
+        """Selects the sections of the source document to send to the LLM, shared by all the requested quarters.
+
+        Args:
+            source (dict): source document metadata, including its content
+            quarters (list[str]): quarters which the P&L should be extracted from
+
+        Returns:
+            str: content to extract the P&L statements from
+        """
+
+        content = source["content"]
+        if not PREFILTER_ENABLED:
+            return content
+
+        # selecting from a precomputed index is a cheap
+        # lookup, while splitting needs a full-text pass
+        chunk_index = source.get("chunk_index")
+        if chunk_index:
+            return select_shared_content(content, quarters, chunks=chunk_index)
+
+        return await asyncio.to_thread(select_shared_content, content, quarters)
+
+    @staticmethod
+    async def _extract_tables(
+        source: SourceFile,
+        quarters: list[str],
+        selected_extraction: bool,
+    ) -> dict[str, TableExtraction]:
+        """Extracts the P&L statements of the requested quarters from the markdown tables of the source document,
+        keeping only the confident extractions so that the others fall back to the LLM.
+
+        Args:
+            source (dict): source document metadata, including its content
+            quarters (list[str]): quarters which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+
+        Returns:
+            dict[str, TableExtraction]: confident extractions by quarter
+        """
+
+        if not TABLE_EXTRACTION_ENABLED or "|" not in source["content"]:
+            return {}
+
+        def extract() -> dict[str, TableExtraction]:
+            # tables are parsed once and shared by all the quarters
+            tables = parse_markdown_tables(source["content"])
+            extractions = {
+                quarter: extract_profit_and_loss_table(
+                    source["content"],
+                    quarter=quarter,
+                    selected_extraction=selected_extraction,
+                    tables=tables,
+                )
+                for quarter in quarters
+            }
+            return {
+                quarter: extraction
+                for quarter, extraction in extractions.items()
+                if extraction and extraction["confidence"] >= TABLE_EXTRACTION_MIN_CONFIDENCE
+            }
+
+        return await asyncio.to_thread(extract)
+
+    @staticmethod
+    def _table_result(source: SourceFile, extraction: TableExtraction) -> ResultFile:
+        # table extractions are cheap, hence not cached so that
+        # improved heuristics or the LLM apply to later analyses
+        return {
+            "file_name": source["file_name"],
+            "content": convert_to_mappable(elements=extraction["extracted_items"]),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "confidence": extraction["confidence"],
+        }
+
     async def _extract_profit_and_loss(
         self,
-        source: SourceFile,
+        content: str,
         quarter: str,
         selected_extraction: bool,
+        usage: TokenUsage,
     ) -> list[list[Any]]:
         """Attempts to extract the Profit and Loss statement from the source document using forced tool-calling using a
         langchain based tool.
 
         Args:
-            source (dict): source document metadata, including its content
+            content (str): content of the source document to extract from
             quarter (str): quarter which the P&L should be extracted from
             selected_extraction (bool): whether to perform a selective extraction or not
+            usage (TokenUsage): token usage of the analysis, which the calls add to
 
         Returns:
             list[list[Any]]: A list of lists representing the extracted P&L statement.
                             Each inner list corresponds to a row in the P&L statement.
+
+        Raises:
+            LLMRateLimitedError: If the LLM API is still rate limiting after all retries
+            LLMUnavailableError: If the LLM API keeps failing
         """
 
-        llm_with_tools = self._llm.bind_tools(
-            [save_profit_and_loss_statement],
-            tool_choice="save_profit_and_loss_statement",
-        )
-        extraction_chain = ChatPromptTemplate.from_template(EXTRACTOR_PROMPT) | llm_with_tools
-        line_items = (
-            'ONLY extract these line items for the {quarter}: "Gross '
-            'Profit", "Profit Before Tax", "Profit for the Period".'
+        if _needs_map_reduce(content):
+            return await self._map_reduce_profit_and_loss(
+                content=content,
+                quarter=quarter,
+                selected_extraction=selected_extraction,
+                usage=usage,
+            )
+
+        return await self._invoke_extraction(
+            content=content,
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            usage=usage,
         )
-        result = await extraction_chain.ainvoke(
-            input={
-                "content": source["content"],
-                "quarter": quarter,
-                "line_items": line_items if selected_extraction else "",
-            },
+
+    async def _invoke_extraction(
+        self,
+        content: str,
+        quarter: str,
+        selected_extraction: bool,
+        usage: TokenUsage,
+    ) -> list[list[Any]]:
+        extraction_chain = self._selective_extraction_chain if selected_extraction else self._full_extraction_chain
+        result = await llm_scheduler.run(
+            lambda: extraction_chain.ainvoke(input={"content": content, "quarter": quarter}),
+            estimated_tokens=_estimate_call_tokens(content),
         )
+        add_call_usage(usage, usage_metadata=result.usage_metadata, response_metadata=result.response_metadata)
 
         if result.tool_calls:
             extracted_items: list[list[Any]] = result.tool_calls[0].get("args", {}).get("extracted_items", [])
@@ -89,15 +254,473 @@ class ReportAnalyzer:
 
         return []
 
-    async def run(self, source: SourceFile, quarter: str, selected_extraction: bool = False) -> ResultFile:
+    async def _map_reduce_profit_and_loss(
+        self,
+        content: str,
+        quarter: str,
+        selected_extraction: bool,
+        usage: TokenUsage,
+        on_event: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> list[list[Any]]:
+        """Extracts the Profit and Loss statement of a document too long for a single call, by extracting candidate
+        statements from windows of the content concurrently and merging them locally.
+
+        Args:
+            content (str): content of the source document to extract from
+            quarter (str): quarter which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+            usage (TokenUsage): token usage of the analysis, which the calls add to
+            on_event (Callable[[str, dict[str, Any]], None] | None): receives the `map_started` event
+
+        Returns:
+            list[list[Any]]: A list of lists representing the merged P&L statement.
+
+        Raises:
+            LLMRateLimitedError: If the LLM API is still rate limiting after all retries
+            LLMUnavailableError: If the LLM API keeps failing
+        """
+
+        windows = await asyncio.to_thread(split_into_windows, content, MAP_REDUCE_WINDOW_TOKENS)
+        if on_event:
+            on_event("map_started", {"windows": len(windows)})
+
+        # bounds the fan-out of a single document, while the
+        # scheduler bounds the calls of all the documents
+        window_slots = asyncio.Semaphore(MAP_REDUCE_CONCURRENCY)
+
+        async def extract_window(window: str) -> list[list[Any]]:
+            async with window_slots:
+                return await self._invoke_extraction(
+                    content=window,
+                    quarter=quarter,
+                    selected_extraction=selected_extraction,
+                    usage=usage,
+                )
+
+        extractions = await asyncio.gather(*(extract_window(window) for window in windows), return_exceptions=True)
+
+        # a partial statement would be mistaken for a complete
+        # one, hence a failed window fails the extraction
+        errors = [extraction for extraction in extractions if isinstance(extraction, BaseException)]
+        if errors:
+            raise errors[0]
+
+        return merge_extractions(
+            [extraction for extraction in extractions if not isinstance(extraction, BaseException)],
+        )
+
+    async def _stream_profit_and_loss(
+        self,
+        content: str,
+        quarter: str,
+        selected_extraction: bool,
+        usage: TokenUsage,
+        on_event: Callable[[str, dict[str, Any]], None],
+    ) -> list[list[Any]]:
+        """Extracts the Profit and Loss statement like `_extract_profit_and_loss`, streaming the tool call arguments to
+        report each row as soon as it is generated.
+
+        Args:
+            content (str): content of the source document to extract from
+            quarter (str): quarter which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+            usage (TokenUsage): token usage of the analysis, which the calls add to
+            on_event (Callable[[str, dict[str, Any]], None]): receives the `llm_started` and `row` events, or the
+                `map_started` and `row` events of the merged statement for documents too long for a single call
+
+        Returns:
+            list[list[Any]]: A list of lists representing the extracted P&L statement.
+
+        Raises:
+            LLMRateLimitedError: If the LLM API is still rate limiting after all retries
+            LLMUnavailableError: If the LLM API keeps failing
+        """
+
+        # rows of concurrent windows can only
+        # be reported once they are merged
+        if _needs_map_reduce(content):
+            extracted_items = await self._map_reduce_profit_and_loss(
+                content=content,
+                quarter=quarter,
+                selected_extraction=selected_extraction,
+                usage=usage,
+                on_event=on_event,
+            )
+            for row in extracted_items:
+                on_event("row", {"row": row})
+
+            return extracted_items
+
+        extraction_chain = self._selective_streaming_chain if selected_extraction else self._full_streaming_chain
+        attempt = 0
+
+        async def stream_rows() -> list[list[Any]]:
+            nonlocal attempt
+            attempt += 1
+            # rows of a retried attempt are streamed
+            # again, replacing the previous ones
+            on_event("llm_started", {"attempt": attempt})
+
+            parser = PartialRowParser()
+            arguments = []
+            # usage is only reported by the last chunk
+            usage_metadata = None
+            async for chunk in extraction_chain.astream(input={"content": content, "quarter": quarter}):
+                usage_metadata = chunk.usage_metadata or usage_metadata
+                for tool_call_chunk in chunk.tool_call_chunks:
+                    if tool_call_chunk.get("index") not in (None, 0) or not tool_call_chunk.get("args"):
+                        continue
+
+                    arguments.append(tool_call_chunk["args"])
+                    for row in parser.feed(tool_call_chunk["args"]):
+                        on_event("row", {"row": row})
+
+            add_call_usage(usage, usage_metadata=usage_metadata)
+
+            try:
+                extracted_items = json.loads("".join(arguments)).get("extracted_items", [])
+
+            except (json.JSONDecodeError, AttributeError):
+                extracted_items = parser.rows
+
+            return extracted_items if isinstance(extracted_items, list) else parser.rows
+
+        return await llm_scheduler.run(stream_rows, estimated_tokens=_estimate_call_tokens(content))
+
+    async def run(
+        self,
+        source: SourceFile,
+        quarter: str,
+        selected_extraction: bool = False,
+        app: Sanic | None = None,
+    ) -> ResultFile:
+        """Extracts the P&L statement of the requested quarter, reusing a cached result of an identical analysis when
+        one is available.
+
+        Args:
+            source (dict): source document metadata, including its content
+            quarter (str): quarter which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+            app (Sanic | None): Sanic app holding the mongodb client. Caching is skipped if not provided
+
+        Returns:
+            ResultFile: extracted P&L statement of the source document
+        """
+
+        results = await self.run_many(
+            source=source,
+            quarters=[quarter],
+            selected_extraction=selected_extraction,
+            app=app,
+        )
+        return results[quarter]
+
+    async def run_many(
+        self,
+        source: SourceFile,
+        quarters: list[str],
+        selected_extraction: bool = False,
+        app: Sanic | None = None,
+    ) -> dict[str, ResultFile]:
+        """Extracts the P&L statements of several quarters in one pass, with concurrent extractions over a context
+        selected once and shared by all the quarters. Extractions identical to ones already in flight are coalesced
+        with them.
+
+        Args:
+            source (dict): source document metadata, including its content
+            quarters (list[str]): quarters which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+            app (Sanic | None): Sanic app holding the mongodb client. Caching is skipped if not provided
+
+        Returns:
+            dict[str, ResultFile]: extracted P&L statements of the source document by quarter
+        """
+
+        quarters = list(dict.fromkeys(quarters))
+        use_cache = RESULT_CACHE_ENABLED and app is not None
+        cache_keys = {
+            quarter: result_cache.build_key(
+                content_hash=source["content_hash"],
+                quarter=quarter,
+                selected_extraction=selected_extraction,
+            )
+            for quarter in quarters
+        }
+        results: dict[str, ResultFile] = {}
+
+        if use_cache:
+            for quarter in quarters:
+                cached_result = await result_cache.get(cache_key=cache_keys[quarter], app=app)
+                if cached_result is not None:
+                    results[quarter] = cached_result
+
+        pending_quarters = [quarter for quarter in quarters if quarter not in results]
+        if pending_quarters:
+            table_extractions = await self._extract_tables(
+                source=source,
+                quarters=pending_quarters,
+                selected_extraction=selected_extraction,
+            )
+            results.update(
+                (quarter, self._table_result(source=source, extraction=extraction))
+                for quarter, extraction in table_extractions.items()
+            )
+            pending_quarters = [quarter for quarter in pending_quarters if quarter not in results]
+
+        if pending_quarters:
+            content = await self._select_content(source=source, quarters=pending_quarters)
+            extractions = await asyncio.gather(
+                *(
+                    self._coalesce(
+                        cache_key=cache_keys[quarter],
+                        call=partial(
+                            self._analyze_quarter,
+                            source=source,
+                            content=content,
+                            quarter=quarter,
+                            selected_extraction=selected_extraction,
+                            cache_key=cache_keys[quarter] if use_cache else None,
+                            app=app,
+                        ),
+                        # followers in other workers also poll the
+                        # result cache, hence it must be enabled
+                        app=app if use_cache else None,
+                    )
+                    for quarter in pending_quarters
+                ),
+            )
+            results.update(zip(pending_quarters, extractions))
+
+        # results shared by identical content
+        # may come from another source file
+        return {quarter: {**results[quarter], "file_name": source["file_name"]} for quarter in quarters}
+
+    @staticmethod
+    async def _coalesce(
+        cache_key: str,
+        call: Callable[[], Awaitable[ResultFile]],
+        app: Sanic | None,
+    ) -> ResultFile:
+        if not COALESCING_ENABLED:
+            return await call()
+
+        return await analysis_coalescer.run(key=cache_key, call=call, app=app)
+
+    async def _analyze_quarter(
+        self,
+        source: SourceFile,
+        content: str,
+        quarter: str,
+        selected_extraction: bool,
+        cache_key: str | None,
+        app: Sanic | None,
+    ) -> ResultFile:
+        usage = empty_usage()
         extracted_items = await self._extract_profit_and_loss(
+            content=content,
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            usage=usage,
+        )
+        await self._store_usage(
+            source=source,
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            usage=usage,
+            app=app,
+        )
+        return await self._store_result(
             source=source,
+            extracted_items=extracted_items,
             quarter=quarter,
             selected_extraction=selected_extraction,
+            cache_key=cache_key,
+            app=app,
         )
 
-        return {
+    # noinspection PyBroadException
+    @staticmethod
+    async def _store_usage(
+        source: SourceFile,
+        quarter: str,
+        selected_extraction: bool,
+        usage: TokenUsage,
+        app: Sanic | None,
+    ) -> None:
+        if app is None or not usage["calls"]:
+            return
+
+        # analyses are returned even if
+        # their usage could not be stored
+        try:
+            await AnalysisUsageCollection.add_one(
+                usage={
+                    **usage,
+                    "file_name": source["file_name"],
+                    "content_hash": source["content_hash"],
+                    "quarter": quarter,
+                    "selected_extraction": selected_extraction,
+                    "model": DEEPSEEK_LLM_MODEL,
+                    "prompt_version": EXTRACTOR_PROMPT_VERSION,
+                },
+                app=app,
+            )
+
+        except Exception:
+            logger.exception("Failed to store the token usage of the analysis")
+
+    @staticmethod
+    async def _store_result(
+        source: SourceFile,
+        extracted_items: list[list[Any]],
+        quarter: str,
+        selected_extraction: bool,
+        cache_key: str | None,
+        app: Sanic | None,
+    ) -> ResultFile:
+        result: ResultFile = {
             "file_name": source["file_name"],
             "content": convert_to_mappable(elements=extracted_items),
             "timestamp": datetime.now(UTC).isoformat(),
         }
+
+        # failed extractions are not cached
+        # so that they can be retried
+        if cache_key and extracted_items:
+            await result_cache.set(
+                cache_key=cache_key,
+                content_hash=source["content_hash"],
+                quarter=quarter,
+                selected_extraction=selected_extraction,
+                result=result,
+                app=app,
+            )
+
+        return result
+
+    async def stream(
+        self,
+        source: SourceFile,
+        quarter: str,
+        selected_extraction: bool = False,
+        app: Sanic | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Extracts the P&L statement of the requested quarter like `run`, yielding progress events along the way.
+
+        The events are `cache_hit` or `table_extracted` when the LLM is not needed, `chunks_selected`, `llm_started`
+        (once per attempt) or `map_started` for documents too long for a single call, `row` for each extracted row as
+        soon as the LLM generates it, and finally `result` with the padded P&L statement. Streamed extractions are not
+        coalesced, since duplicates could not stream the rows of the shared call.
+
+        Args:
+            source (dict): source document metadata, including its content
+            quarter (str): quarter which the P&L should be extracted from
+            selected_extraction (bool): whether to perform a selective extraction or not
+            app (Sanic | None): Sanic app holding the mongodb client. Caching is skipped if not provided
+
+        Returns:
+            AsyncIterator[tuple[str, dict[str, Any]]]: names and payloads of the events
+        """
+
+        use_cache = RESULT_CACHE_ENABLED and app is not None
+        cache_key = result_cache.build_key(
+            content_hash=source["content_hash"],
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+        )
+
+        if use_cache:
+            cached_result = await result_cache.get(cache_key=cache_key, app=app)
+            if cached_result is not None:
+                yield "cache_hit", {}
+                yield "result", {**cached_result, "file_name": source["file_name"]}
+                return
+
+        table_extractions = await self._extract_tables(
+            source=source,
+            quarters=[quarter],
+            selected_extraction=selected_extraction,
+        )
+        if quarter in table_extractions:
+            yield "table_extracted", {"confidence": table_extractions[quarter]["confidence"]}
+            yield "result", self._table_result(source=source, extraction=table_extractions[quarter])
+            return
+
+        content = await self._select_content(source=source, quarters=[quarter])
+        yield "chunks_selected", {"tokens": estimate_tokens(content)}
+
+        # the extraction runs in a task which pushes its
+        # events to a queue, closed once the task is done
+        events: asyncio.Queue[tuple[str, dict[str, Any]] | None] = asyncio.Queue()
+        usage = empty_usage()
+        extraction = asyncio.create_task(
+            self._stream_profit_and_loss(
+                content=content,
+                quarter=quarter,
+                selected_extraction=selected_extraction,
+                usage=usage,
+                on_event=lambda event, data: events.put_nowait((event, data)),
+            ),
+        )
+        extraction.add_done_callback(lambda _: events.put_nowait(None))
+
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+
+            extracted_items = await extraction
+
+        finally:
+            # stops the extraction if the
+            # client goes away mid-stream
+            extraction.cancel()
+
+        await self._store_usage(
+            source=source,
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            usage=usage,
+            app=app,
+        )
+        result = await self._store_result(
+            source=source,
+            extracted_items=extracted_items,
+            quarter=quarter,
+            selected_extraction=selected_extraction,
+            cache_key=cache_key if use_cache else None,
+            app=app,
+        )
+        yield "result", result
+
+
+class SanicAnalyzer:
+    """Wraps sanic app with a report analyzer shared by all the requests of a worker, backed by a pooled keep-alive
+    HTTP client for the LLM API."""
+
+    http_client: httpx.AsyncClient
+    app: Sanic
+
+    def __init__(self, app: Sanic = None) -> None:
+        if app:
+            self.init_app(app=app)
+
+    def init_app(self, app: Sanic) -> None:
+        self.app = app
+
+        @app.listener("before_server_start")
+        async def configure_analyzer(_app: Sanic, _loop: Any) -> None:
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(LLM_HTTP_TIMEOUT_SECONDS),
+            )
+            setattr(_app.ctx, "analyzer", ReportAnalyzer(http_async_client=self.http_client))
+            logger.info("[sanic-analyzer] configured ✅")
+
+        @app.listener("after_server_stop")
+        async def close_analyzer(_app: Sanic, _loop: Any) -> None:
+            logger.info("[sanic-analyzer] closing")
+            await self.http_client.aclose()
+            logger.info("[sanic-analyzer] closed ☑️")
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sanic import Sanic
+from sanic.log import logger
+
+from plex.core.constants import DEEPSEEK_LLM_MODEL
+from plex.core.constants import EXTRACTOR_PROMPT_VERSION
+from plex.core.constants import RESULT_CACHE_MAX_ENTRIES
+from plex.core.constants import RESULT_CACHE_TTL_SECONDS
+from plex.core.db.collections.result_cache import ResultCacheCollection
+from plex.core.types import ResultFile
+
+
+class LRUCache:
+    """A size and TTL bounded in-process LRU cache."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self._max_entries:
+            return
+
+        self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class ResultCache:
+    """Caches analysis results keyed on the source content hash and the extraction parameters.
+
+    Lookups go through an in-process LRU tier first and fall back to the mongodb result cache collection, which is
+    shared across all the Sanic workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = RESULT_CACHE_TTL_SECONDS,
+    ) -> None:
+        self._memory = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._memory_hits = 0
+        self._mongo_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def build_key(
+        content_hash: str,
+        quarter: str,
+        selected_extraction: bool,
+        model: str = DEEPSEEK_LLM_MODEL,
+        prompt_version: str = EXTRACTOR_PROMPT_VERSION,
+    ) -> str:
+        """Builds a deterministic cache key from the analysis parameters.
+
+        Args:
+            content_hash (str): hash of the source document content
+            quarter (str): quarter which the P&L is extracted from
+            selected_extraction (bool): whether a selective extraction is performed or not
+            model (str): name of the LLM used for the extraction
+            prompt_version (str): version of the extractor prompt
+
+        Returns:
+            str: sha256 hash of the parameters
+        """
+
+        params = [content_hash, quarter.strip().lower(), bool(selected_extraction), model, prompt_version]
+        return hashlib.sha256(json.dumps(params).encode()).hexdigest()
+
+    async def get(self, cache_key: str, app: Sanic) -> ResultFile | None:
+        result: ResultFile | None = self._memory.get(cache_key)
+        if result is not None:
+            self._memory_hits += 1
+            return result
+
+        try:
+            result = await ResultCacheCollection.retrieve_one(cache_key=cache_key, app=app)
+
+        except Exception:
+            logger.exception("Failed to read from the result cache collection")
+            result = None
+
+        if result is None:
+            self._misses += 1
+            return None
+
+        self._mongo_hits += 1
+        self._memory.set(cache_key, result)
+        return result
+
+    async def set(
+        self,
+        cache_key: str,
+        content_hash: str,
+        quarter: str,
+        selected_extraction: bool,
+        result: ResultFile,
+        app: Sanic,
+    ) -> None:
+        self._memory.set(cache_key, result)
+
+        try:
+            await ResultCacheCollection.add_one(
+                cached_result={
+                    "cache_key": cache_key,
+                    "content_hash": content_hash,
+                    "quarter": quarter,
+                    "selected_extraction": selected_extraction,
+                    "model": DEEPSEEK_LLM_MODEL,
+                    "prompt_version": EXTRACTOR_PROMPT_VERSION,
+                    "result": result,
+                },
+                app=app,
+            )
+
+        except Exception:
+            logger.exception("Failed to write to the result cache collection")
+
+    def stats(self) -> dict[str, Any]:
+        hits = self._memory_hits + self._mongo_hits
+        lookups = hits + self._misses
+        return {
+            "memory_hits": self._memory_hits,
+            "mongo_hits": self._mongo_hits,
+            "hits": hits,
+            "misses": self._misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# process scoped, hence each
+# Sanic worker has its own tier
+result_cache = ResultCache()
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import uuid
+from collections.abc import Awaitable
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from sanic import Sanic
+from sanic.log import logger
+
+from plex.core.constants import COALESCING_LEASE_SECONDS
+from plex.core.constants import COALESCING_LINGER_SECONDS
+from plex.core.constants import COALESCING_POLL_INTERVAL_SECONDS
+from plex.core.db.collections.analysis_lease import AnalysisLeaseCollection
+from plex.core.db.collections.result_cache import ResultCacheCollection
+from plex.core.types import ResultFile
+
+
+class AnalysisCoalescer:
+    """Coalesces identical analyses in flight, so that concurrent duplicates share a single LLM call.
+
+    Within a Sanic worker, duplicates await the task of the first caller. Across Sanic workers, the first caller takes
+    a lease in mongodb, and the others poll the result cache and the lease until the result is handed over, or take
+    over if the lease is released or expires without one.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: float = COALESCING_LEASE_SECONDS,
+        poll_interval: float = COALESCING_POLL_INTERVAL_SECONDS,
+        linger_seconds: float = COALESCING_LINGER_SECONDS,
+    ) -> None:
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.linger_seconds = linger_seconds
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._flights: dict[str, asyncio.Task] = {}
+        self._in_process_hits = 0
+        self._cross_worker_hits = 0
+
+    async def run(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[ResultFile]],
+        app: Sanic | None = None,
+    ) -> ResultFile:
+        """Runs an analysis, or joins an identical one already in flight.
+
+        Args:
+            key (str): result cache key of the analysis
+            call (Callable[[], Awaitable[ResultFile]]): analysis to run, expected to store its result in the result
+                cache when it succeeds. Its result is handed over to the other workers by its lease either way
+            app (Sanic | None): Sanic app holding the mongodb client. Only in-process coalescing is done if not provided
+
+        Returns:
+            ResultFile: result of the analysis
+        """
+
+        flight = self._flights.get(key)
+        if flight is None:
+            # the analysis runs in its own task, so that a
+            # cancelled caller does not cancel the others
+            flight = asyncio.create_task(self._run_across_workers(key=key, call=call, app=app))
+            self._flights[key] = flight
+            flight.add_done_callback(partial(self._finish_flight, key))
+
+        else:
+            self._in_process_hits += 1
+
+        return await asyncio.shield(flight)
+
+    def _finish_flight(self, key: str, flight: asyncio.Task) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+        # marks the outcome as retrieved in
+        # case every caller was cancelled
+        if not flight.cancelled():
+            flight.exception()
+
+    # noinspection PyBroadException
+    async def _run_across_workers(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[ResultFile]],
+        app: Sanic | None,
+    ) -> ResultFile:
+        if app is None:
+            return await call()
+
+        while True:
+            try:
+                acquired = await AnalysisLeaseCollection.acquire(
+                    lease_key=key,
+                    owner=self._owner,
+                    lease_seconds=self.lease_seconds,
+                    app=app,
+                )
+
+            except Exception:
+                logger.exception("Failed to acquire an analysis lease")
+                return await call()
+
+            if acquired:
+                result = None
+                try:
+                    result = await call()
+                    return result
+
+                finally:
+                    await self._release(key=key, result=result, app=app)
+
+            result = await self._wait_for_result(key=key, app=app)
+            if result is not None:
+                self._cross_worker_hits += 1
+                return result
+
+    # noinspection PyBroadException
+    async def _release(self, key: str, result: ResultFile | None, app: Sanic) -> None:
+        try:
+            if result is None:
+                await AnalysisLeaseCollection.release(lease_key=key, owner=self._owner, app=app)
+            else:
+                await AnalysisLeaseCollection.settle(
+                    lease_key=key,
+                    owner=self._owner,
+                    result=result,
+                    linger_seconds=self.linger_seconds,
+                    app=app,
+                )
+
+        except Exception:
+            logger.exception("Failed to release an analysis lease")
+
+    # noinspection PyBroadException
+    async def _wait_for_result(self, key: str, app: Sanic) -> ResultFile | None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            try:
+                result = await ResultCacheCollection.retrieve_one(cache_key=key, app=app)
+                if result is not None:
+                    return result
+
+                # empty results are only handed over by the lease, and
+                # a lease released or expired without one means the
+                # analysis failed, hence it is taken over
+                lease = await AnalysisLeaseCollection.retrieve_one(lease_key=key, app=app)
+                if lease is None:
+                    return None
+
+                if lease.get("result") is not None:
+                    return lease["result"]
+
+            except Exception:
+                logger.exception("Failed to check an analysis lease")
+                return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "in_process_hits": self._in_process_hits,
+            "cross_worker_hits": self._cross_worker_hits,
+        }
+
+
+# process scoped, hence in-process coalescing
+# only spans the requests of a Sanic worker
+analysis_coalescer = AnalysisCoalescer()
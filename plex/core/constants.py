@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 # package configs
@@ -13,6 +14,12 @@ CORS_ORIGIN_STR = str(os.environ.get("PLEX_ROUTER_CORS_ORIGIN", "*")).strip()
 MONGO_URI = os.environ.get("PLEX_MONGO_URI", "")
 MONGO_DB = os.environ.get("PLEX_MONGO_DB", "arcadea_test")
 SOURCE_COLLECTION = os.environ.get("PLEX_SOURCE_COLLECTION", "sources")
+RESULT_CACHE_COLLECTION = os.environ.get("PLEX_RESULT_CACHE_COLLECTION", "result_cache")
+ANALYSIS_JOB_COLLECTION = os.environ.get("PLEX_ANALYSIS_JOB_COLLECTION", "analysis_jobs")
+ANALYSIS_LEASE_COLLECTION = os.environ.get("PLEX_ANALYSIS_LEASE_COLLECTION", "analysis_leases")
+EVALUATION_COLLECTION = os.environ.get("PLEX_EVALUATION_COLLECTION", "evaluations")
+ANALYSIS_USAGE_COLLECTION = os.environ.get("PLEX_ANALYSIS_USAGE_COLLECTION", "analysis_usage")
+SOURCE_CONTENT_CODEC = str(os.environ.get("PLEX_SOURCE_CONTENT_CODEC", "zlib")).strip().lower()
 
 # llm configs
 LLM_TEMPERATURE = max(0.0, min(1.9, float(os.environ.get("PLEX_LLM_MAX_TOKENS", 0.1))))
@@ -20,10 +27,99 @@ LLM_MAX_TOKENS = max(0, min(1000, int(os.environ.get("PLEX_LLM_MAX_TOKENS", 500)
 PLEX_DEEPSEEK_BASE_URL = os.environ.get("PLEX_DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 DEEPSEEK_API_KEY = os.environ.get("PLEX_DEEPSEEK_API_KEY", "")
 DEEPSEEK_LLM_MODEL = os.environ.get("PLEX_DEEPSEEK_LLM_MODEL", "deepseek-chat")
+LLM_HTTP_MAX_CONNECTIONS = max(1, int(os.environ.get("PLEX_LLM_HTTP_MAX_CONNECTIONS", 20)))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = max(1, int(os.environ.get("PLEX_LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 10)))
+LLM_HTTP_TIMEOUT_SECONDS = max(1.0, float(os.environ.get("PLEX_LLM_HTTP_TIMEOUT_SECONDS", 120.0)))
+
+# llm scheduler configs
+LLM_MAX_CONCURRENCY = max(1, int(os.environ.get("PLEX_LLM_MAX_CONCURRENCY", 4)))
+LLM_REQUESTS_PER_MINUTE = max(0, int(os.environ.get("PLEX_LLM_REQUESTS_PER_MINUTE", 120)))
+LLM_TOKENS_PER_MINUTE = max(0, int(os.environ.get("PLEX_LLM_TOKENS_PER_MINUTE", 1000000)))
+LLM_MAX_RETRIES = max(0, int(os.environ.get("PLEX_LLM_MAX_RETRIES", 4)))
+LLM_RETRY_BASE_DELAY_SECONDS = max(0.0, float(os.environ.get("PLEX_LLM_RETRY_BASE_DELAY_SECONDS", 1.0)))
+LLM_RETRY_MAX_DELAY_SECONDS = max(0.0, float(os.environ.get("PLEX_LLM_RETRY_MAX_DELAY_SECONDS", 30.0)))
+LLM_CIRCUIT_BREAKER_THRESHOLD = max(1, int(os.environ.get("PLEX_LLM_CIRCUIT_BREAKER_THRESHOLD", 5)))
+LLM_CIRCUIT_BREAKER_RESET_SECONDS = max(1.0, float(os.environ.get("PLEX_LLM_CIRCUIT_BREAKER_RESET_SECONDS", 30.0)))
+
+# source listing configs
+SOURCE_PAGE_SIZE = max(1, int(os.environ.get("PLEX_SOURCE_PAGE_SIZE", 100)))
+SOURCE_MAX_PAGE_SIZE = max(SOURCE_PAGE_SIZE, int(os.environ.get("PLEX_SOURCE_MAX_PAGE_SIZE", 1000)))
+
+# upload configs
+UPLOAD_MAX_SIZE = max(1, int(os.environ.get("PLEX_UPLOAD_MAX_SIZE_MB", 50))) * 1024 * 1024
+BULK_UPLOAD_MAX_FILES = max(1, int(os.environ.get("PLEX_BULK_UPLOAD_MAX_FILES", 100)))
+BULK_UPLOAD_CONCURRENCY = max(1, int(os.environ.get("PLEX_BULK_UPLOAD_CONCURRENCY", 2)))
+
+# batch evaluation configs
+EVALUATION_BATCH_MAX_PAIRS = max(1, int(os.environ.get("PLEX_EVALUATION_BATCH_MAX_PAIRS", 500)))
+EVALUATION_BATCH_CONCURRENCY = max(1, int(os.environ.get("PLEX_EVALUATION_BATCH_CONCURRENCY", 4)))
+
+# tolerant evaluation configs
+EVALUATION_ABSOLUTE_TOLERANCE = max(0.0, float(os.environ.get("PLEX_EVALUATION_ABSOLUTE_TOLERANCE", 0.0)))
+EVALUATION_RELATIVE_TOLERANCE = max(0.0, float(os.environ.get("PLEX_EVALUATION_RELATIVE_TOLERANCE", 0.001)))
+
+# evaluation alignment configs
+EVALUATION_FUZZY_ALIGNMENT = str(os.environ.get("PLEX_EVALUATION_FUZZY_ALIGNMENT", "true")).lower() == "true"
+EVALUATION_ALIGNMENT_THRESHOLD = min(1.0, max(0.0, float(os.environ.get("PLEX_EVALUATION_ALIGNMENT_THRESHOLD", 0.6))))
+
+# conversion configs
+CONVERSION_PROCESSES = max(1, int(os.environ.get("PLEX_CONVERSION_PROCESSES", 2)))
+CONVERSION_QUEUE_SIZE = max(0, int(os.environ.get("PLEX_CONVERSION_QUEUE_SIZE", 4)))
+CONVERSION_TIMEOUT_SECONDS = max(1.0, float(os.environ.get("PLEX_CONVERSION_TIMEOUT_SECONDS", 120.0)))
+CONVERSION_MAX_PAGES = max(0, int(os.environ.get("PLEX_CONVERSION_MAX_PAGES", 500)))
+CONVERSION_RETRY_AFTER_SECONDS = max(1, int(os.environ.get("PLEX_CONVERSION_RETRY_AFTER_SECONDS", 5)))
+
+# result cache configs
+RESULT_CACHE_ENABLED = str(os.environ.get("PLEX_RESULT_CACHE_ENABLED", "true")).lower() == "true"
+RESULT_CACHE_TTL_SECONDS = max(0, int(os.environ.get("PLEX_RESULT_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60)))
+RESULT_CACHE_MAX_ENTRIES = max(0, int(os.environ.get("PLEX_RESULT_CACHE_MAX_ENTRIES", 256)))
+RESULT_CACHE_MAX_DOCUMENTS = max(0, int(os.environ.get("PLEX_RESULT_CACHE_MAX_DOCUMENTS", 10000)))
+
+# analysis job configs
+ANALYSIS_JOB_CONCURRENCY = max(1, int(os.environ.get("PLEX_ANALYSIS_JOB_CONCURRENCY", 2)))
+ANALYSIS_JOB_POLL_INTERVAL_SECONDS = max(0.1, float(os.environ.get("PLEX_ANALYSIS_JOB_POLL_INTERVAL_SECONDS", 2.0)))
+ANALYSIS_JOB_LEASE_SECONDS = max(1, int(os.environ.get("PLEX_ANALYSIS_JOB_LEASE_SECONDS", 600)))
+# leases are renewed well before they expire
+ANALYSIS_JOB_HEARTBEAT_SECONDS = ANALYSIS_JOB_LEASE_SECONDS / 3
+ANALYSIS_JOB_MAX_ATTEMPTS = max(1, int(os.environ.get("PLEX_ANALYSIS_JOB_MAX_ATTEMPTS", 3)))
+ANALYSIS_JOB_TTL_SECONDS = max(0, int(os.environ.get("PLEX_ANALYSIS_JOB_TTL_SECONDS", 24 * 60 * 60)))
+
+# analysis coalescing configs
+COALESCING_ENABLED = str(os.environ.get("PLEX_COALESCING_ENABLED", "true")).lower() == "true"
+COALESCING_LEASE_SECONDS = max(1.0, float(os.environ.get("PLEX_COALESCING_LEASE_SECONDS", 300.0)))
+COALESCING_POLL_INTERVAL_SECONDS = max(0.1, float(os.environ.get("PLEX_COALESCING_POLL_INTERVAL_SECONDS", 0.5)))
+COALESCING_LINGER_SECONDS = max(1.0, float(os.environ.get("PLEX_COALESCING_LINGER_SECONDS", 5.0)))
+
+# pre-filtering configs
+PREFILTER_ENABLED = str(os.environ.get("PLEX_PREFILTER_ENABLED", "true")).lower() == "true"
+PREFILTER_TOKEN_BUDGET = max(500, int(os.environ.get("PLEX_PREFILTER_TOKEN_BUDGET", 6000)))
+PREFILTER_MIN_SCORE = max(0.0, float(os.environ.get("PLEX_PREFILTER_MIN_SCORE", 4.0)))
+CHUNK_MAX_TOKENS = max(100, int(os.environ.get("PLEX_CHUNK_MAX_TOKENS", 1500)))
+
+# map-reduce extraction configs
+MAP_REDUCE_ENABLED = str(os.environ.get("PLEX_MAP_REDUCE_ENABLED", "true")).lower() == "true"
+MAP_REDUCE_MIN_TOKENS = max(1000, int(os.environ.get("PLEX_MAP_REDUCE_MIN_TOKENS", 24000)))
+MAP_REDUCE_WINDOW_TOKENS = max(500, int(os.environ.get("PLEX_MAP_REDUCE_WINDOW_TOKENS", 8000)))
+MAP_REDUCE_CONCURRENCY = max(1, int(os.environ.get("PLEX_MAP_REDUCE_CONCURRENCY", 4)))
+
+# table extraction configs
+TABLE_EXTRACTION_ENABLED = str(os.environ.get("PLEX_TABLE_EXTRACTION_ENABLED", "true")).lower() == "true"
+TABLE_EXTRACTION_MIN_CONFIDENCE = min(1.0, max(0.0, float(os.environ.get("PLEX_TABLE_EXTRACTION_MIN_CONFIDENCE", 0.8))))
 
 # analyzer configs
 LATEST_AVAILABLE_QUARTER = "Latest Available Quarter"
-EXTRACTOR_PROMPT = """Extract the Profit and Loss Statement for the {quarter} of the latest year from the provided financial statement.
+# the document comes first and the request specific instructions
+# last, so that the analyses of a document share a prompt prefix.
+# pre-filtered documents hold the sections of the requested quarters,
+# hence the prefix is only shared by analyses of the same quarters
+# which the provider can serve from its prefix cache
+EXTRACTOR_PROMPT = """You are given a financial statement, followed by the instructions to extract its Profit and Loss statement.
+
+<financial_statement>
+{content}
+</financial_statement>
+
+Extract the Profit and Loss Statement for the {quarter} of the latest year from the provided financial statement.
 
 Instructions:
 1. Analyze the financial statement to find the consolidated Profit and Loss statement for {quarter}.
@@ -43,8 +139,8 @@ Required Output:
 - Output must be a list of list elements, each sub list representing a extracted row.
 - Preserve financial values with exact precision
 
-<financial_statement>
-{content}
-</financial_statement>
-
 Quarter to strictly extract profit and loss from: {quarter}"""  # noqa: E501
+
+# changes whenever the prompt text changes so that
+# cached results of older prompts are not reused
+EXTRACTOR_PROMPT_VERSION = hashlib.sha256(EXTRACTOR_PROMPT.encode()).hexdigest()[:12]
@@ -0,0 +1,223 @@
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any
+
+from sanic import Sanic
+from sanic.log import logger
+
+from plex.core.constants import CONVERSION_MAX_PAGES
+from plex.core.constants import CONVERSION_PROCESSES
+from plex.core.constants import CONVERSION_QUEUE_SIZE
+from plex.core.constants import CONVERSION_TIMEOUT_SECONDS
+from plex.core.utils import convert_bytes_to_markdown
+from plex.core.utils import convert_file_to_markdown
+from plex.shared.exceptions.source import ConversionPoolSaturatedError
+from plex.shared.exceptions.source import ConversionTimeoutError
+
+
+def _terminate_processes(executor: ProcessPoolExecutor) -> None:
+    # the executor API can only wait for its running conversions,
+    # hence the stuck processes are reached through its private
+    # process table, which is missing once it is shut down
+    processes = getattr(executor, "_processes", None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+
+
+class ConversionPool:
+    """Runs source file conversions on a process pool per Sanic worker, so that converting large files does not block
+    the event loop.
+
+    At most `processes + queue_size` conversions are admitted at a time. A slot is only released once its conversion
+    process actually finishes, so that the pool cannot be overcommitted. When a conversion times out, new conversions
+    are submitted to a fresh process pool, and the processes of the former one are terminated once its other
+    conversions had the time to finish, which releases the slots of the stuck ones.
+    """
+
+    app: Sanic
+    processes: int
+    queue_size: int
+    timeout: float
+    max_pages: int
+
+    def __init__(
+        self,
+        app: Sanic = None,
+        processes: int = CONVERSION_PROCESSES,
+        queue_size: int = CONVERSION_QUEUE_SIZE,
+        timeout: float = CONVERSION_TIMEOUT_SECONDS,
+        max_pages: int = CONVERSION_MAX_PAGES,
+    ) -> None:
+        self.processes = processes
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._in_flight: dict[ProcessPoolExecutor, set[asyncio.Future]] = {}
+        self._retirements: set[asyncio.Task] = set()
+
+        if app:
+            self.init_app(app=app)
+
+    def init_app(self, app: Sanic) -> None:
+        self.app = app
+
+        @app.listener("before_server_start")
+        async def start_conversion_pool(_app: Sanic, _loop: Any) -> None:
+            self._executor = self._create_executor()
+            self._slots = asyncio.Semaphore(self.processes + self.queue_size)
+            setattr(_app.ctx, "conversion_pool", self)
+            logger.info(f"[conversion-pool] started with {self.processes} processes ✅")
+
+        @app.listener("after_server_stop")
+        async def stop_conversion_pool(_app: Sanic, _loop: Any) -> None:
+            logger.info("[conversion-pool] shutting down")
+            for executor in list(self._in_flight):
+                executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("[conversion-pool] shut down ☑️")
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # Sanic workers run an event loop and the motor
+        # client threads, which are not safe to fork
+        executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._in_flight[executor] = set()
+        return executor
+
+    def _replace_executor(self, executor: ProcessPoolExecutor) -> None:
+        # conversions timing out on an already
+        # replaced executor are left to its retirement
+        if executor is not self._executor:
+            return
+
+        self._executor = self._create_executor()
+        retirement = asyncio.create_task(self._retire_executor(executor))
+        self._retirements.add(retirement)
+        retirement.add_done_callback(self._retirements.discard)
+
+    async def _retire_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Terminates the processes of a replaced executor once its conversions finished or exceeded the timeout, so
+        that the processes stuck in a conversion are freed along with their slots.
+
+        Args:
+            executor (ProcessPoolExecutor): executor a conversion timed out on
+        """
+
+        in_flight = self._in_flight.get(executor, set())
+        if in_flight:
+            await asyncio.wait(set(in_flight), timeout=self.timeout)
+
+        # terminated processes break the pool, which
+        # fails their futures and releases the slots
+        stuck_count = sum(not future.done() for future in in_flight)
+        _terminate_processes(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._in_flight.pop(executor, None)
+        logger.warning(f"[conversion-pool] terminated a process pool with {stuck_count} stuck conversion(s)")
+
+    def _release_slot(self, executor: ProcessPoolExecutor, future: asyncio.Future) -> None:
+        self._slots.release()
+        self._in_flight.get(executor, set()).discard(future)
+
+        # marks the outcome of timed out conversions as
+        # retrieved, since nothing awaits them anymore
+        if not future.cancelled():
+            future.exception()
+
+    @property
+    def saturated(self) -> bool:
+        return self._slots.locked()
+
+    async def convert(self, body: bytes, file_extension: str, wait: bool = False) -> str:
+        """Converts the content of a source file to markdown/text on the process pool.
+
+        Args:
+            body (bytes): The source file content
+            file_extension (str): Extension of the source file, i.e. pdf
+            wait (bool): whether to wait for a free slot when the pool is saturated, instead of failing fast
+
+        Returns:
+            str: Markdown text extracted from the source file
+
+        Raises:
+            ConversionPoolSaturatedError: If the pool is saturated and `wait` is not set
+            ConversionTimeoutError: If the conversion does not finish within the timeout
+            PageLimitExceededError: If the PDF file has more pages than allowed
+            MalformedSourceFileError: If the PDF file cannot be parsed
+        """
+
+        return await self._submit(convert_bytes_to_markdown, body, file_extension, wait=wait)
+
+    async def convert_file(self, path: str, file_extension: str, wait: bool = False) -> str:
+        """Converts a locally stored source file to markdown/text on the process pool, without copying its content to
+        the conversion process.
+
+        Args:
+            path (str): Path of the source file
+            file_extension (str): Extension of the source file, i.e. pdf
+            wait (bool): whether to wait for a free slot when the pool is saturated, instead of failing fast
+
+        Returns:
+            str: Markdown text extracted from the source file
+
+        Raises:
+            ConversionPoolSaturatedError: If the pool is saturated and `wait` is not set
+            ConversionTimeoutError: If the conversion does not finish within the timeout
+            PageLimitExceededError: If the PDF file has more pages than allowed
+            MalformedSourceFileError: If the PDF file cannot be parsed
+        """
+
+        return await self._submit(convert_file_to_markdown, path, file_extension, wait=wait)
+
+    async def _submit(
+        self,
+        converter: Callable[[Any, str, int], str],
+        source: Any,
+        file_extension: str,
+        wait: bool,
+    ) -> str:
+        if not wait and self.saturated:
+            raise ConversionPoolSaturatedError
+
+        await self._slots.acquire()
+
+        executor = self._executor
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                executor,
+                converter,
+                source,
+                file_extension,
+                self.max_pages,
+            )
+
+        except Exception as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._replace_executor(executor)
+            raise
+
+        self._in_flight[executor].add(future)
+        future.add_done_callback(partial(self._release_slot, executor))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+
+        except TimeoutError:
+            logger.warning(f"[conversion-pool] a conversion exceeded the {self.timeout}s timeout")
+            self._replace_executor(executor)
+            raise ConversionTimeoutError(f"The source file could not be converted within {self.timeout:g} seconds")
+
+        except BrokenProcessPool:
+            # a process that died abruptly, e.g. out of
+            # memory, leaves the whole pool unusable
+            logger.warning("[conversion-pool] a conversion process terminated abruptly")
+            self._replace_executor(executor)
+            raise
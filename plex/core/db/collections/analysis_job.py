@@ -0,0 +1,175 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import UTC
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from pymongo import ReturnDocument
+from sanic import Sanic
+
+from plex.core.constants import ANALYSIS_JOB_COLLECTION
+from plex.core.constants import ANALYSIS_JOB_LEASE_SECONDS
+from plex.core.constants import ANALYSIS_JOB_MAX_ATTEMPTS
+from plex.core.constants import ANALYSIS_JOB_TTL_SECONDS
+from plex.core.types import AnalysisJob
+from plex.core.types import ResultFile
+from plex.shared.exceptions.analyzer import AnalysisJobNotFoundError
+
+
+def _to_analysis_job(job: dict) -> AnalysisJob:
+    analysis_job: AnalysisJob = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "report": job["report"],
+        "quarter": job["quarter"],
+        "selected_extraction": job["selected_extraction"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+    if job.get("result"):
+        analysis_job["result"] = job["result"]
+
+    if job.get("error"):
+        analysis_job["error"] = job["error"]
+
+    return analysis_job
+
+
+class AnalysisJobCollection:
+    """Performs mongodb operations on the analysis jobs collection."""
+
+    @classmethod
+    async def add_one(cls, job: AnalysisJob, app: Sanic) -> AnalysisJob:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_JOB_COLLECTION]
+        await collection.insert_one(
+            {
+                **job,
+                "attempts": 0,
+                "expires_at": datetime.now(UTC) + timedelta(seconds=ANALYSIS_JOB_TTL_SECONDS),
+            },
+        )
+
+        return _to_analysis_job(dict(job))
+
+    @classmethod
+    async def retrieve_one(cls, job_id: str, app: Sanic) -> AnalysisJob:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_JOB_COLLECTION]
+        res = await collection.find_one({"job_id": job_id})
+        if not res:
+            raise AnalysisJobNotFoundError(f"There is no analysis job with the id '{job_id}'")
+
+        job = dict(res)
+
+        # a job that keeps crashing its worker is
+        # never reclaimed again, so it is reported
+        # as failed once its last lease runs out
+        if (
+            job["status"] == "running"
+            and job.get("attempts", 0) >= ANALYSIS_JOB_MAX_ATTEMPTS
+            and job["lease_expires_at"].replace(tzinfo=UTC) < datetime.now(UTC)
+        ):
+            job["status"] = "failed"
+            job["error"] = "The analysis job was abandoned after exceeding the maximum number of attempts"
+
+        return _to_analysis_job(job)
+
+    @classmethod
+    async def claim_one(cls, worker_id: str, app: Sanic) -> AnalysisJob | None:
+        """Atomically claims the oldest pending job, or a running job whose worker lease has expired.
+
+        Args:
+            worker_id (str): identifier of the claiming worker
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            AnalysisJob | None: the claimed job if one is available
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_JOB_COLLECTION]
+        now = datetime.now(UTC)
+
+        res = await collection.find_one_and_update(
+            filter={
+                "attempts": {"$lt": ANALYSIS_JOB_MAX_ATTEMPTS},
+                "$or": [
+                    {"status": "pending"},
+                    {"status": "running", "lease_expires_at": {"$lt": now}},
+                ],
+            },
+            update={
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=ANALYSIS_JOB_LEASE_SECONDS),
+                    "updated_at": now.isoformat(),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not res:
+            return None
+
+        return _to_analysis_job(dict(res))
+
+    @classmethod
+    async def renew_lease(cls, job_id: str, worker_id: str, app: Sanic) -> bool:
+        """Extends the lease of a running job, unless another worker has reclaimed it since.
+
+        Args:
+            job_id (str): identifier of the job
+            worker_id (str): identifier of the worker running the job
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            bool: whether the worker still holds the lease
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_JOB_COLLECTION]
+        now = datetime.now(UTC)
+
+        res = await collection.update_one(
+            filter={"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            update={"$set": {"lease_expires_at": now + timedelta(seconds=ANALYSIS_JOB_LEASE_SECONDS)}},
+        )
+        return res.matched_count > 0
+
+    @classmethod
+    async def complete_one(cls, job_id: str, worker_id: str, result: ResultFile, app: Sanic) -> bool:
+        return await cls._finish_one(
+            job_id=job_id,
+            worker_id=worker_id,
+            update={"status": "completed", "result": result},
+            app=app,
+        )
+
+    @classmethod
+    async def fail_one(cls, job_id: str, worker_id: str, error: str, app: Sanic) -> bool:
+        return await cls._finish_one(
+            job_id=job_id,
+            worker_id=worker_id,
+            update={"status": "failed", "error": error},
+            app=app,
+        )
+
+    @classmethod
+    async def _finish_one(cls, job_id: str, worker_id: str, update: dict, app: Sanic) -> bool:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_JOB_COLLECTION]
+        now = datetime.now(UTC)
+
+        # a worker whose lease was reclaimed by another one
+        # must not overwrite the outcome of the latter
+        res = await collection.update_one(
+            filter={"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            update={
+                "$set": {
+                    **update,
+                    "updated_at": now.isoformat(),
+                    "expires_at": now + timedelta(seconds=ANALYSIS_JOB_TTL_SECONDS),
+                },
+                "$unset": {"lease_expires_at": "", "worker_id": ""},
+            },
+        )
+        return res.matched_count > 0
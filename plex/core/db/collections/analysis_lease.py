@@ -0,0 +1,82 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import UTC
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+from sanic import Sanic
+
+from plex.core.constants import ANALYSIS_LEASE_COLLECTION
+from plex.core.types import ResultFile
+
+
+class AnalysisLeaseCollection:
+    """Performs mongodb operations on the analysis leases collection, which marks the analyses in flight across all
+    the Sanic workers."""
+
+    @classmethod
+    async def acquire(cls, lease_key: str, owner: str, lease_seconds: float, app: Sanic) -> bool:
+        """Atomically acquires the lease of an analysis, unless another owner holds an unexpired one.
+
+        Args:
+            lease_key (str): key of the analysis
+            owner (str): identifier of the acquiring worker
+            lease_seconds (float): duration of the lease
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            bool: whether the lease was acquired
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_LEASE_COLLECTION]
+        now = datetime.now(UTC)
+
+        # an unexpired lease does not match the filter, hence
+        # the upsert conflicts with it on the unique index
+        try:
+            await collection.update_one(
+                filter={"lease_key": lease_key, "expires_at": {"$lt": now}},
+                update={
+                    "$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_seconds)},
+                    "$unset": {"result": ""},
+                },
+                upsert=True,
+            )
+
+        except DuplicateKeyError:
+            return False
+
+        return True
+
+    @classmethod
+    async def retrieve_one(cls, lease_key: str, app: Sanic) -> dict | None:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_LEASE_COLLECTION]
+        res = await collection.find_one(
+            {"lease_key": lease_key, "expires_at": {"$gt": datetime.now(UTC)}},
+            projection={"_id": 0, "result": 1},
+        )
+        return dict(res) if res else None
+
+    @classmethod
+    async def settle(cls, lease_key: str, owner: str, result: ResultFile, linger_seconds: float, app: Sanic) -> None:
+        """Ends the lease of an analysis with its result, which the lease keeps for a while so that the waiting workers
+        pick it up, including the empty results that the result cache does not store.
+
+        Args:
+            lease_key (str): key of the analysis
+            owner (str): identifier of the worker holding the lease
+            result (ResultFile): result of the analysis
+            linger_seconds (float): duration the result is kept for
+            app (Sanic): Sanic app holding the mongodb client
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_LEASE_COLLECTION]
+        await collection.update_one(
+            filter={"lease_key": lease_key, "owner": owner},
+            update={"$set": {"result": result, "expires_at": datetime.now(UTC) + timedelta(seconds=linger_seconds)}},
+        )
+
+    @classmethod
+    async def release(cls, lease_key: str, owner: str, app: Sanic) -> None:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_LEASE_COLLECTION]
+        await collection.delete_one({"lease_key": lease_key, "owner": owner})
@@ -0,0 +1,88 @@
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from sanic import Sanic
+
+from plex.core.constants import ANALYSIS_USAGE_COLLECTION
+from plex.core.types import AnalysisUsage
+
+ANALYSIS_USAGE_GROUP_FIELDS = ("model", "prompt_version", "selected_extraction")
+
+
+def _ratio(numerator: str, denominator: str) -> dict[str, Any]:
+    return {"$cond": [{"$gt": [denominator, 0]}, {"$divide": [numerator, denominator]}, 0]}
+
+
+class AnalysisUsageCollection:
+    """Performs mongodb operations on the analysis usage collection."""
+
+    @classmethod
+    async def add_one(cls, usage: AnalysisUsage, app: Sanic) -> None:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_USAGE_COLLECTION]
+        await collection.insert_one({**usage, "created_at": datetime.now(UTC)})
+
+    @classmethod
+    async def summarize(
+        cls,
+        group_by: list[str],
+        filters: dict[str, Any],
+        app: Sanic,
+    ) -> list[dict[str, Any]]:
+        """Aggregates the token usage of the recorded analyses per group, i.e. per model and prompt version.
+
+        Args:
+            group_by (list[str]): analysis fields to group by, out of `ANALYSIS_USAGE_GROUP_FIELDS`
+            filters (dict[str, Any]): query the analyses are matched against before grouping
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            list[dict[str, Any]]: summed and per analysis token usage, along with the share of cached prompt tokens
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[ANALYSIS_USAGE_COLLECTION]
+        pipeline = [
+            {"$match": filters},
+            {
+                "$group": {
+                    "_id": {field: f"${field}" for field in group_by},
+                    "analyses": {"$sum": 1},
+                    "calls": {"$sum": "$calls"},
+                    "prompt_tokens": {"$sum": "$prompt_tokens"},
+                    "completion_tokens": {"$sum": "$completion_tokens"},
+                    "cached_tokens": {"$sum": "$cached_tokens"},
+                    "first_analyzed_at": {"$min": "$created_at"},
+                    "last_analyzed_at": {"$max": "$created_at"},
+                },
+            },
+            {"$sort": {"last_analyzed_at": -1}},
+            {
+                "$project": {
+                    "_id": 0,
+                    **{field: f"$_id.{field}" for field in group_by},
+                    "analyses": 1,
+                    "calls": 1,
+                    "prompt_tokens": 1,
+                    "completion_tokens": 1,
+                    "cached_tokens": 1,
+                    "cache_hit_ratio": _ratio("$cached_tokens", "$prompt_tokens"),
+                    "per_analysis": {
+                        "calls": _ratio("$calls", "$analyses"),
+                        "prompt_tokens": _ratio("$prompt_tokens", "$analyses"),
+                        "completion_tokens": _ratio("$completion_tokens", "$analyses"),
+                        "cached_tokens": _ratio("$cached_tokens", "$analyses"),
+                    },
+                    "first_analyzed_at": 1,
+                    "last_analyzed_at": 1,
+                },
+            },
+        ]
+
+        summary = []
+        async for document in collection.aggregate(pipeline):
+            for field in ("first_analyzed_at", "last_analyzed_at"):
+                document[field] = document[field].replace(tzinfo=UTC).isoformat()
+            summary.append(document)
+
+        return summary
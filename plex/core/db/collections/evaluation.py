@@ -0,0 +1,170 @@
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from sanic import Sanic
+
+from plex.core.constants import EVALUATION_COLLECTION
+from plex.core.types import EvaluationRecord
+
+EVALUATION_GROUP_FIELDS = ("model", "prompt_version")
+EVALUATION_TREND_INTERVALS = ("day", "week", "month")
+
+
+def _ratio(numerator: Any, denominator: Any) -> dict[str, Any]:
+    return {"$cond": [{"$gt": [denominator, 0]}, {"$divide": [numerator, denominator]}, 0]}
+
+
+def _micro_scores(true_positives: str, false_positives: str, false_negatives: str) -> dict[str, Any]:
+    return {
+        "precision": _ratio(true_positives, {"$add": [true_positives, false_positives]}),
+        "recall": _ratio(true_positives, {"$add": [true_positives, false_negatives]}),
+        "f1-score": _ratio(
+            {"$multiply": [2, true_positives]},
+            {"$add": [{"$multiply": [2, true_positives]}, false_positives, false_negatives]},
+        ),
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+    }
+
+
+def _accuracy_stages(group_id: dict[str, Any], sort: dict[str, int]) -> list[dict[str, Any]]:
+    # scores are averaged and counts summed within mongodb,
+    # so only one document per group leaves the server
+    return [
+        {
+            "$group": {
+                "_id": group_id,
+                "evaluations": {"$sum": 1},
+                "precision": {"$avg": "$results.precision"},
+                "recall": {"$avg": "$results.recall"},
+                "f1_score": {"$avg": "$results.f1-score"},
+                "min_f1_score": {"$min": "$results.f1-score"},
+                "max_f1_score": {"$max": "$results.f1-score"},
+                "true_positives": {"$sum": "$results.true_positives"},
+                "false_positives": {"$sum": "$results.false_positives"},
+                "false_negatives": {"$sum": "$results.false_negatives"},
+                "tolerant_f1_score": {"$avg": "$results.tolerant.f1-score"},
+                "tolerant_true_positives": {"$sum": "$results.tolerant.true_positives"},
+                "tolerant_false_positives": {"$sum": "$results.tolerant.false_positives"},
+                "tolerant_false_negatives": {"$sum": "$results.tolerant.false_negatives"},
+                "first_evaluated_at": {"$min": "$created_at"},
+                "last_evaluated_at": {"$max": "$created_at"},
+            },
+        },
+        {"$sort": sort},
+        {
+            "$project": {
+                "_id": 0,
+                **{field: f"$_id.{field}" for field in group_id},
+                "evaluations": 1,
+                "macro": {
+                    "precision": "$precision",
+                    "recall": "$recall",
+                    "f1-score": "$f1_score",
+                    "min_f1-score": "$min_f1_score",
+                    "max_f1-score": "$max_f1_score",
+                },
+                "micro": _micro_scores("$true_positives", "$false_positives", "$false_negatives"),
+                "tolerant": {
+                    "macro": {"f1-score": "$tolerant_f1_score"},
+                    "micro": _micro_scores(
+                        "$tolerant_true_positives",
+                        "$tolerant_false_positives",
+                        "$tolerant_false_negatives",
+                    ),
+                },
+                "first_evaluated_at": 1,
+                "last_evaluated_at": 1,
+            },
+        },
+    ]
+
+
+def _to_accuracy(document: dict) -> dict[str, Any]:
+    accuracy = dict(document)
+    for field in ("period", "first_evaluated_at", "last_evaluated_at"):
+        if isinstance(accuracy.get(field), datetime):
+            accuracy[field] = accuracy[field].replace(tzinfo=UTC).isoformat()
+
+    return accuracy
+
+
+class EvaluationCollection:
+    """Performs mongodb operations on the evaluations collection."""
+
+    @classmethod
+    async def add_many(cls, evaluations: list[EvaluationRecord], app: Sanic) -> None:
+        if not evaluations:
+            return
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[EVALUATION_COLLECTION]
+        created_at = datetime.now(UTC)
+
+        await collection.insert_many(
+            [{**evaluation, "created_at": created_at} for evaluation in evaluations],
+            ordered=False,
+        )
+
+    @classmethod
+    async def summarize(
+        cls,
+        group_by: list[str],
+        filters: dict[str, Any],
+        app: Sanic,
+    ) -> list[dict[str, Any]]:
+        """Aggregates the accuracy of the stored evaluations per group, i.e. per model and prompt version.
+
+        Args:
+            group_by (list[str]): evaluation fields to group by, out of `EVALUATION_GROUP_FIELDS`
+            filters (dict[str, Any]): query the evaluations are matched against before grouping
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            list[dict[str, Any]]: macro averaged scores and micro scores of the summed counts per group
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[EVALUATION_COLLECTION]
+        group_id = {field: f"${field}" for field in group_by}
+        pipeline = [
+            {"$match": filters},
+            *_accuracy_stages(group_id=group_id, sort={"last_evaluated_at": -1}),
+        ]
+
+        return [_to_accuracy(document) async for document in collection.aggregate(pipeline)]
+
+    @classmethod
+    async def trends(
+        cls,
+        group_by: list[str],
+        interval: str,
+        filters: dict[str, Any],
+        app: Sanic,
+    ) -> list[dict[str, Any]]:
+        """Aggregates the accuracy of the stored evaluations per group and period, to track quality regressions of
+        models and prompt versions over time.
+
+        Args:
+            group_by (list[str]): evaluation fields to group by, out of `EVALUATION_GROUP_FIELDS`
+            interval (str): length of the periods, out of `EVALUATION_TREND_INTERVALS`
+            filters (dict[str, Any]): query the evaluations are matched against before grouping
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            list[dict[str, Any]]: macro averaged scores and micro scores of the summed counts per group and period,
+                ordered by period
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[EVALUATION_COLLECTION]
+        group_id = {
+            **{field: f"${field}" for field in group_by},
+            "period": {"$dateTrunc": {"date": "$created_at", "unit": interval}},
+        }
+        pipeline = [
+            {"$match": filters},
+            *_accuracy_stages(group_id=group_id, sort={"_id.period": 1, **{f"_id.{field}": 1 for field in group_by}}),
+        ]
+
+        return [_to_accuracy(document) async for document in collection.aggregate(pipeline)]
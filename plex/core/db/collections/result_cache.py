@@ -0,0 +1,70 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import UTC
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from sanic import Sanic
+
+from plex.core.constants import RESULT_CACHE_COLLECTION
+from plex.core.constants import RESULT_CACHE_MAX_DOCUMENTS
+from plex.core.constants import RESULT_CACHE_TTL_SECONDS
+from plex.core.types import CachedResult
+from plex.core.types import ResultFile
+
+
+class ResultCacheCollection:
+    """Performs mongodb operations on the result cache collection."""
+
+    @classmethod
+    async def retrieve_one(cls, cache_key: str, app: Sanic) -> ResultFile | None:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[RESULT_CACHE_COLLECTION]
+
+        # the TTL monitor only runs periodically, hence
+        # expired entries are filtered out explicitly
+        res = await collection.find_one(
+            {"cache_key": cache_key, "expires_at": {"$gt": datetime.now(UTC)}},
+            projection={"result": 1},
+        )
+        if not res:
+            return None
+
+        result = dict(res)["result"]
+        return {
+            "file_name": result["file_name"],
+            "content": result["content"],
+            "timestamp": result["timestamp"],
+        }
+
+    @classmethod
+    async def add_one(cls, cached_result: CachedResult, app: Sanic) -> None:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[RESULT_CACHE_COLLECTION]
+        created_at = datetime.now(UTC)
+
+        await collection.update_one(
+            filter={"cache_key": cached_result["cache_key"]},
+            update={
+                "$set": {
+                    **cached_result,
+                    "created_at": created_at,
+                    "expires_at": created_at + timedelta(seconds=RESULT_CACHE_TTL_SECONDS),
+                },
+            },
+            upsert=True,
+        )
+
+        await cls._evict_oldest(collection=collection)
+
+    @classmethod
+    async def _evict_oldest(cls, collection: AsyncIOMotorCollection) -> None:
+        if not RESULT_CACHE_MAX_DOCUMENTS:
+            return
+
+        overflow = await collection.estimated_document_count() - RESULT_CACHE_MAX_DOCUMENTS
+        if overflow <= 0:
+            return
+
+        oldest = collection.find({}, projection={"_id": 1}).sort("created_at", ASCENDING).limit(overflow)
+        oldest_ids = [doc["_id"] async for doc in oldest]
+        if oldest_ids:
+            await collection.delete_many({"_id": {"$in": oldest_ids}})
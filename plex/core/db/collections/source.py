@@ -1,43 +1,160 @@
+import asyncio
+import zlib
+from typing import Any
+
+from bson import Binary
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from sanic import Sanic
+from sanic.log import logger
 
 from plex.core.constants import SOURCE_COLLECTION
+from plex.core.constants import SOURCE_CONTENT_CODEC
+from plex.core.constants import SOURCE_PAGE_SIZE
 from plex.core.types import SourceFile
 from plex.shared.exceptions.source import SourceFileExistsError
 from plex.shared.exceptions.source import SourceFileNotFoundError
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SOURCE_FIELDS = ["file_name", "file_size", "content", "content_hash", "timestamp"]
+SOURCE_METADATA_FIELDS = [field for field in SOURCE_FIELDS if field != "content"]
+
+
+def encode_content(content: str, codec: str = SOURCE_CONTENT_CODEC) -> tuple[str | Binary, str]:
+    """Encodes the markdown content of a source for storage using the given codec.
+
+    Falls back to zlib if zstd is requested but the `zstandard` package is not installed.
+
+    Args:
+        content (str): markdown content of the source
+        codec (str): storage codec, one of plain, zlib or zstd
+
+    Returns:
+        tuple[str | Binary, str]: encoded content and the codec actually used
+    """
+
+    if codec == "zstd" and zstandard is None:
+        logger.warning("The zstandard package is not installed, falling back to the zlib codec")
+        codec = "zlib"
+
+    if codec == "zstd":
+        return Binary(zstandard.ZstdCompressor(level=3).compress(content.encode())), codec
+
+    if codec == "zlib":
+        return Binary(zlib.compress(content.encode(), level=6)), codec
+
+    return content, "plain"
+
+
+def decode_content(content: str | bytes, codec: str | None) -> str:
+    """Decodes the stored markdown content of a source. Sources stored before codecs were introduced have no codec
+    and hold plain text.
+
+    Args:
+        content (str | bytes): stored content
+        codec (str | None): storage codec the content was encoded with
+
+    Returns:
+        str: markdown content of the source
+    """
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to decode zstd compressed sources")
+        return zstandard.ZstdDecompressor().decompress(content).decode()
+
+    if codec == "zlib":
+        return zlib.decompress(content).decode()
+
+    return content
+
+
+async def _to_document(source_data: SourceFile) -> dict[str, Any]:
+    # compression releases the GIL, hence it
+    # is run off the event loop for large files
+    content, codec = await asyncio.to_thread(encode_content, source_data["content"])
+    return {**source_data, "content": content, "content_codec": codec}
+
+
+def _to_source_file(source: dict) -> SourceFile:
+    source_file: SourceFile = {
+        "file_name": source["file_name"],
+        "file_size": source["file_size"],
+        "content": decode_content(source["content"], source.get("content_codec")),
+        "content_hash": source["content_hash"],
+        "timestamp": source["timestamp"],
+    }
+
+    if source.get("raw_hash"):
+        source_file["raw_hash"] = source["raw_hash"]
+
+    if source.get("chunk_index"):
+        source_file["chunk_index"] = source["chunk_index"]
+
+    return source_file
+
 
 class SourceCollection:
     """Performs mongodb operations on the sources collection."""
 
     @classmethod
-    async def retrieve_all(cls, app: Sanic) -> list[SourceFile]:
-        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
-        res = collection.find()
-        if not res:
-            return []
+    async def retrieve_all(
+        cls,
+        app: Sanic,
+        limit: int = SOURCE_PAGE_SIZE,
+        after: str | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """Retrieves a page of sources ordered by file name, projecting only the requested fields.
 
-        sources = [source async for source in res]
-        return [
-            {
-                "file_name": source["file_name"],
-                "file_size": source["file_size"],
-                "content": source["content"],
-                "content_hash": source["content_hash"],
-                "timestamp": source["timestamp"],
-            }
-            for source in sources
-        ]
+        Args:
+            app (Sanic): Sanic app holding the mongodb client
+            limit (int): maximum number of sources in the page
+            after (str | None): file name of the last source of the previous page
+            fields (list[str] | None): source fields to retrieve. All fields except the content by default
+
+        Returns:
+            tuple[list[dict[str, Any]], str | None]: sources in the page, and the cursor of the next page if any
+        """
 
-    @classmethod
-    async def retrieve_all_names(cls, app: Sanic) -> list[SourceFile]:
         collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
-        res = collection.find()
-        if not res:
-            return []
+        fields = fields or SOURCE_METADATA_FIELDS
+
+        # file names are always projected since
+        # they are used as the pagination cursor
+        res = (
+            collection.find(
+                {"file_name": {"$gt": after}} if after else {},
+                projection={"_id": 0, "file_name": 1, "content_codec": 1, **{field: 1 for field in fields}},
+            )
+            .sort("file_name", ASCENDING)
+            .limit(limit + 1)
+        )
 
         sources = [source async for source in res]
-        return [source["file_name"] for source in sources]
+        next_after = sources[limit - 1]["file_name"] if len(sources) > limit else None
+
+        if "content" in fields:
+            for source in sources[:limit]:
+                source["content"] = decode_content(source["content"], source.get("content_codec"))
+
+        return [{field: source.get(field) for field in fields} for source in sources[:limit]], next_after
+
+    @classmethod
+    async def retrieve_all_names(
+        cls,
+        app: Sanic,
+        limit: int = SOURCE_PAGE_SIZE,
+        after: str | None = None,
+    ) -> tuple[list[str], str | None]:
+        sources, next_after = await cls.retrieve_all(app=app, limit=limit, after=after, fields=["file_name"])
+        return [source["file_name"] for source in sources], next_after
 
     @classmethod
     async def retrieve_one(cls, file_name: str, app: Sanic) -> SourceFile:
@@ -46,24 +163,58 @@ class SourceCollection:
         if not res:
             raise SourceFileNotFoundError(f"There is no source file named '{file_name}'")
 
-        source = dict(res)
-        return {
-            "file_name": source["file_name"],
-            "file_size": source["file_size"],
-            "content": source["content"],
-            "content_hash": source["content_hash"],
-            "timestamp": source["timestamp"],
-        }
+        return _to_source_file(dict(res))
 
     @classmethod
-    async def add_one(cls, source_data: SourceFile, app: Sanic) -> SourceFile:
+    async def retrieve_one_by_raw_hash(cls, raw_hash: str, app: Sanic) -> SourceFile | None:
         collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+        res = await collection.find_one({"raw_hash": raw_hash})
+        if not res:
+            return None
 
-        try:
-            existing_source = await SourceCollection.retrieve_one(file_name=source_data["file_name"], app=app)
+        return _to_source_file(dict(res))
+
+    @classmethod
+    async def retrieve_many_by_raw_hashes(cls, raw_hashes: list[str], app: Sanic) -> dict[str, SourceFile]:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+        res = collection.find({"raw_hash": {"$in": raw_hashes}})
+        return {source["raw_hash"]: _to_source_file(dict(source)) async for source in res}
 
-        except SourceFileNotFoundError:
-            existing_source = None
+    @classmethod
+    async def retrieve_existing_hashes(cls, content_hashes: list[str], app: Sanic) -> set[tuple[str, str]]:
+        """Retrieves the file names of the sources having any of the given content hashes in a single query.
+
+        Args:
+            content_hashes (list[str]): content hashes to look up
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            set[tuple[str, str]]: file name and content hash pairs of the matching sources
+        """
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+        res = collection.find(
+            {"content_hash": {"$in": content_hashes}},
+            projection={"_id": 0, "file_name": 1, "content_hash": 1},
+        )
+        return {(source["file_name"], source["content_hash"]) async for source in res}
+
+    @classmethod
+    async def exists(cls, file_name: str, app: Sanic) -> bool:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+        res = await collection.find_one({"file_name": file_name}, projection={"_id": 1})
+        return res is not None
+
+    @classmethod
+    async def add_one(cls, source_data: SourceFile, app: Sanic) -> SourceFile:
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+
+        # only the hash is projected to avoid
+        # transferring and decoding the content
+        existing_source = await collection.find_one(
+            {"file_name": source_data["file_name"]},
+            projection={"content_hash": 1},
+        )
 
         if existing_source:
             if existing_source["content_hash"] == source_data["content_hash"]:
@@ -73,7 +224,7 @@ class SourceCollection:
 
         await collection.update_one(
             filter={"file_name": source_data["file_name"]},
-            update={"$set": source_data},
+            update={"$set": await _to_document(source_data)},
             upsert=True,
         )
 
@@ -84,3 +235,33 @@ class SourceCollection:
             "content_hash": source_data["content_hash"],
             "timestamp": source_data["timestamp"],
         }
+
+    @classmethod
+    async def add_many(cls, sources_data: list[SourceFile], app: Sanic) -> dict[int, str]:
+        """Upserts the given sources by file name using a single unordered bulk write.
+
+        Args:
+            sources_data (list[SourceFile]): sources to upsert
+            app (Sanic): Sanic app holding the mongodb client
+
+        Returns:
+            dict[int, str]: error messages of the sources that failed to persist, by their index
+        """
+
+        if not sources_data:
+            return {}
+
+        collection: AsyncIOMotorCollection = app.ctx.motor_db[SOURCE_COLLECTION]
+        documents = await asyncio.gather(*(_to_document(source_data) for source_data in sources_data))
+        operations = [
+            UpdateOne(filter={"file_name": document["file_name"]}, update={"$set": document}, upsert=True)
+            for document in documents
+        ]
+
+        try:
+            await collection.bulk_write(operations, ordered=False)
+
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "") for error in e.details.get("writeErrors", [])}
+
+        return {}
@@ -0,0 +1,189 @@
+import json
+import zipfile
+from io import BytesIO
+from pathlib import PurePosixPath
+from typing import Any
+
+from sanic.request import File
+
+from plex.core.types import EvaluationPair
+from plex.core.utils import evaluate_extracted_vs_reference
+from plex.core.utils import load_csv
+from plex.core.utils import scores_from_counts
+from plex.shared.exceptions.results import DataFileNotSpecifiedError
+from plex.shared.exceptions.results import InvalidEvaluationManifestError
+
+
+def _parse_extracted_data(extracted_data: Any) -> list[list[Any]]:
+    if isinstance(extracted_data, (str, bytes)):
+        try:
+            extracted_data = json.loads(extracted_data)
+
+        except json.JSONDecodeError as e:
+            raise InvalidEvaluationManifestError("The extracted data is not valid JSON") from e
+
+    if not isinstance(extracted_data, list) or not all(isinstance(row, list) for row in extracted_data):
+        raise InvalidEvaluationManifestError("The extracted data must be a list of rows")
+
+    return extracted_data
+
+
+def read_evaluation_manifest(manifest: str, attachments: list[File]) -> list[EvaluationPair]:
+    """Reads the extracted and reference data pairs of a manifest, whose reference files are attached separately.
+
+    Args:
+        manifest (str): JSON list of objects holding the `source` name, the `extracted_data` rows and the name of the
+            `reference` attachment
+        attachments (list[File]): attached reference CSV files
+
+    Returns:
+        list[EvaluationPair]: extracted and reference data pairs in the order of the manifest
+
+    Raises:
+        InvalidEvaluationManifestError: If the manifest is malformed or refers to a missing attachment
+    """
+
+    try:
+        entries = json.loads(manifest)
+
+    except json.JSONDecodeError as e:
+        raise InvalidEvaluationManifestError("The evaluation manifest is not valid JSON") from e
+
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise InvalidEvaluationManifestError("The evaluation manifest must be a list of objects")
+
+    reference_files = {file.name: file for file in attachments}
+    pairs: list[EvaluationPair] = []
+
+    for position, entry in enumerate(entries):
+        if "extracted_data" not in entry or "reference" not in entry:
+            raise InvalidEvaluationManifestError(
+                f"The evaluation manifest entry {position} must specify the extracted data and the reference",
+            )
+
+        reference_file = reference_files.get(entry["reference"])
+        if reference_file is None:
+            raise InvalidEvaluationManifestError(f"The reference file '{entry['reference']}' is not attached")
+
+        pairs.append(
+            {
+                "source": str(entry.get("source", "Unknown")),
+                "reference": reference_file.name,
+                "extracted_data": entry["extracted_data"],
+                "reference_body": reference_file.body,
+            },
+        )
+
+    return pairs
+
+
+def read_evaluation_archive(body: bytes, max_size: int) -> list[EvaluationPair]:
+    """Reads the extracted and reference data pairs of a zip archive, where each `<name>.json` extracted data file is
+    paired with the `<name>.csv` reference file of the same directory.
+
+    Args:
+        body (bytes): content of the zip archive
+        max_size (int): maximum total uncompressed size of the archive in bytes
+
+    Returns:
+        list[EvaluationPair]: extracted and reference data pairs sorted by name
+
+    Raises:
+        InvalidEvaluationManifestError: If the archive is malformed, too large or has an unpaired file
+    """
+
+    try:
+        archive = zipfile.ZipFile(BytesIO(body))
+
+    except zipfile.BadZipFile as e:
+        raise InvalidEvaluationManifestError("The evaluation archive is not a valid zip file") from e
+
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+
+        # the declared sizes are checked before
+        # decompressing anything from the archive
+        if sum(info.file_size for info in members) > max_size:
+            raise InvalidEvaluationManifestError(f"The evaluation archive exceeds {max_size} bytes uncompressed")
+
+        extracted_members: dict[str, zipfile.ZipInfo] = {}
+        reference_members: dict[str, zipfile.ZipInfo] = {}
+        for info in members:
+            path = PurePosixPath(info.filename)
+            if path.name.startswith("."):
+                continue
+
+            if path.suffix.lower() == ".json":
+                extracted_members[str(path.with_suffix(""))] = info
+            elif path.suffix.lower() == ".csv":
+                reference_members[str(path.with_suffix(""))] = info
+
+        unpaired = sorted(set(extracted_members) ^ set(reference_members))
+        if unpaired:
+            raise InvalidEvaluationManifestError(
+                f"The evaluation archive has unpaired extracted or reference files: {', '.join(unpaired)}",
+            )
+
+        return [
+            {
+                "source": PurePosixPath(name).name,
+                "reference": PurePosixPath(reference_members[name].filename).name,
+                "extracted_data": archive.read(extracted_members[name]),
+                "reference_body": archive.read(reference_members[name]),
+            }
+            for name in sorted(extracted_members)
+        ]
+
+
+def evaluate_pair(pair: EvaluationPair) -> dict[str, Any]:
+    """Evaluates an extracted and reference data pair like the single evaluation endpoint does.
+
+    Args:
+        pair (EvaluationPair): extracted and reference data pair
+
+    Returns:
+        dict[str, Any]: Evaluation scores and confusion counts along with metadata
+    """
+
+    extracted_data = _parse_extracted_data(pair["extracted_data"])
+    reference_data = load_csv(File(type="text/csv", body=pair["reference_body"], name=pair["reference"]))
+    if not extracted_data or reference_data.empty:
+        raise DataFileNotSpecifiedError("Extracted and reference data cannot be empty")
+
+    return evaluate_extracted_vs_reference(
+        extracted_data=extracted_data,
+        reference_data=reference_data,
+        source=pair["source"],
+        reference=pair["reference"],
+    )
+
+
+def _aggregate_scores(evaluations: list[dict[str, Any]]) -> dict[str, Any]:
+    counts = {
+        count: sum(evaluation[count] for evaluation in evaluations)
+        for count in ("true_positives", "false_positives", "false_negatives")
+    }
+    macro = {
+        score: sum(evaluation[score] for evaluation in evaluations) / len(evaluations) if evaluations else 0
+        for score in ("precision", "recall", "f1-score")
+    }
+
+    return {"micro": {**scores_from_counts(**counts), **counts}, "macro": macro}
+
+
+def aggregate_evaluations(evaluations: list[dict[str, Any]]) -> dict[str, Any]:
+    """Aggregates the exact and tolerant scores of several evaluations. Micro averages are derived from the summed
+    confusion counts, so larger tables weigh more, while macro averages weigh every evaluation equally.
+
+    Args:
+        evaluations (list[dict[str, Any]]): results of `evaluate_extracted_vs_reference`
+
+    Returns:
+        dict[str, Any]: micro and macro averaged scores
+    """
+
+    return {
+        "evaluated": len(evaluations),
+        **_aggregate_scores(evaluations),
+        "tolerant": _aggregate_scores([evaluation["tolerant"] for evaluation in evaluations]),
+    }
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from datetime import UTC
+from typing import Any
+
+from sanic import Sanic
+from sanic.log import logger
+
+from plex.core.constants import ANALYSIS_JOB_CONCURRENCY
+from plex.core.constants import ANALYSIS_JOB_HEARTBEAT_SECONDS
+from plex.core.constants import ANALYSIS_JOB_POLL_INTERVAL_SECONDS
+from plex.core.db.collections.analysis_job import AnalysisJobCollection
+from plex.core.db.collections.source import SourceCollection
+from plex.core.types import AnalysisJob
+from plex.core.types import ResultFile
+from plex.shared.exceptions.base import PLEXError
+
+
+class AnalysisJobQueue:
+    """Runs queued analysis jobs on a bounded pool of asyncio tasks per Sanic worker.
+
+    Jobs are persisted in the analysis jobs collection and claimed atomically, so the pools of all Sanic workers
+    coordinate through mongodb and the outbound LLM concurrency is capped at `workers * concurrency`.
+    """
+
+    app: Sanic
+    concurrency: int
+    poll_interval: float
+
+    def __init__(
+        self,
+        app: Sanic = None,
+        concurrency: int = ANALYSIS_JOB_CONCURRENCY,
+        poll_interval: float = ANALYSIS_JOB_POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+        if app:
+            self.init_app(app=app)
+
+    def init_app(self, app: Sanic) -> None:
+        self.app = app
+
+        # started after the server starts so that
+        # the motor client is already configured
+        @app.listener("after_server_start")
+        async def start_analysis_workers(_app: Sanic, _loop: Any) -> None:
+            self._tasks = [asyncio.create_task(self._work(app=_app)) for _ in range(self.concurrency)]
+            setattr(_app.ctx, "analysis_jobs", self)
+            logger.info(f"[analysis-jobs] started {self.concurrency} workers ✅")
+
+        # jobs interrupted here are reclaimed by
+        # another worker once their lease expires
+        @app.listener("before_server_stop")
+        async def stop_analysis_workers(_app: Sanic, _loop: Any) -> None:
+            logger.info("[analysis-jobs] stopping")
+            for task in self._tasks:
+                task.cancel()
+
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+            logger.info("[analysis-jobs] stopped ☑️")
+
+    async def enqueue(self, report: str, quarter: str, selected_extraction: bool, app: Sanic) -> AnalysisJob:
+        timestamp = datetime.now(UTC).isoformat()
+        job = await AnalysisJobCollection.add_one(
+            job={
+                "job_id": uuid.uuid4().hex,
+                "status": "pending",
+                "report": report,
+                "quarter": quarter,
+                "selected_extraction": selected_extraction,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+            },
+            app=app,
+        )
+
+        self._wakeup.set()
+
+        return job
+
+    async def _work(self, app: Sanic) -> None:
+        while True:
+            try:
+                job = await AnalysisJobCollection.claim_one(worker_id=self._worker_id, app=app)
+
+            except Exception:
+                logger.exception("Failed to claim an analysis job")
+                job = None
+
+            if job is None:
+                await self._wait_for_jobs()
+                continue
+
+            try:
+                await self._process(job=job, app=app)
+
+            except Exception:
+                logger.exception(f"Failed to record the outcome of the analysis job '{job['job_id']}'")
+
+    async def _wait_for_jobs(self) -> None:
+        # jobs enqueued by other Sanic workers are
+        # only picked up on the next poll interval
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+
+        except TimeoutError:
+            pass
+
+        self._wakeup.clear()
+
+    # noinspection PyBroadException
+    async def _renew_lease(self, job: AnalysisJob, app: Sanic) -> None:
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_HEARTBEAT_SECONDS)
+
+            try:
+                renewed = await AnalysisJobCollection.renew_lease(
+                    job_id=job["job_id"],
+                    worker_id=self._worker_id,
+                    app=app,
+                )
+
+            except Exception:
+                logger.exception(f"Failed to renew the lease of the analysis job '{job['job_id']}'")
+                continue
+
+            if not renewed:
+                logger.warning(f"[analysis-jobs] lost the lease of the job '{job['job_id']}'")
+                return
+
+    async def _analyze(self, job: AnalysisJob, app: Sanic) -> ResultFile:
+        # the lease is extended while the analysis runs, so that
+        # long analyses are not reclaimed by another worker
+        heartbeat = asyncio.create_task(self._renew_lease(job=job, app=app))
+        try:
+            source = await SourceCollection.retrieve_one(file_name=job["report"], app=app)
+            return await app.ctx.analyzer.run(
+                source=source,
+                quarter=job["quarter"],
+                selected_extraction=job["selected_extraction"],
+                app=app,
+            )
+
+        finally:
+            heartbeat.cancel()
+
+    # noinspection PyBroadException
+    async def _process(self, job: AnalysisJob, app: Sanic) -> None:
+        try:
+            result = await self._analyze(job=job, app=app)
+
+        except PLEXError as e:
+            logger.exception(e)
+            recorded = await AnalysisJobCollection.fail_one(
+                job_id=job["job_id"],
+                worker_id=self._worker_id,
+                error=e.message,
+                app=app,
+            )
+
+        except Exception:
+            logger.exception(f"An error occurred while processing the analysis job '{job['job_id']}'")
+            recorded = await AnalysisJobCollection.fail_one(
+                job_id=job["job_id"],
+                worker_id=self._worker_id,
+                error="An error occurred while analyzing the source file",
+                app=app,
+            )
+
+        else:
+            recorded = await AnalysisJobCollection.complete_one(
+                job_id=job["job_id"],
+                worker_id=self._worker_id,
+                result=result,
+                app=app,
+            )
+
+        if not recorded:
+            logger.warning(f"[analysis-jobs] discarded the outcome of the job '{job['job_id']}' as its lease was lost")
@@ -1,11 +1,72 @@
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
 from langchain_core.language_models import BaseChatModel
 from langchain_openai.chat_models.base import BaseChatOpenAI
+from openai.types.completion_usage import CompletionUsage
+from openai.types.completion_usage import PromptTokensDetails
 from sanic.log import logger
 
 from plex.shared.exceptions.analyzer import AnalyzerInitializationError
 
 
-def get_llm(llm_model: str, api_key: str, base_url: str, temperature: float, max_tokens: int) -> BaseChatModel:
+def _report_cache_hits(usage: CompletionUsage | None) -> None:
+    cache_hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    if usage is None or cache_hit_tokens is None:
+        return
+
+    if usage.prompt_tokens_details is None:
+        usage.prompt_tokens_details = PromptTokensDetails(cached_tokens=cache_hit_tokens)
+    elif usage.prompt_tokens_details.cached_tokens is None:
+        usage.prompt_tokens_details.cached_tokens = cache_hit_tokens
+
+
+class _CacheHitReportingStream:
+    def __init__(self, stream: Any) -> None:
+        self._stream = stream
+
+    async def __aenter__(self) -> "_CacheHitReportingStream":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._stream.__aexit__(*exc_info)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        async for chunk in self._stream:
+            _report_cache_hits(chunk.usage)
+            yield chunk
+
+
+class _CacheHitReportingCompletions:
+    """Wraps the chat completions of the OpenAI client, reporting the prefix cache hits of deepseek in the prompt token
+    details of streamed responses as well. Langchain only keeps these details of the raw usage of streamed responses,
+    while deepseek reports the hits in a field of its own."""
+
+    def __init__(self, completions: Any) -> None:
+        self._completions = completions
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._completions, name)
+
+    async def create(self, **kwargs: Any) -> Any:
+        response = await self._completions.create(**kwargs)
+        if not kwargs.get("stream"):
+            return response
+
+        return _CacheHitReportingStream(response)
+
+
+def get_llm(
+    llm_model: str,
+    api_key: str,
+    base_url: str,
+    temperature: float,
+    max_tokens: int,
+    http_async_client: httpx.AsyncClient | None = None,
+    max_retries: int | None = None,
+) -> BaseChatModel:
     """Returns a Langchain LLM wrapper for the Deepseek model based on the specified configurations.
 
     Args:
@@ -14,6 +75,9 @@ def get_llm(llm_model: str, api_key: str, base_url: str, temperature: float, max
         base_url (str): The base URL of the Deepseek API.
         temperature (float): The sampling temperature for the model.
         max_tokens (int): The maximum number of tokens the model is allowed to generate.
+        http_async_client (httpx.AsyncClient | None): A shared async HTTP client to reuse pooled connections with.
+            The OpenAI client creates its own if not provided.
+        max_retries (int | None): The number of retries of the OpenAI client. Its default is used if not provided.
 
     Returns:
         BaseChatModel: A Langchain `BaseChatOpenAI` instance configured with the specified
@@ -25,14 +89,18 @@ def get_llm(llm_model: str, api_key: str, base_url: str, temperature: float, max
     """
 
     try:
-        return BaseChatOpenAI(
+        llm = BaseChatOpenAI(
             model=llm_model,
             temperature=temperature,
             openai_api_key=api_key,
             openai_api_base=base_url,
             max_tokens=max_tokens,
+            http_async_client=http_async_client,
+            max_retries=max_retries,
             n=1,
         )
+        llm.async_client = _CacheHitReportingCompletions(llm.async_client)
+        return llm
 
     except Exception as e:
         logger.exception(e)
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable
+from collections.abc import Callable
+from datetime import datetime
+from datetime import UTC
+from email.utils import parsedate_to_datetime
+from typing import TypeVar
+
+import openai
+from sanic.log import logger
+
+from plex.core.constants import LLM_CIRCUIT_BREAKER_RESET_SECONDS
+from plex.core.constants import LLM_CIRCUIT_BREAKER_THRESHOLD
+from plex.core.constants import LLM_MAX_CONCURRENCY
+from plex.core.constants import LLM_MAX_RETRIES
+from plex.core.constants import LLM_REQUESTS_PER_MINUTE
+from plex.core.constants import LLM_RETRY_BASE_DELAY_SECONDS
+from plex.core.constants import LLM_RETRY_MAX_DELAY_SECONDS
+from plex.core.constants import LLM_TOKENS_PER_MINUTE
+from plex.shared.exceptions.analyzer import LLMRateLimitedError
+from plex.shared.exceptions.analyzer import LLMUnavailableError
+
+T = TypeVar("T")
+
+# errors worth retrying, as opposed to
+# errors caused by the request itself
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Limits the rate of a resource per minute, refilling continuously. Waiters are served in FIFO order."""
+
+    def __init__(self, capacity_per_minute: int) -> None:
+        self.capacity = capacity_per_minute
+        self._tokens = float(capacity_per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.capacity / 60)
+        self._updated_at = now
+
+    async def acquire(self, amount: float) -> None:
+        if not self.capacity:
+            return
+
+        # a single request larger than the whole
+        # capacity would otherwise wait forever
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+
+                await asyncio.sleep((amount - self._tokens) * 60 / self.capacity)
+
+
+class CircuitBreaker:
+    """Fails fast after consecutive failures, and lets a single trial call through once the reset timeout elapses."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "closed":
+            return
+
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+
+        retry_after = max(1.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        raise LLMUnavailableError("The LLM API is temporarily unavailable", retry_after=retry_after)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_in_flight or self._failures >= self.failure_threshold:
+            if self.state == "closed":
+                logger.warning("[llm-scheduler] circuit opened")
+            self._opened_at = time.monotonic()
+
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+
+def _parse_retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    retry_after_ms = response.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+
+        except ValueError:
+            pass
+
+    retry_after = response.headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return float(retry_after)
+
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(UTC)).total_seconds())
+
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """Schedules outbound LLM calls of a process.
+
+    Calls are bounded by a semaphore and by request and token per minute buckets. Transient failures are retried with
+    jittered exponential backoff honoring the Retry-After header, and a circuit breaker fails fast while the API keeps
+    failing, so that bursts degrade into waiting instead of errors.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS,
+        retry_max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS,
+        failure_threshold: int = LLM_CIRCUIT_BREAKER_THRESHOLD,
+        reset_timeout: float = LLM_CIRCUIT_BREAKER_RESET_SECONDS,
+    ) -> None:
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._request_bucket = TokenBucket(capacity_per_minute=requests_per_minute)
+        self._token_bucket = TokenBucket(capacity_per_minute=tokens_per_minute)
+        self._breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        """Runs an LLM call once the limits allow it, retrying transient failures.
+
+        Args:
+            call (Callable[[], Awaitable[T]]): LLM call to run
+            estimated_tokens (int): estimated prompt and completion tokens of the call
+
+        Returns:
+            T: the result of the call
+
+        Raises:
+            LLMRateLimitedError: If the call is still rate limited after all retries
+            LLMUnavailableError: If the call keeps failing, or the circuit is open
+        """
+
+        attempt = 0
+
+        while True:
+            self._breaker.before_call()
+            await self._request_bucket.acquire(1)
+            await self._token_bucket.acquire(estimated_tokens)
+
+            async with self._semaphore:
+                try:
+                    result = await call()
+
+                except RETRYABLE_ERRORS as e:
+                    self._breaker.record_failure()
+                    attempt += 1
+                    retry_after = _parse_retry_after(e)
+
+                    if attempt > self.max_retries:
+                        if isinstance(e, openai.RateLimitError):
+                            raise LLMRateLimitedError(retry_after=retry_after or self.retry_max_delay) from e
+                        raise LLMUnavailableError(retry_after=retry_after or self.retry_max_delay) from e
+
+                    delay = self._backoff(attempt, retry_after)
+                    logger.warning(f"[llm-scheduler] {type(e).__name__}, retrying in {delay:.2f}s (attempt {attempt})")
+
+                except asyncio.CancelledError:
+                    self._breaker.release_trial()
+                    raise
+
+                except Exception:
+                    # errors caused by the request itself
+                    # do not indicate an unavailable API
+                    self._breaker.record_success()
+                    raise
+
+                else:
+                    self._breaker.record_success()
+                    return result
+
+            # backoff happens outside the semaphore
+            # so that other calls can proceed
+            await asyncio.sleep(delay)
+
+
+# process scoped, hence each Sanic
+# worker is limited independently
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,38 @@
+from typing import Any
+
+from plex.core.types import TokenUsage
+
+
+def empty_usage() -> TokenUsage:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+
+
+def add_call_usage(
+    usage: TokenUsage,
+    usage_metadata: dict[str, Any] | None,
+    response_metadata: dict[str, Any] | None = None,
+) -> None:
+    """Adds the token usage reported for an LLM call to the usage of an analysis.
+
+    Args:
+        usage (TokenUsage): usage of the analysis to add to
+        usage_metadata (dict[str, Any] | None): `usage_metadata` of the response message, if reported
+        response_metadata (dict[str, Any] | None): `response_metadata` of the response message, holding the raw usage
+            of non-streamed responses
+    """
+
+    usage["calls"] += 1
+    if not usage_metadata:
+        return
+
+    usage["prompt_tokens"] += usage_metadata.get("input_tokens", 0)
+    usage["completion_tokens"] += usage_metadata.get("output_tokens", 0)
+
+    # openai reports prefix cache hits in the prompt token details,
+    # while deepseek reports them in a field of its own
+    cached_tokens = (usage_metadata.get("input_token_details") or {}).get("cache_read")
+    if cached_tokens is None:
+        token_usage = (response_metadata or {}).get("token_usage") or {}
+        cached_tokens = token_usage.get("prompt_cache_hit_tokens") or 0
+
+    usage["cached_tokens"] += cached_tokens
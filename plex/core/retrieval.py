@@ -0,0 +1,434 @@
+import re
+from collections.abc import Iterator
+
+from plex.core.constants import CHUNK_MAX_TOKENS
+from plex.core.constants import PREFILTER_MIN_SCORE
+from plex.core.constants import PREFILTER_TOKEN_BUDGET
+from plex.core.types import ContentChunk
+
+# financial statement signals and how strongly they
+# indicate a P&L section. Negative weights penalize
+# sections of the other primary statements
+KEYWORD_WEIGHTS = {
+    "income statement": 4.0,
+    "statement of profit or loss": 4.0,
+    "profit and loss": 4.0,
+    "statement of comprehensive income": 3.0,
+    "gross profit": 3.0,
+    "profit before tax": 3.0,
+    "profit for the period": 3.0,
+    "cost of sales": 2.0,
+    "operating profit": 2.0,
+    "results from operating activities": 2.0,
+    "earnings per share": 2.0,
+    "revenue": 1.0,
+    "finance cost": 1.0,
+    "finance income": 1.0,
+    "income tax": 1.0,
+    "other income": 1.0,
+    "administrative expenses": 1.0,
+    "distribution expenses": 1.0,
+    "consolidated": 1.0,
+    "total assets": -2.0,
+    "total equity and liabilities": -2.0,
+    "cash flows from operating activities": -2.0,
+}
+QUARTER_LABEL_WEIGHT = 1.5
+REQUESTED_QUARTER_WEIGHT = 3.0
+MAX_NUMERIC_WEIGHT = 2.0
+
+# quarter ending months as described in the extractor prompt
+QUARTER_MONTHS = {"1": "mar", "2": "jun", "3": "sep", "4": "dec"}
+
+# whole month words only, as the abbreviations are part of
+# other words, e.g. "mar" of "summary" or "dec" of "decimal"
+_MONTH = (
+    r"\b(?=(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec))"
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t|tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?"
+)
+_DAY = r"(?:\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?)?"
+_QUARTER_LABEL_PATTERNS = [
+    re.compile(
+        rf"\b(?:3|three)\s+months?\s+(?:period\s+)?(?:ended|ending|to|end)?\s*(?:on\s+)?(?:the\s+)?{_DAY}{_MONTH}",
+    ),
+    re.compile(rf"\bquarter\s+(?:ended|ending|to)\s+(?:the\s+)?{_DAY}{_MONTH}"),
+]
+_QUARTER_NUMBER_PATTERN = re.compile(r"\bq([1-4])\b")
+_KEYWORD_PATTERN = re.compile("|".join(re.escape(keyword) for keyword in KEYWORD_WEIGHTS))
+_NUMERIC_CELL_PATTERN = re.compile(r"\(?-?\d{1,3}(?:,\d{3})+(?:\.\d+)?\)?|\(?-?\d+\.\d+\)?")
+_BLOCK_SEPARATOR_PATTERN = re.compile(r"\n[ \t]*\n")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimates the token count of a given text using the ~4 characters per token rule of thumb.
+
+    Args:
+        text (str): text content
+
+    Returns:
+        int: estimated token count
+    """
+
+    return (len(text) + 3) // 4
+
+
+def detect_quarter_labels(text: str) -> list[str]:
+    """Detects quarter headers such as "3 months to 30th Sep" in a given text.
+
+    Args:
+        text (str): text content
+
+    Returns:
+        list[str]: sorted abbreviated months the detected quarters end on
+    """
+
+    normalized_text = _WHITESPACE_PATTERN.sub(" ", text.lower())
+    months = {match.group(1) for pattern in _QUARTER_LABEL_PATTERNS for match in pattern.finditer(normalized_text)}
+    months.update(QUARTER_MONTHS[match.group(1)] for match in _QUARTER_NUMBER_PATTERN.finditer(normalized_text))
+    return sorted(months)
+
+
+def detect_keywords(text: str) -> list[str]:
+    """Detects the financial statement keywords present in a given text.
+
+    Args:
+        text (str): text content
+
+    Returns:
+        list[str]: sorted unique keywords found
+    """
+
+    normalized_text = _WHITESPACE_PATTERN.sub(" ", text.lower())
+    return sorted({match.group(0) for match in _KEYWORD_PATTERN.finditer(normalized_text)})
+
+
+def resolve_quarter_months(quarter: str) -> set[str]:
+    """Resolves a requested quarter such as "Q3" or "3 months to Sep 30th" to the abbreviated months it ends on.
+
+    Args:
+        quarter (str): requested quarter
+
+    Returns:
+        set[str]: abbreviated months, empty if the quarter is not specific (i.e. the latest available quarter)
+    """
+
+    normalized_quarter = quarter.lower()
+    months = {match.group(1) for match in re.finditer(_MONTH, normalized_quarter)}
+    months.update(QUARTER_MONTHS[match.group(1)] for match in _QUARTER_NUMBER_PATTERN.finditer(normalized_quarter))
+    return months
+
+
+def _iter_spans(text: str, separator: re.Pattern, offset: int = 0) -> Iterator[tuple[int, int]]:
+    start = 0
+    for match in separator.finditer(text):
+        if match.start() > start:
+            yield offset + start, offset + match.start()
+        start = match.end()
+
+    if start < len(text):
+        yield offset + start, offset + len(text)
+
+
+def _split_oversized_block(content: str, start: int, end: int, max_tokens: int) -> Iterator[tuple[int, int]]:
+    # splits on line boundaries, and hard splits
+    # lines that are longer than the token limit
+    max_chars = max_tokens * 4
+    chunk_start = start
+    line_start = start
+
+    while line_start < end:
+        line_end = content.find("\n", line_start, end)
+        line_end = end if line_end == -1 else line_end + 1
+
+        if line_end - chunk_start > max_chars and line_start > chunk_start:
+            yield chunk_start, line_start
+            chunk_start = line_start
+
+        while line_end - chunk_start > max_chars:
+            yield chunk_start, chunk_start + max_chars
+            chunk_start += max_chars
+
+        line_start = line_end
+
+    if chunk_start < end:
+        yield chunk_start, end
+
+
+def _build_chunk(content: str, index: int, page: int, start: int, end: int, whole_page: bool) -> ContentChunk:
+    text = content[start:end]
+    lines = [line for line in text.splitlines() if line.strip()]
+    table_lines = sum(1 for line in lines if line.lstrip().startswith("|"))
+
+    if lines and table_lines / len(lines) > 0.5:
+        kind = "table"
+    elif whole_page:
+        kind = "page"
+    else:
+        kind = "text"
+
+    return {
+        "index": index,
+        "kind": kind,
+        "page": page,
+        "start": start,
+        "end": end,
+        "tokens": estimate_tokens(text),
+        "quarters": detect_quarter_labels(text),
+        "keywords": detect_keywords(text),
+        "numeric_cells": len(_NUMERIC_CELL_PATTERN.findall(text)),
+    }
+
+
+def _split_page(
+    content: str,
+    first_index: int,
+    page: int,
+    page_start: int,
+    page_end: int,
+    max_tokens: int,
+) -> list[ContentChunk]:
+    max_chars = max_tokens * 4
+    if page_end - page_start <= max_chars:
+        return [_build_chunk(content, first_index, page, page_start, page_end, whole_page=True)]
+
+    spans: list[tuple[int, int]] = []
+    chunk_start = chunk_end = None
+
+    for block_start, block_end in _iter_spans(content[page_start:page_end], _BLOCK_SEPARATOR_PATTERN, page_start):
+        if block_end - block_start > max_chars:
+            if chunk_start is not None:
+                spans.append((chunk_start, chunk_end))
+                chunk_start = chunk_end = None
+
+            spans.extend(_split_oversized_block(content, block_start, block_end, max_tokens))
+            continue
+
+        if chunk_start is not None and block_end - chunk_start > max_chars:
+            spans.append((chunk_start, chunk_end))
+            chunk_start = None
+
+        if chunk_start is None:
+            chunk_start = block_start
+        chunk_end = block_end
+
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+
+    return [
+        _build_chunk(content, first_index + offset, page, start, end, whole_page=False)
+        for offset, (start, end) in enumerate(spans)
+    ]
+
+
+def split_into_chunks(content: str, max_tokens: int = CHUNK_MAX_TOKENS) -> list[ContentChunk]:
+    """Splits markdown content into page chunks, further splitting large pages into table and text chunks.
+
+    Pages are delimited by form feeds, as emitted by the PDF converter. Large pages are split on blank lines, which
+    keeps markdown tables intact, and the resulting blocks are packed into chunks of up to `max_tokens` tokens.
+
+    Args:
+        content (str): markdown content of the source document
+        max_tokens (int): maximum estimated tokens per chunk
+
+    Returns:
+        list[ContentChunk]: chunks in document order, along with their offsets and detected signals
+    """
+
+    chunks: list[ContentChunk] = []
+    page_start = 0
+
+    for page, page_text in enumerate(content.split("\f"), start=1):
+        page_end = page_start + len(page_text)
+        if page_text.strip():
+            chunks.extend(_split_page(content, len(chunks), page, page_start, page_end, max_tokens))
+        page_start = page_end + 1
+
+    return chunks
+
+
+def score_chunk(chunk: ContentChunk, quarter: str) -> float:
+    """Scores how likely a chunk holds the P&L statement of the requested quarter, using only its detected signals.
+
+    Args:
+        chunk (ContentChunk): chunk to score
+        quarter (str): quarter which the P&L should be extracted from
+
+    Returns:
+        float: relevance score of the chunk
+    """
+
+    score = sum(KEYWORD_WEIGHTS.get(keyword, 0.0) for keyword in chunk["keywords"])
+    score += min(chunk["numeric_cells"] / 20, MAX_NUMERIC_WEIGHT)
+
+    if chunk["quarters"]:
+        score += QUARTER_LABEL_WEIGHT
+
+        if resolve_quarter_months(quarter) & set(chunk["quarters"]):
+            score += REQUESTED_QUARTER_WEIGHT
+
+    return score
+
+
+def select_relevant_chunks(
+    chunks: list[ContentChunk],
+    quarter: str,
+    token_budget: int = PREFILTER_TOKEN_BUDGET,
+    min_score: float = PREFILTER_MIN_SCORE,
+) -> list[ContentChunk]:
+    """Selects the highest scoring chunks that fit in the token budget.
+
+    The best chunk is always selected, and a selected chunk is followed by its next chunk when it has numeric values
+    since statements often continue on the next page.
+
+    Args:
+        chunks (list[ContentChunk]): chunks of the source document in document order
+        quarter (str): quarter which the P&L should be extracted from
+        token_budget (int): maximum estimated tokens of the selected chunks
+        min_score (float): minimum score for a chunk to be selected
+
+    Returns:
+        list[ContentChunk]: selected chunks in document order, empty if no chunk is relevant enough
+    """
+
+    ranked = sorted(
+        ((score_chunk(chunk, quarter), chunk) for chunk in chunks),
+        key=lambda scored_chunk: (-scored_chunk[0], scored_chunk[1]["index"]),
+    )
+    if not ranked or ranked[0][0] < min_score:
+        return []
+
+    chunks_by_index = {chunk["index"]: chunk for chunk in chunks}
+    selected: dict[int, ContentChunk] = {}
+    used_tokens = 0
+
+    for score, chunk in ranked:
+        if score < min_score:
+            break
+
+        if chunk["index"] in selected:
+            continue
+
+        if selected and used_tokens + chunk["tokens"] > token_budget:
+            continue
+
+        selected[chunk["index"]] = chunk
+        used_tokens += chunk["tokens"]
+
+        next_chunk = chunks_by_index.get(chunk["index"] + 1)
+        if (
+            next_chunk
+            and next_chunk["index"] not in selected
+            and next_chunk["numeric_cells"]
+            and used_tokens + next_chunk["tokens"] <= token_budget
+        ):
+            selected[next_chunk["index"]] = next_chunk
+            used_tokens += next_chunk["tokens"]
+
+    return [selected[index] for index in sorted(selected)]
+
+
+def join_chunks(content: str, chunks: list[ContentChunk]) -> str:
+    """Joins the text of the given chunks, marking the omitted content in between.
+
+    Args:
+        content (str): markdown content of the source document
+        chunks (list[ContentChunk]): chunks in document order
+
+    Returns:
+        str: joined chunk text
+    """
+
+    parts = []
+    previous_index = None
+    for chunk in chunks:
+        if previous_index is not None and chunk["index"] != previous_index + 1:
+            parts.append("[...]")
+        parts.append(content[chunk["start"] : chunk["end"]].strip())
+        previous_index = chunk["index"]
+
+    return "\n\n".join(parts)
+
+
+def split_into_windows(content: str, max_tokens: int, chunks: list[ContentChunk] | None = None) -> list[str]:
+    """Splits content into windows of consecutive chunks, for extractions too large for a single call.
+
+    Consecutive windows share their boundary chunk, so that a statement cut by a window boundary is still whole in
+    one of them when it fits in a chunk.
+
+    Args:
+        content (str): markdown content of the source document
+        max_tokens (int): maximum estimated tokens per window
+        chunks (list[ContentChunk] | None): precomputed chunk index of the content. The content is split if not
+            provided
+
+    Returns:
+        list[str]: text of each window in document order
+    """
+
+    if chunks is None:
+        chunks = split_into_chunks(content, max_tokens=min(CHUNK_MAX_TOKENS, max_tokens))
+
+    windows: list[list[ContentChunk]] = []
+    window: list[ContentChunk] = []
+    window_tokens = 0
+
+    for chunk in chunks:
+        if window and window_tokens + chunk["tokens"] > max_tokens:
+            windows.append(window)
+            # the boundary chunk is repeated only if it
+            # leaves room for the next one
+            window = [window[-1]] if len(window) > 1 and window[-1]["tokens"] * 2 <= max_tokens else []
+            window_tokens = sum(window_chunk["tokens"] for window_chunk in window)
+
+        window.append(chunk)
+        window_tokens += chunk["tokens"]
+
+    if window:
+        windows.append(window)
+
+    return [join_chunks(content, window) for window in windows]
+
+
+def select_shared_content(
+    content: str,
+    quarters: list[str],
+    token_budget: int = PREFILTER_TOKEN_BUDGET,
+    min_score: float = PREFILTER_MIN_SCORE,
+    chunks: list[ContentChunk] | None = None,
+) -> str:
+    """Selects the union of the most relevant sections for each of the requested quarters, so that a single shared
+    context serves the extraction of all of them.
+
+    Falls back to the full content if it already fits in the token budget or if no section is relevant enough for any
+    of the quarters.
+
+    Args:
+        content (str): markdown content of the source document
+        quarters (list[str]): quarters which the P&L should be extracted from
+        token_budget (int): maximum estimated tokens of the selected content per quarter
+        min_score (float): minimum score for a section to be selected
+        chunks (list[ContentChunk] | None): precomputed chunk index of the content. The content is split if not
+            provided
+
+    Returns:
+        str: selected content
+    """
+
+    if estimate_tokens(content) <= token_budget:
+        return content
+
+    if chunks is None:
+        chunks = split_into_chunks(content)
+
+    selected_chunks: dict[int, ContentChunk] = {}
+    for quarter in quarters:
+        quarter_chunks = select_relevant_chunks(chunks, quarter, token_budget=token_budget, min_score=min_score)
+        if not quarter_chunks:
+            return content
+
+        selected_chunks.update((chunk["index"], chunk) for chunk in quarter_chunks)
+
+    return join_chunks(content, [selected_chunks[index] for index in sorted(selected_chunks)])
+
@@ -0,0 +1,85 @@
+import json
+from typing import Any
+
+
+class PartialRowParser:
+    """Incrementally parses the streamed arguments of the P&L tool call and returns each row of the extracted items as
+    soon as its closing bracket arrives.
+
+    The arguments are a JSON object of the form `{"extracted_items": [[...], [...]]}`, hence rows are the arrays found
+    two levels deep. Only the row being streamed is buffered.
+    """
+
+    def __init__(self) -> None:
+        self.rows: list[list[Any]] = []
+        self._row: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> list[list[Any]]:
+        """Feeds a fragment of the tool call arguments to the parser.
+
+        Args:
+            text (str): arguments fragment
+
+        Returns:
+            list[list[Any]]: rows completed by the fragment
+        """
+
+        completed_rows = []
+
+        for char in text:
+            if self._depth >= 3:
+                self._row.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+
+            elif char in "[{":
+                self._depth += 1
+                if self._depth == 3:
+                    self._row = [char]
+
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 2:
+                    row = self._parse_row("".join(self._row))
+                    if row is not None:
+                        completed_rows.append(row)
+
+        self.rows.extend(completed_rows)
+        return completed_rows
+
+    @staticmethod
+    def _parse_row(text: str) -> list[Any] | None:
+        try:
+            row = json.loads(text)
+
+        except json.JSONDecodeError:
+            return None
+
+        return row if isinstance(row, list) else None
+
+
+def format_sse_event(event: str, data: Any) -> str:
+    """Formats a server-sent event.
+
+    Args:
+        event (str): name of the event
+        data (Any): JSON serializable payload of the event
+
+    Returns:
+        str: the event in the text/event-stream format
+    """
+
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,337 @@
+import re
+from typing import Any
+
+from plex.core.retrieval import detect_keywords
+from plex.core.retrieval import detect_quarter_labels
+from plex.core.retrieval import KEYWORD_WEIGHTS
+from plex.core.retrieval import resolve_quarter_months
+from plex.core.types import MarkdownTable
+from plex.core.types import TableExtraction
+
+# line items that identify a P&L statement, along
+# with the wordings they usually come with
+PROFIT_AND_LOSS_ANCHORS = {
+    "revenue": ("revenue", "turnover", "net sales"),
+    "gross profit": ("gross profit", "gross loss"),
+    "profit before tax": ("profit before tax", "profit before income tax", "loss before tax", "profit/(loss) before"),
+    "income tax": ("income tax", "tax expense", "taxation"),
+    "profit for the period": (
+        "profit for the period",
+        "profit for the year",
+        "loss for the period",
+        "profit/(loss) for the",
+        "profit after tax",
+        "net profit",
+    ),
+}
+# line items kept by a selective extraction, as in the extractor prompt
+SELECTED_ANCHORS = ("gross profit", "profit before tax", "profit for the period")
+MIN_ANCHORS = 3
+ANCHOR_CONFIDENCE_STEP = 0.1
+MIN_VALUE_ROWS = 3
+CONTEXT_LINES = 5
+AMBIGUITY_PENALTY = 0.5
+
+_SEPARATOR_CELL_PATTERN = re.compile(r"^:?-+:?$")
+_CELL_SPLIT_PATTERN = re.compile(r"(?<!\\)\|")
+_NUMBER_CELL_PATTERN = re.compile(r"^\(?[-−]?[$€£]?\s*\d[\d,]*(?:\.\d+)?\s*%?\)?$")
+_NIL_CELLS = {"-", "–", "—", "nil", "n/a"}
+_CHANGE_LABEL_PATTERN = re.compile(r"%|\bchange\b|\bvariance\b|\bgrowth\b")
+_GROUP_LABEL_PATTERN = re.compile(r"\b(?:group|consolidated)\b")
+_COMPANY_LABEL_PATTERN = re.compile(r"\b(?:company|bank|entity)\b")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_YEAR_PATTERN = re.compile(r"(?<!\d)(?:19|20)\d{2}(?!\d)")
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+
+def _split_cells(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+
+    return [cell.strip().replace("\\|", "|") for cell in _CELL_SPLIT_PATTERN.split(line)]
+
+
+def _is_separator(cells: list[str]) -> bool:
+    return all(_SEPARATOR_CELL_PATTERN.match(cell.replace(" ", "")) for cell in cells if cell) and any(cells)
+
+
+def _is_value(cell: str) -> bool:
+    return bool(_NUMBER_CELL_PATTERN.match(cell)) or cell.lower() in _NIL_CELLS
+
+
+def parse_markdown_tables(content: str) -> list[MarkdownTable]:
+    """Parses the markdown tables of a given content, as emitted by the markdown converter.
+
+    Args:
+        content (str): markdown content of the source document
+
+    Returns:
+        list[MarkdownTable]: rows of each table without the separator row, along with the lines preceding the table
+    """
+
+    tables: list[MarkdownTable] = []
+    context: list[str] = []
+    rows: list[list[str]] = []
+
+    for line in content.splitlines():
+        if line.lstrip().startswith("|"):
+            cells = _split_cells(line)
+            if not _is_separator(cells):
+                rows.append(cells)
+            continue
+
+        if rows:
+            tables.append({"context": "\n".join(context), "rows": rows})
+            rows = []
+            context = []
+
+        if line.strip():
+            context = [*context[-(CONTEXT_LINES - 1) :], line.strip()]
+
+    if rows:
+        tables.append({"context": "\n".join(context), "rows": rows})
+
+    return tables
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text.lower()).strip()
+
+
+def find_profit_and_loss_anchors(line_items: list[str]) -> set[str]:
+    """Finds the P&L line items present in a given list of line items, whatever their wording.
+
+    Args:
+        line_items (list[str]): line items of a table
+
+    Returns:
+        set[str]: keys of `PROFIT_AND_LOSS_ANCHORS` found
+    """
+
+    return {
+        anchor
+        for line_item in line_items
+        for anchor, wordings in PROFIT_AND_LOSS_ANCHORS.items()
+        if any(wording in _normalize(line_item) for wording in wordings)
+    }
+
+
+def _split_header(rows: list[list[str]]) -> tuple[list[str], list[list[str]]]:
+    # headers spanning several rows are merged, up
+    # to the first row holding values
+    width = max(len(row) for row in rows)
+    header_row_count = 1
+    while header_row_count < len(rows) and not any(_is_value(cell) for cell in rows[header_row_count][1:]):
+        header_row_count += 1
+
+    # cells of the upper header rows span the empty
+    # cells on their right, e.g. "Group" or "Company"
+    header_rows = [row + [""] * (width - len(row)) for row in rows[:header_row_count]]
+    for row in header_rows[:-1]:
+        for column in range(2, width):
+            row[column] = row[column] or row[column - 1]
+
+    header = [" ".join(row[column] for row in header_rows if row[column]).strip() for column in range(width)]
+    body = [row + [""] * (width - len(row)) for row in rows[header_row_count:]]
+    return header, body
+
+
+def _latest_quarter_columns(header: list[str], column_months: dict[int, set[str]]) -> list[int]:
+    if len(set().union(*column_months.values())) <= 1:
+        return list(column_months)
+
+    # the latest quarter is told apart by the years of the
+    # headers, and its comparatives end on the same month
+    periods = {}
+    for column, months in column_months.items():
+        years = _YEAR_PATTERN.findall(header[column])
+        if not years or len(months) != 1:
+            return []
+
+        periods[column] = (max(int(year) for year in years), _MONTHS.index(next(iter(months))))
+
+    latest_month = _MONTHS[max(periods.values())[1]]
+    return [column for column, months in column_months.items() if latest_month in months]
+
+
+def _select_columns(header: list[str], quarter: str) -> list[int]:
+    requested_months = resolve_quarter_months(quarter)
+    column_months = {
+        column: months
+        for column, label in enumerate(header[1:], start=1)
+        if (months := set(detect_quarter_labels(label)))
+    }
+
+    # unspecific quarters match the columns of the latest quarter,
+    # and tables of several quarters without years match none
+    if requested_months:
+        quarter_columns = [column for column, months in column_months.items() if months & requested_months]
+    elif column_months:
+        quarter_columns = _latest_quarter_columns(header, column_months)
+    else:
+        quarter_columns = []
+
+    # consolidated figures are preferred over the company
+    # ones when both are given side by side
+    group_columns = [column for column in quarter_columns if _GROUP_LABEL_PATTERN.search(header[column].lower())]
+    if group_columns:
+        quarter_columns = group_columns
+    elif any(_COMPANY_LABEL_PATTERN.search(header[column].lower()) for column in quarter_columns):
+        quarter_columns = [
+            column for column in quarter_columns if not _COMPANY_LABEL_PATTERN.search(header[column].lower())
+        ] or quarter_columns
+
+    # a change column next to the selected ones compares them
+    change_columns = [
+        column + 1
+        for column in quarter_columns
+        if column + 1 < len(header)
+        and column + 1 not in quarter_columns
+        and _CHANGE_LABEL_PATTERN.search(header[column + 1].lower())
+    ]
+    return sorted({*quarter_columns, *change_columns})
+
+
+def _score_table(table: MarkdownTable, quarter: str, selected_extraction: bool) -> tuple[float, float, list[list[str]]]:
+    if len(table["rows"]) < 2:
+        return 0.0, 0.0, []
+
+    # other primary statements repeat some of the P&L line
+    # items, e.g. the profit before tax of the cash flows
+    line_items = [row[0] for row in table["rows"] if row]
+    if any(KEYWORD_WEIGHTS[keyword] < 0 for keyword in detect_keywords(" ".join(line_items))):
+        return 0.0, 0.0, []
+
+    header, body = _split_header(table["rows"])
+    anchors = find_profit_and_loss_anchors([row[0] for row in body])
+    columns = _select_columns(header, quarter=quarter)
+    if len(anchors) < MIN_ANCHORS or not columns:
+        return 0.0, 0.0, []
+
+    rows = [[row[0], *(row[column] for column in columns)] for row in body if row[0]]
+    rows = [row for row in rows if any(row[1:])]
+    if selected_extraction:
+        rows = [row for row in rows if find_profit_and_loss_anchors([row[0]]) & set(SELECTED_ANCHORS)]
+
+    if len(rows) < (1 if selected_extraction else MIN_VALUE_ROWS):
+        return 0.0, 0.0, []
+
+    cells = [cell for row in rows for cell in row[1:] if cell]
+    coverage = sum(_is_value(cell) for cell in cells) / len(cells)
+    # statements are trusted from the minimum number of
+    # line items up, and fully once all of them are found
+    confidence = (1 - ANCHOR_CONFIDENCE_STEP * (len(PROFIT_AND_LOSS_ANCHORS) - len(anchors))) * coverage
+
+    context = _normalize(table["context"])
+    rank = confidence
+    if "consolidated" in context or "group" in context:
+        rank += 0.5
+    elif "company" in context:
+        rank -= 0.5
+
+    extracted_items = [[header[0] or "Line Item", *(header[column] for column in columns)], *rows]
+    return rank, confidence, extracted_items
+
+
+def extract_profit_and_loss_table(
+    content: str,
+    quarter: str,
+    selected_extraction: bool = False,
+    tables: list[MarkdownTable] | None = None,
+) -> TableExtraction | None:
+    """Extracts the P&L statement of the requested quarter from the markdown tables of the content, without the LLM.
+
+    The statement is identified by its line items, preferring consolidated statements, and the quarter columns by
+    their headers. The confidence reflects how many P&L line items were found, how many of the extracted cells are
+    numeric, and whether another table could be the statement as well.
+
+    Args:
+        content (str): markdown content of the source document
+        quarter (str): quarter which the P&L should be extracted from
+        selected_extraction (bool): whether to only extract the line items of a selective extraction
+        tables (list[MarkdownTable] | None): tables parsed from the content. The content is parsed if not provided
+
+    Returns:
+        TableExtraction | None: extracted P&L statement with its confidence, or None if no table qualifies
+    """
+
+    if tables is None:
+        tables = parse_markdown_tables(content)
+
+    candidates = sorted(
+        (
+            candidate
+            for table in tables
+            if (candidate := _score_table(table, quarter=quarter, selected_extraction=selected_extraction))[2]
+        ),
+        key=lambda candidate: -candidate[0],
+    )
+    if not candidates:
+        return None
+
+    rank, confidence, extracted_items = candidates[0]
+
+    # statements continued over several tables or repeated
+    # ones for another entity can not be told apart
+    if len(candidates) > 1 and candidates[1][0] >= rank:
+        confidence *= AMBIGUITY_PENALTY
+
+    return {"extracted_items": extracted_items, "confidence": round(confidence, 4)}
+
+
+def _header_key(header: list[Any]) -> tuple[str, ...]:
+    return tuple(_normalize(str(cell)) for cell in header[1:])
+
+
+def merge_extractions(extractions: list[list[list[Any]]]) -> list[list[Any]]:
+    """Merges the P&L statements extracted from consecutive windows of a document into one statement.
+
+    The extraction holding the most P&L line items is taken as the statement. Rows of the other extractions with the
+    same period headers are merged in document order when their line items are missing from it, which reassembles
+    statements split across windows, while the values of the chosen extraction win over the duplicates of
+    overlapping windows.
+
+    Args:
+        extractions (list[list[list[Any]]]): extracted rows of each window in document order, headers first
+
+    Returns:
+        list[list[Any]]: merged P&L statement, empty if no window held one
+    """
+
+    candidates = [(index, rows) for index, rows in enumerate(extractions) if len(rows) >= 2 and rows[0]]
+    if not candidates:
+        return []
+
+    best_index, best_rows = max(
+        candidates,
+        key=lambda candidate: (
+            len(find_profit_and_loss_anchors([str(row[0]) for row in candidate[1][1:] if row])),
+            len(candidate[1]),
+            -candidate[0],
+        ),
+    )
+    header = best_rows[0]
+    best_line_items = {_normalize(str(row[0])) for row in best_rows[1:] if row}
+
+    merged_rows: list[list[Any]] = []
+    merged_line_items: set[str] = set()
+    for index, rows in candidates:
+        if index != best_index and (len(rows[0]) != len(header) or _header_key(rows[0]) != _header_key(header)):
+            continue
+
+        # line items repeated within the statement itself
+        # are kept, e.g. the attributions of profit
+        if index == best_index:
+            merged_rows.extend(rows[1:])
+            continue
+
+        for row in rows[1:]:
+            line_item = _normalize(str(row[0])) if row else ""
+            if line_item and line_item not in best_line_items and line_item not in merged_line_items:
+                merged_rows.append(row)
+                merged_line_items.add(line_item)
+
+    return [header, *merged_rows]
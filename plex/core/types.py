@@ -1,16 +1,100 @@
 from typing import Any
+from typing import Literal
+from typing import NotRequired
 from typing import TypedDict
 
 
+class ContentChunk(TypedDict):
+    index: int
+    kind: Literal["page", "table", "text"]
+    page: int
+    start: int
+    end: int
+    tokens: int
+    quarters: list[str]
+    keywords: list[str]
+    numeric_cells: int
+
+
+class MarkdownTable(TypedDict):
+    context: str
+    rows: list[list[str]]
+
+
+class TableExtraction(TypedDict):
+    extracted_items: list[list[str]]
+    confidence: float
+
+
 class SourceFile(TypedDict):
     file_name: str
     file_size: float
     content: str
     content_hash: str
     timestamp: str
+    raw_hash: NotRequired[str]
+    chunk_index: NotRequired[list[ContentChunk]]
 
 
 class ResultFile(TypedDict):
     file_name: str
     content: list[list[Any]]
     timestamp: str
+    # only set on results of the deterministic table extractor
+    confidence: NotRequired[float]
+
+
+class CachedResult(TypedDict):
+    cache_key: str
+    content_hash: str
+    quarter: str
+    selected_extraction: bool
+    model: str
+    prompt_version: str
+    result: ResultFile
+
+
+class AnalysisJob(TypedDict):
+    job_id: str
+    status: Literal["pending", "running", "completed", "failed"]
+    report: str
+    quarter: str
+    selected_extraction: bool
+    created_at: str
+    updated_at: str
+    result: NotRequired[ResultFile]
+    error: NotRequired[str]
+
+
+class EvaluationPair(TypedDict):
+    source: str
+    reference: str
+    # raw JSON or rows, parsed when evaluated
+    extracted_data: str | bytes | list[list[Any]]
+    reference_body: bytes
+
+
+class EvaluationRecord(TypedDict):
+    evaluation_id: str
+    source: str
+    reference: str
+    model: str
+    prompt_version: str
+    results: dict[str, Any]
+    batch_id: NotRequired[str]
+
+
+class TokenUsage(TypedDict):
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+
+
+class AnalysisUsage(TokenUsage):
+    file_name: str
+    content_hash: str
+    quarter: str
+    selected_extraction: bool
+    model: str
+    prompt_version: str
@@ -0,0 +1,195 @@
+import hashlib
+import re
+import tempfile
+from typing import IO
+
+from sanic import Request
+
+from plex.shared.exceptions.source import SourceFileNotSpecifiedError
+from plex.shared.exceptions.source import SourceFileTooLargeError
+
+MAX_PART_HEADERS_SIZE = 16 * 1024
+
+_BOUNDARY_PATTERN = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_DISPOSITION_PARAM_PATTERN = re.compile(r'\b(name|filename)="([^"]*)"', re.IGNORECASE)
+
+
+class MultipartFileParser:
+    """Incrementally parses a multipart/form-data body and extracts the content of the first file of a given field.
+
+    Body chunks are fed as they arrive, and only a tail as long as the boundary delimiter is buffered between them, so
+    memory usage does not depend on the size of the file.
+    """
+
+    def __init__(self, boundary: str, field_name: str) -> None:
+        self.field_name = field_name
+        self.file_name: str | None = None
+        self.completed = False
+        self._delimiter = b"--" + boundary.encode()
+        self._terminator = b"\r\n" + self._delimiter
+        self._buffer = bytearray()
+        self._state = "preamble"
+        self._capturing = False
+
+    def feed(self, data: bytes) -> bytes:
+        """Feeds a body chunk to the parser.
+
+        Args:
+            data (bytes): body chunk
+
+        Returns:
+            bytes: content of the requested file found in the chunk
+        """
+
+        self._buffer.extend(data)
+        file_data = bytearray()
+
+        while True:
+            if self._state == "preamble":
+                index = self._buffer.find(self._delimiter)
+                if index == -1 or len(self._buffer) < index + len(self._delimiter) + 2:
+                    # keeps a tail long enough to detect a
+                    # delimiter split across two chunks
+                    keep = len(self._delimiter) + 1
+                    if index == -1 and len(self._buffer) > keep:
+                        del self._buffer[: len(self._buffer) - keep]
+                    break
+
+                suffix = bytes(self._buffer[index + len(self._delimiter) : index + len(self._delimiter) + 2])
+                del self._buffer[: index + len(self._delimiter) + 2]
+                self._state = "done" if suffix == b"--" else "headers"
+
+            elif self._state == "headers":
+                index = self._buffer.find(b"\r\n\r\n")
+                if index == -1:
+                    if len(self._buffer) > MAX_PART_HEADERS_SIZE:
+                        raise SourceFileNotSpecifiedError("The multipart request body is malformed")
+                    break
+
+                headers = self._buffer[:index].decode("utf-8", errors="replace")
+                del self._buffer[: index + 4]
+                self._capturing = not self.completed and self._is_requested_file(headers)
+                self._state = "body"
+
+            elif self._state == "body":
+                index = self._buffer.find(self._terminator)
+                if index == -1:
+                    safe_length = len(self._buffer) - len(self._terminator) + 1
+                    if safe_length > 0:
+                        if self._capturing:
+                            file_data.extend(self._buffer[:safe_length])
+                        del self._buffer[:safe_length]
+                    break
+
+                if self._capturing:
+                    file_data.extend(self._buffer[:index])
+                    self.completed = True
+                    self._capturing = False
+
+                # leaves the delimiter in the buffer
+                # for the preamble state to consume
+                del self._buffer[: index + 2]
+                self._state = "preamble"
+
+            else:
+                self._buffer.clear()
+                break
+
+        return bytes(file_data)
+
+    def _is_requested_file(self, headers: str) -> bool:
+        for header in headers.split("\r\n"):
+            name, _, value = header.partition(":")
+            if name.strip().lower() != "content-disposition":
+                continue
+
+            params = {key.lower(): val for key, val in _DISPOSITION_PARAM_PATTERN.findall(value)}
+            if params.get("name") == self.field_name and params.get("filename"):
+                self.file_name = params["filename"]
+                return True
+
+        return False
+
+
+class SpooledUpload:
+    """A source file streamed to a temporary file along with its raw content hash."""
+
+    def __init__(self, file_name: str, file: IO[bytes], file_size: int, raw_hash: str) -> None:
+        self.file_name = file_name
+        self.file = file
+        self.file_size = file_size
+        self.raw_hash = raw_hash
+
+    @property
+    def path(self) -> str:
+        return self.file.name
+
+    @property
+    def file_extension(self) -> str:
+        return self.file_name.split(".")[-1]
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def spool_upload(request: Request, field_name: str, max_size: int) -> SpooledUpload:
+    """Streams the first file of a multipart/form-data request field to a temporary file, hashing its raw content
+    incrementally.
+
+    Args:
+        request (Request): streamed Sanic request
+        field_name (str): multipart field holding the file
+        max_size (int): maximum file size in bytes
+
+    Returns:
+        SpooledUpload: the spooled file, deleted once closed
+
+    Raises:
+        SourceFileNotSpecifiedError: If the request does not contain a file in the given field
+        SourceFileTooLargeError: If the request body exceeds the maximum file size
+    """
+
+    content_length = int(request.headers.get("content-length") or 0)
+    if content_length > max_size:
+        raise SourceFileTooLargeError(f"The source file exceeds the maximum upload size of {max_size} bytes")
+
+    boundary = _BOUNDARY_PATTERN.search(request.headers.get("content-type", ""))
+    if not boundary:
+        raise SourceFileNotSpecifiedError("A valid source file is not specified")
+
+    parser = MultipartFileParser(boundary=boundary.group(1), field_name=field_name)
+    raw_hash = hashlib.sha256()
+    file_size = 0
+    spool = tempfile.NamedTemporaryFile(prefix="plex-upload-")
+
+    try:
+        while True:
+            body_chunk = await request.stream.read()
+            if body_chunk is None:
+                break
+
+            file_chunk = parser.feed(body_chunk)
+            if not file_chunk:
+                continue
+
+            file_size += len(file_chunk)
+            if file_size > max_size:
+                raise SourceFileTooLargeError(f"The source file exceeds the maximum upload size of {max_size} bytes")
+
+            raw_hash.update(file_chunk)
+            spool.write(file_chunk)
+
+        if not parser.completed or not file_size:
+            raise SourceFileNotSpecifiedError("A valid source file is not specified")
+
+        spool.flush()
+        return SpooledUpload(
+            file_name=parser.file_name,
+            file=spool,
+            file_size=file_size,
+            raw_hash=raw_hash.hexdigest(),
+        )
+
+    except Exception:
+        spool.close()
+        raise
@@ -1,16 +1,35 @@
+import codecs
+import csv
 import hashlib
+import re
 from io import BytesIO
-from io import StringIO
+from itertools import chain
 from typing import Any
+from typing import BinaryIO
 
 import numpy as np
 import pandas as pd
 from markitdown import MarkItDown
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.psexceptions import PSException
 from sanic.request import File
 
+from plex.core.alignment import align_labels
+from plex.core.constants import EVALUATION_ABSOLUTE_TOLERANCE
+from plex.core.constants import EVALUATION_ALIGNMENT_THRESHOLD
+from plex.core.constants import EVALUATION_FUZZY_ALIGNMENT
+from plex.core.constants import EVALUATION_RELATIVE_TOLERANCE
 from plex.shared.exceptions.results import ColumnCountMismatchError
 from plex.shared.exceptions.results import CSVParsingError
 from plex.shared.exceptions.results import InsufficientDataPointsError
+from plex.shared.exceptions.source import MalformedSourceFileError
+from plex.shared.exceptions.source import PageLimitExceededError
+
+CSV_ENCODINGS = ("utf-8-sig", "cp1252", "latin-1")
+CSV_DELIMITERS = ",;\t|"
+CSV_SNIFF_SAMPLE_SIZE = 64 * 1024
 
 
 def build_cors_origins(cors_origin_str: str) -> str | list:
@@ -18,6 +37,86 @@ def build_cors_origins(cors_origin_str: str) -> str | list:
     return "*" if "*" in origin_list else origin_list[0] if len(origin_list) == 1 else origin_list
 
 
+def count_pdf_pages(stream: BinaryIO) -> int:
+    """Counts the pages of a PDF file using its page tree, without parsing the page contents.
+
+    Args:
+        stream (BinaryIO): The source PDF file stream
+
+    Returns:
+        int: Number of pages in the PDF file
+
+    Raises:
+        MalformedSourceFileError: If the PDF file or its page tree cannot be parsed
+    """
+
+    # broken page trees surface as lookup and type
+    # errors of the objects resolved along the way
+    try:
+        document = PDFDocument(PDFParser(stream))
+        return int(resolve1(document.catalog["Pages"])["Count"])
+
+    except (PSException, KeyError, TypeError, ValueError) as e:
+        raise MalformedSourceFileError("The source file is not a valid PDF file") from e
+
+
+def _check_page_limit(stream: BinaryIO, file_extension: str, max_pages: int) -> None:
+    if max_pages and file_extension.lower() == "pdf":
+        page_count = count_pdf_pages(stream)
+        stream.seek(0)
+
+        if page_count > max_pages:
+            raise PageLimitExceededError(f"The source file has {page_count} pages, exceeding the {max_pages} limit")
+
+
+def convert_bytes_to_markdown(body: bytes, file_extension: str, max_pages: int = 0) -> str:
+    """Given the content of a source file, converts it to markdown/text.
+
+    Args:
+        body (bytes): The source file content
+        file_extension (str): Extension of the source file, i.e. pdf
+        max_pages (int): Maximum number of pages allowed for PDF files. Not limited if 0
+
+    Returns:
+        str: Markdown text extracted from the source file
+
+    Raises:
+        PageLimitExceededError: If the PDF file has more pages than allowed
+        MalformedSourceFileError: If the PDF file cannot be parsed
+    """
+
+    stream = BytesIO(body)
+    _check_page_limit(stream, file_extension=file_extension, max_pages=max_pages)
+
+    md = MarkItDown()
+    result = md.convert_stream(stream, file_extension=file_extension)
+    return result.text_content
+
+
+def convert_file_to_markdown(path: str, file_extension: str, max_pages: int = 0) -> str:
+    """Given the path of a source file stored locally, converts its content to markdown/text.
+
+    Args:
+        path (str): Path of the source file
+        file_extension (str): Extension of the source file, i.e. pdf
+        max_pages (int): Maximum number of pages allowed for PDF files. Not limited if 0
+
+    Returns:
+        str: Markdown text extracted from the source file
+
+    Raises:
+        PageLimitExceededError: If the PDF file has more pages than allowed
+        MalformedSourceFileError: If the PDF file cannot be parsed
+    """
+
+    with open(path, "rb") as stream:
+        _check_page_limit(stream, file_extension=file_extension, max_pages=max_pages)
+
+        md = MarkItDown()
+        result = md.convert_stream(stream, file_extension=file_extension)
+        return result.text_content
+
+
 def convert_to_markdown(file: File) -> str:
     """Given a PDF file sent to Sanic, converts its content to markdown/text.
 
@@ -28,9 +127,7 @@ def convert_to_markdown(file: File) -> str:
         str: Markdown text extracted from the source file
     """
 
-    md = MarkItDown()
-    result = md.convert_stream(BytesIO(file.body), file_extension=file.name.split(".")[-1])
-    return result.text_content
+    return convert_bytes_to_markdown(file.body, file_extension=file.name.split(".")[-1])
 
 
 def generate_content_hash(content: str) -> str:
@@ -69,22 +166,58 @@ def convert_to_mappable(elements: list[list[Any]]) -> list[list[Any]]:
     return padded_rows
 
 
-def load_csv(file: File) -> list[list[Any]]:
-    """Loads a CSV file uploaded to Sanic reliably using Pandas and returns a list of lists.
+def _sniff_csv_encodings(body: bytes) -> tuple[str, ...]:
+    if body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return ("utf-16",)
+
+    # utf-8 with an optional BOM, falling back to the windows code
+    # page of spreadsheet exports, and latin-1 which decodes anything
+    return CSV_ENCODINGS
+
+
+def _sniff_csv_delimiter(body: bytes, encoding: str) -> str:
+    sample = body[:CSV_SNIFF_SAMPLE_SIZE].decode(encoding, errors="ignore")
+
+    # the last line of the sample may be cut
+    if len(body) > CSV_SNIFF_SAMPLE_SIZE and "\n" in sample:
+        sample = sample[: sample.rindex("\n")]
+
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+
+    except csv.Error:
+        return ","
+
+
+def load_csv(file: File) -> pd.DataFrame:
+    """Loads a CSV file uploaded to Sanic reliably using Pandas. The file is parsed straight from its body, sniffing its
+    encoding and delimiter, and all of its values are read as strings to keep their formatting.
 
     Args:
         file (File): Source CSV file
 
     Returns:
-        list[list[Any]]: parsed nested list of values
+        pd.DataFrame: parsed table, whose columns are the header row
     """
 
-    try:
-        file_stream = StringIO(file.body.decode("utf-8"))
-        df = pd.read_csv(file_stream)
-        return [df.columns.tolist()] + df.values.tolist()
-    except Exception as e:
-        raise CSVParsingError from e
+    error = None
+    for encoding in _sniff_csv_encodings(file.body):
+        try:
+            return pd.read_csv(
+                BytesIO(file.body),
+                sep=_sniff_csv_delimiter(file.body, encoding=encoding),
+                encoding=encoding,
+                dtype=str,
+                na_filter=False,
+            )
+
+        except UnicodeDecodeError as e:
+            error = e
+
+        except Exception as e:
+            raise CSVParsingError from e
+
+    raise CSVParsingError from error
 
 
 def convert_data_to_dict(data: list[list[str]]) -> dict[str, str]:
@@ -133,61 +266,435 @@ def f1_score(y_true: list[int], y_pred: list[int]) -> float:
     return 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
 
 
+# currency symbols and codes, parentheses negatives,
+# thousand separators, scale suffixes and percentages
+FINANCIAL_NUMBER_PATTERN = (
+    r"^\s*(?P<open>\()?\s*(?P<sign>[-+\u2212])?\s*(?:[A-Z]{3}|Rs\.?|[$\u20ac\u00a3\u00a5\u20b9])?\s*"
+    r"(?P<currency_sign>[-\u2212])?\s*(?P<number>\d[\d,]*(?:\.\d+)?|\.\d+)\s*"
+    r"(?P<scale>thousands?|millions?|billions?|mn|bn|k|m|b)?\s*(?P<percent>%)?\s*(?P<close>\))?\s*$"
+)
+NUMBER_SCALES = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "thousands": 1e3,
+    "m": 1e6,
+    "mn": 1e6,
+    "million": 1e6,
+    "millions": 1e6,
+    "b": 1e9,
+    "bn": 1e9,
+    "billion": 1e9,
+    "billions": 1e9,
+}
+
+
+def parse_financial_numbers(values: np.ndarray) -> np.ndarray:
+    """Parses formatted financial numbers, i.e. "1,234", "(1,234)", "$1.2k" or "12.5%", in a vectorized way. Percentages
+    keep their value, i.e. "12.5%" is parsed as 12.5.
+
+    Args:
+        values (np.ndarray): cell values as strings
+
+    Returns:
+        np.ndarray: parsed numbers as float64, NaN for the values which are not numbers
+    """
+
+    if not len(values):
+        return np.empty(0, dtype=np.float64)
+
+    values = np.strings.strip(np.asarray(values).astype(str))
+
+    # most numbers are parsed with vectorized string operations after
+    # stripping parentheses, percent and currency signs, scale suffixes
+    # and commas, while the remaining ones go through the regex
+    parenthesized = np.strings.startswith(values, "(") & np.strings.endswith(values, ")")
+    plain_values = np.strings.strip(np.where(parenthesized, np.strings.strip(values, "()"), values))
+    plain_values = np.strings.rstrip(np.strings.lstrip(plain_values, "$\u20ac\u00a3\u00a5\u20b9 "), "% ")
+    plain_values = np.strings.lower(np.strings.replace(plain_values, ",", ""))
+
+    scales = np.ones(len(values), dtype=np.float64)
+    for suffix in sorted(NUMBER_SCALES, key=len, reverse=True):
+        suffixed = (scales == 1.0) & np.strings.endswith(plain_values, suffix)
+        plain_values = np.where(suffixed, np.strings.rstrip(plain_values, f"{suffix} "), plain_values)
+        scales[suffixed] = NUMBER_SCALES[suffix]
+
+    numbers = pd.to_numeric(plain_values, errors="coerce").astype(np.float64) * scales
+    numbers[parenthesized] *= -1
+
+    # only the remaining values holding digits, i.e. with scale
+    # suffixes or currency codes, go through the regex
+    has_digits = np.zeros(len(values), dtype=bool)
+    for digit in "0123456789":
+        has_digits |= np.strings.find(values, digit) >= 0
+
+    formatted = np.flatnonzero(np.isnan(numbers) & has_digits)
+    if not len(formatted):
+        return numbers
+
+    parts = pd.Series(values[formatted], dtype=object).str.extract(FINANCIAL_NUMBER_PATTERN, flags=re.IGNORECASE)
+    formatted_numbers = pd.to_numeric(parts["number"].str.replace(",", "", regex=False), errors="coerce")
+    formatted_numbers = formatted_numbers.to_numpy(np.float64)
+
+    scales = parts["scale"].str.lower().map(NUMBER_SCALES).fillna(1.0).to_numpy(np.float64)
+    negated = parts["open"].notna().to_numpy() & parts["close"].notna().to_numpy()
+    signed = parts["sign"].isin(["-", "\u2212"]).to_numpy() | parts["currency_sign"].notna().to_numpy()
+
+    # unbalanced parentheses are not numbers
+    unbalanced = parts["open"].notna().to_numpy() != parts["close"].notna().to_numpy()
+    formatted_numbers[unbalanced] = np.nan
+
+    numbers[formatted] = np.where(negated ^ signed, -1.0, 1.0) * formatted_numbers * scales
+    return numbers
+
+
+def _table_header(data: list[list[Any]] | pd.DataFrame) -> list[Any]:
+    return data.columns.tolist() if isinstance(data, pd.DataFrame) else data[0]
+
+
+def _flatten_frame(data: pd.DataFrame) -> pd.DataFrame:
+    # every row of a frame has the same number of cells, hence
+    # its cells are laid out row by row without nested lists
+    row_count, column_count = data.shape
+    cell_count = max(column_count - 1, 0)
+    line_items = np.strings.lower(data.iloc[:, 0].to_numpy(dtype=str)).astype(object)
+    values = np.strings.strip(data.iloc[:, 1:].to_numpy(dtype=str).ravel())
+
+    return pd.DataFrame(
+        {
+            "line_item": np.repeat(line_items, cell_count),
+            "column": np.tile(np.arange(1, cell_count + 1), row_count),
+            "value": np.where(values == "", "-", values),
+        },
+    )
+
+
+def flatten_table(data: list[list[Any]] | pd.DataFrame) -> pd.DataFrame:
+    """Flattens a given nested list of values or frame that represents rows in a table to a frame of cells, with the
+    same keys and values as `convert_data_to_dict`, in a vectorized way.
+
+    Args:
+        data (list[list[Any]] | pd.DataFrame): source nested list of values including the header row, or frame whose
+            columns are the header row
+
+    Returns:
+        pd.DataFrame: cells keyed on their `line_item` and `column` index, holding their cleaned `value`
+    """
+
+    if isinstance(data, pd.DataFrame):
+        if data.empty:
+            raise InsufficientDataPointsError
+
+        cells = _flatten_frame(data)
+        return cells.drop_duplicates(subset=["line_item", "column"], keep="last")
+
+    if len(data) < 2:
+        raise InsufficientDataPointsError
+
+    rows = data[1:]
+    cell_counts = np.fromiter((max(len(row) - 1, 0) for row in rows), dtype=np.intp, count=len(rows))
+    cell_count = int(cell_counts.sum())
+
+    # line items are normalized once per row,
+    # and repeated for each cell of the row
+    line_items = np.array([str(row[0]).lower() if row else "" for row in rows], dtype=object)
+    row_starts = np.cumsum(cell_counts) - cell_counts
+    columns = np.arange(cell_count) - np.repeat(row_starts, cell_counts) + 1
+
+    values = np.fromiter(chain.from_iterable(row[1:] for row in rows), dtype=object, count=cell_count)
+    values = np.strings.strip(values.astype(str)) if cell_count else values.astype(str)
+    values = np.where(values == "", "-", values)
+
+    cells = pd.DataFrame(
+        {
+            "line_item": np.repeat(line_items, cell_counts),
+            "column": columns,
+            "value": values,
+        },
+    )
+
+    # later duplicates override earlier ones, like
+    # repeated keys of the dictionary do
+    return cells.drop_duplicates(subset=["line_item", "column"], keep="last")
+
+
+def align_cells(extracted_cells: pd.DataFrame, reference_cells: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Aligns the cells of the flattened extracted and reference tables on their line item and column.
+
+    Args:
+        extracted_cells (pd.DataFrame): flattened cells of the extracted table
+        reference_cells (pd.DataFrame): flattened cells of the reference table
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: positions of the aligned reference cells and of their extracted counterparts
+    """
+
+    # line items are factorized over both tables, so
+    # that cells are joined on plain integer keys
+    line_item_codes, _ = pd.factorize(
+        np.concatenate([reference_cells["line_item"].to_numpy(), extracted_cells["line_item"].to_numpy()]),
+    )
+    columns = np.concatenate([reference_cells["column"].to_numpy(), extracted_cells["column"].to_numpy()])
+    keys = line_item_codes.astype(np.int64) * (int(columns.max(initial=0)) + 1) + columns
+    reference_keys, extracted_keys = keys[: len(reference_cells)], keys[len(reference_cells) :]
+
+    _, reference_indexes, extracted_indexes = np.intersect1d(
+        reference_keys,
+        extracted_keys,
+        assume_unique=True,
+        return_indices=True,
+    )
+    return reference_indexes, extracted_indexes
+
+
+def align_tables(
+    extracted_cells: pd.DataFrame,
+    reference_cells: pd.DataFrame,
+    extracted_header: list[Any],
+    reference_header: list[Any],
+    threshold: float = EVALUATION_ALIGNMENT_THRESHOLD,
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """Rewrites the line items and columns of the extracted cells to those of the reference cells they align with, so
+    that differently worded line items and reordered columns are still compared with their counterparts. Line items
+    are aligned by similarity and columns by header.
+
+    Args:
+        extracted_cells (pd.DataFrame): flattened cells of the extracted table
+        reference_cells (pd.DataFrame): flattened cells of the reference table
+        extracted_header (list[Any]): header row of the extracted table
+        reference_header (list[Any]): header row of the reference table
+        threshold (float): minimum similarity of aligned line items and headers, between 0 and 1
+
+    Returns:
+        tuple[pd.DataFrame, dict[str, Any]]: the aligned extracted cells, and a report of the alignment
+    """
+
+    extracted_line_items = extracted_cells["line_item"].unique().tolist()
+    reference_line_items = reference_cells["line_item"].unique().tolist()
+    line_item_alignment = align_labels(extracted_line_items, reference_line_items, threshold=threshold)
+    line_item_mapping = {
+        extracted_line_items[position]: reference_line_items[reference_position]
+        for position, (reference_position, _) in line_item_alignment.items()
+    }
+
+    # headers of the line item column are not
+    # aligned, as their cells are not compared
+    extracted_headers = [str(header) for header in extracted_header[1:]]
+    reference_headers = [str(header) for header in reference_header[1:]]
+    column_alignment = align_labels(extracted_headers, reference_headers, threshold=threshold)
+    column_mapping = {
+        position + 1: reference_position + 1 for position, (reference_position, _) in column_alignment.items()
+    }
+
+    # unaligned columns keep their position if it is still free,
+    # otherwise they are moved past all the existing columns
+    free_columns = set(range(1, len(reference_headers) + 1)) - set(column_mapping.values())
+    max_column = int(np.concatenate([extracted_cells["column"], reference_cells["column"]]).max(initial=0))
+    next_column = max(max_column, len(extracted_headers), len(reference_headers)) + 1
+    for column in range(1, len(extracted_headers) + 1):
+        if column in column_mapping:
+            continue
+
+        if column in free_columns:
+            column_mapping[column] = column
+            free_columns.discard(column)
+        else:
+            column_mapping[column] = next_column
+            next_column += 1
+
+    column_lookup = np.arange(max(max_column, len(extracted_headers)) + 1)
+    column_lookup[list(column_mapping)] = list(column_mapping.values())
+
+    aligned_cells = extracted_cells.assign(
+        line_item=extracted_cells["line_item"].map(line_item_mapping).fillna(extracted_cells["line_item"]),
+        column=column_lookup[extracted_cells["column"].to_numpy()],
+    )
+
+    report = {
+        "line_items": len(line_item_alignment),
+        "fuzzy_line_items": [
+            {
+                "extracted": extracted_line_items[position],
+                "reference": reference_line_items[reference_position],
+                "similarity": round(similarity, 4),
+            }
+            for position, (reference_position, similarity) in line_item_alignment.items()
+            if similarity < 1.0
+        ],
+        "columns": [
+            {"extracted": extracted_headers[position], "reference": reference_headers[reference_position]}
+            for position, (reference_position, _) in sorted(column_alignment.items())
+        ],
+    }
+    return aligned_cells, report
+
+
+def match_values(
+    extracted_values: pd.DataFrame,
+    reference_values: pd.DataFrame,
+    absolute_tolerance: float = EVALUATION_ABSOLUTE_TOLERANCE,
+    relative_tolerance: float = EVALUATION_RELATIVE_TOLERANCE,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compares aligned extracted and reference cells, both exactly and with a numeric tolerance. Numbers are close if
+    `|extracted - reference| <= absolute_tolerance + relative_tolerance * |reference|`.
+
+    Args:
+        extracted_values (pd.DataFrame): extracted cells, aligned with the reference cells
+        reference_values (pd.DataFrame): reference cells
+        absolute_tolerance (float): absolute tolerance of numeric values
+        relative_tolerance (float): relative tolerance of numeric values, to the reference value
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: exact and tolerant match masks
+    """
+
+    reference_strings = reference_values["value"].to_numpy()
+    extracted_strings = extracted_values["value"].to_numpy()
+    exact = reference_strings == extracted_strings
+
+    # only the values which differ are parsed,
+    # in a single vectorized pass per table
+    mismatched = np.flatnonzero(~exact)
+    reference_numbers = parse_financial_numbers(reference_strings[mismatched])
+    extracted_numbers = parse_financial_numbers(extracted_strings[mismatched])
+
+    # values which are not finite numbers, e.g. NaN or
+    # infinities, only ever match exactly
+    finite = np.isfinite(extracted_numbers) & np.isfinite(reference_numbers)
+    with np.errstate(invalid="ignore"):
+        close = finite & (
+            np.abs(extracted_numbers - reference_numbers)
+            <= absolute_tolerance + relative_tolerance * np.abs(reference_numbers)
+        )
+
+    tolerant = exact.copy()
+    tolerant[mismatched] = close
+    return exact, tolerant
+
+
+def count_matches(matched: np.ndarray, extracted_count: int, reference_count: int) -> dict[str, int]:
+    """Counts the confusion of the aligned cells.
+
+    Args:
+        matched (np.ndarray): match mask of the aligned cells
+        extracted_count (int): number of cells of the extracted table
+        reference_count (int): number of cells of the reference table
+
+    Returns:
+        dict[str, int]: true positive, false positive and false negative counts
+    """
+
+    # a mismatched value counts as a missed
+    # reference value, not as a false one
+    true_positives = int(np.count_nonzero(matched))
+    false_positives = extracted_count - len(matched)
+    false_negatives = reference_count - true_positives
+
+    return {
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+    }
+
+
+def scores_from_counts(true_positives: int, false_positives: int, false_negatives: int) -> dict[str, float]:
+    """Derives the precision, recall and F1 scores from confusion counts, like the `precision_score`, `recall_score`
+    and `f1_score` functions do from label lists.
+
+    Args:
+        true_positives (int): number of matched values
+        false_positives (int): number of extracted values missing from the reference
+        false_negatives (int): number of reference values missing or mismatched in the extraction
+
+    Returns:
+        dict[str, float]: precision, recall and F1 scores
+    """
+
+    predicted_positives = true_positives + false_positives
+    actual_positives = true_positives + false_negatives
+
+    precision = true_positives / predicted_positives if predicted_positives > 0 else 0
+    recall = true_positives / actual_positives if actual_positives > 0 else 0
+    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+
+    return {"precision": precision, "recall": recall, "f1-score": f1}
+
+
 def evaluate_extracted_vs_reference(
-    extracted_data: list[list[str]],
-    reference_data: list[list[str]],
+    extracted_data: list[list[str]] | pd.DataFrame,
+    reference_data: list[list[str]] | pd.DataFrame,
     source: str,
     reference: str,
+    absolute_tolerance: float = EVALUATION_ABSOLUTE_TOLERANCE,
+    relative_tolerance: float = EVALUATION_RELATIVE_TOLERANCE,
+    fuzzy_alignment: bool = EVALUATION_FUZZY_ALIGNMENT,
 ) -> dict[str, Any]:
-    """Takes in an extracted and reference P&L tables in the form of nested lists and evaluates the extraction
-    performance by converting them to a flattened dictionary to compare the corresponding values of the two tables.
+    """Takes in an extracted and reference P&L tables in the form of nested lists or frames and evaluates the extraction
+    performance by flattening them to cells keyed on their line item and column to compare the corresponding values of
+    the two tables. With fuzzy alignment, line items and columns are aligned by similarity and header beforehand.
 
     Args:
-        extracted_data (list[list[str]]): Table values of the extracted P&L statement
-        reference_data (list[list[str]]): Table values of the reference CSV to take as
+        extracted_data (list[list[str]] | pd.DataFrame): Table values of the extracted P&L statement
+        reference_data (list[list[str]] | pd.DataFrame): Table values of the reference CSV to take as
                                         the ground truth values
         source (str): Source file name
         reference (str): Reference file name
+        absolute_tolerance (float): absolute tolerance of numeric values for the tolerant scores
+        relative_tolerance (float): relative tolerance of numeric values for the tolerant scores
+        fuzzy_alignment (bool): whether to align line items by similarity and columns by header, instead of comparing
+            identical line items and column positions only
 
     Returns:
-        dict[str, Any]: Evaluation scores along with metadata
+        dict[str, Any]: Exact evaluation scores and confusion counts, and their numeric-tolerant counterparts under
+            `tolerant`, along with metadata
     """
 
-    if extracted_data and reference_data:
-        if len(extracted_data[0]) != len(reference_data[0]):
+    # tables with different columns can
+    # still be compared once aligned
+    if len(extracted_data) and len(reference_data) and not fuzzy_alignment:
+        if len(_table_header(extracted_data)) != len(_table_header(reference_data)):
             raise ColumnCountMismatchError
 
-    extracted_dict = convert_data_to_dict(extracted_data)
-    reference_dict = convert_data_to_dict(reference_data)
-
-    all_line_items = set(reference_dict.keys()).union(set(extracted_dict.keys()))
-
-    y_true = []
-    y_pred = []
-
-    for item in all_line_items:
-        if item in reference_dict and item in extracted_dict:
-            if reference_dict[item] == extracted_dict[item]:
-                y_true.append(1)
-                y_pred.append(1)
-            else:
-                y_true.append(1)
-                y_pred.append(0)
-        elif item in reference_dict:
-            y_true.append(1)
-            y_pred.append(0)
-        elif item in extracted_dict:
-            y_true.append(0)
-            y_pred.append(1)
-
-    precision = precision_score(y_true, y_pred)
-    recall = recall_score(y_true, y_pred)
-    f1 = f1_score(y_true, y_pred)
-
-    return {
+    extracted_cells = flatten_table(extracted_data)
+    reference_cells = flatten_table(reference_data)
+
+    alignment = None
+    if fuzzy_alignment:
+        extracted_cells, alignment = align_tables(
+            extracted_cells=extracted_cells,
+            reference_cells=reference_cells,
+            extracted_header=_table_header(extracted_data),
+            reference_header=_table_header(reference_data),
+        )
+
+    reference_indexes, extracted_indexes = align_cells(extracted_cells=extracted_cells, reference_cells=reference_cells)
+    exact, tolerant = match_values(
+        extracted_values=extracted_cells.iloc[extracted_indexes],
+        reference_values=reference_cells.iloc[reference_indexes],
+        absolute_tolerance=absolute_tolerance,
+        relative_tolerance=relative_tolerance,
+    )
+
+    exact_counts = count_matches(exact, extracted_count=len(extracted_cells), reference_count=len(reference_cells))
+    tolerant_counts = count_matches(
+        tolerant,
+        extracted_count=len(extracted_cells),
+        reference_count=len(reference_cells),
+    )
+
+    evaluation = {
         "extracted_data_from": source,
         "reference_data_from": reference,
-        "precision": precision,
-        "recall": recall,
-        "f1-score": f1,
+        **scores_from_counts(**exact_counts),
+        **exact_counts,
+        "tolerant": {
+            **scores_from_counts(**tolerant_counts),
+            **tolerant_counts,
+            "absolute_tolerance": absolute_tolerance,
+            "relative_tolerance": relative_tolerance,
+        },
     }
+
+    if alignment is not None:
+        evaluation["alignment"] = alignment
+
+    return evaluation
@@ -6,9 +6,18 @@ from pymongo import ASCENDING
 from pymongo import MongoClient
 from sanic.log import logger
 
+from plex.core.constants import ANALYSIS_JOB_COLLECTION
+from plex.core.constants import ANALYSIS_LEASE_COLLECTION
+from plex.core.constants import ANALYSIS_USAGE_COLLECTION
+from plex.core.constants import EVALUATION_COLLECTION
 from plex.core.constants import MONGO_DB
 from plex.core.constants import MONGO_URI
+from plex.core.constants import RESULT_CACHE_COLLECTION
 from plex.core.constants import SOURCE_COLLECTION
+from plex.core.constants import SOURCE_CONTENT_CODEC
+from plex.core.db.collections.source import decode_content
+from plex.core.db.collections.source import encode_content
+from plex.core.retrieval import split_into_chunks
 
 
 class MongoMigrations:
@@ -46,11 +55,16 @@ class MongoMigrations:
         collection_name: str,
         index_configs: list[tuple[str, int]],
         unique: bool = False,
+        expire_after_seconds: int | None = None,
     ) -> None:
         collection = self._db[collection_name]
         index_name = "_".join(key for key, _ in index_configs)
         if index_name not in collection.index_information():
-            collection.create_index(index_configs, unique=unique, name=index_name)
+            index_options: dict[str, Any] = {"unique": unique, "name": index_name}
+            if expire_after_seconds is not None:
+                index_options["expireAfterSeconds"] = expire_after_seconds
+
+            collection.create_index(index_configs, **index_options)
             logger.debug(
                 f"Index '{index_name}' created on collection '{collection_name}'.",
             )
@@ -64,6 +78,102 @@ class MongoMigrations:
                 ],
                 "unique": True,
             },
+            {
+                "collection": SOURCE_COLLECTION,
+                "index_configs": [
+                    ("raw_hash", ASCENDING),
+                ],
+            },
+            {
+                "collection": RESULT_CACHE_COLLECTION,
+                "index_configs": [
+                    ("cache_key", ASCENDING),
+                ],
+                "unique": True,
+            },
+            {
+                "collection": RESULT_CACHE_COLLECTION,
+                "index_configs": [
+                    ("expires_at", ASCENDING),
+                ],
+                "expire_after_seconds": 0,
+            },
+            {
+                "collection": RESULT_CACHE_COLLECTION,
+                "index_configs": [
+                    ("created_at", ASCENDING),
+                ],
+            },
+            {
+                "collection": ANALYSIS_JOB_COLLECTION,
+                "index_configs": [
+                    ("job_id", ASCENDING),
+                ],
+                "unique": True,
+            },
+            {
+                "collection": ANALYSIS_JOB_COLLECTION,
+                "index_configs": [
+                    ("status", ASCENDING),
+                    ("created_at", ASCENDING),
+                ],
+            },
+            {
+                "collection": ANALYSIS_JOB_COLLECTION,
+                "index_configs": [
+                    ("expires_at", ASCENDING),
+                ],
+                "expire_after_seconds": 0,
+            },
+            {
+                "collection": ANALYSIS_LEASE_COLLECTION,
+                "index_configs": [
+                    ("lease_key", ASCENDING),
+                ],
+                "unique": True,
+            },
+            {
+                "collection": ANALYSIS_LEASE_COLLECTION,
+                "index_configs": [
+                    ("expires_at", ASCENDING),
+                ],
+                "expire_after_seconds": 0,
+            },
+            {
+                "collection": EVALUATION_COLLECTION,
+                "index_configs": [
+                    ("evaluation_id", ASCENDING),
+                ],
+                "unique": True,
+            },
+            {
+                "collection": EVALUATION_COLLECTION,
+                "index_configs": [
+                    ("model", ASCENDING),
+                    ("prompt_version", ASCENDING),
+                    ("created_at", ASCENDING),
+                ],
+            },
+            {
+                "collection": EVALUATION_COLLECTION,
+                "index_configs": [
+                    ("created_at", ASCENDING),
+                ],
+            },
+            {
+                "collection": ANALYSIS_USAGE_COLLECTION,
+                "index_configs": [
+                    ("model", ASCENDING),
+                    ("prompt_version", ASCENDING),
+                    ("created_at", ASCENDING),
+                ],
+            },
+            {
+                "collection": ANALYSIS_USAGE_COLLECTION,
+                "index_configs": [
+                    ("created_at", ASCENDING),
+                ],
+            },
         ]
 
         collections = {_["collection"] for _ in collections_and_indexes}
@@ -79,6 +189,7 @@ class MongoMigrations:
             collection_name = _["collection"]
             index_configs = _["index_configs"]
             unique = _.get("unique", False)
+            expire_after_seconds = _.get("expire_after_seconds")
 
             if not index_configs:
                 continue
@@ -88,8 +199,66 @@ class MongoMigrations:
                     collection_name=collection_name,
                     index_configs=index_configs,
                     unique=unique,
+                    expire_after_seconds=expire_after_seconds,
                 )
 
             except Exception as e:
                 logger.error("Database migrations failed due to an index creation error")
                 raise e
+
+    def rebuild_chunk_indexes(self, force: bool = False) -> int:
+        """Builds the chunk indexes of the source documents uploaded before chunk indexing was introduced.
+
+        Args:
+            force (bool): whether to rebuild the existing chunk indexes as well
+
+        Returns:
+            int: number of source documents indexed
+        """
+
+        collection = self._db[SOURCE_COLLECTION]
+        query = {} if force else {"chunk_index": {"$exists": False}}
+        indexed_count = 0
+
+        for source in collection.find(query, projection={"file_name": 1, "content": 1, "content_codec": 1}):
+            content = decode_content(source["content"], source.get("content_codec"))
+            collection.update_one(
+                filter={"_id": source["_id"]},
+                update={"$set": {"chunk_index": split_into_chunks(content)}},
+            )
+            indexed_count += 1
+            logger.debug(f"Chunk index built for the source file '{source['file_name']}'.")
+
+        return indexed_count
+
+    def recompress_sources(self, codec: str = SOURCE_CONTENT_CODEC) -> int:
+        """Re-encodes the content of the source documents stored with a different codec.
+
+        Args:
+            codec (str): storage codec to re-encode the content with
+
+        Returns:
+            int: number of source documents re-encoded
+        """
+
+        collection = self._db[SOURCE_COLLECTION]
+        # sources without a codec hold plain text
+        codecs = [codec, None] if codec == "plain" else [codec]
+        recompressed_count = 0
+
+        for source in collection.find(
+            {"content_codec": {"$nin": codecs}},
+            projection={"file_name": 1, "content": 1, "content_codec": 1},
+        ):
+            content, used_codec = encode_content(decode_content(source["content"], source.get("content_codec")), codec)
+            if used_codec == source.get("content_codec"):
+                continue
+
+            collection.update_one(
+                filter={"_id": source["_id"]},
+                update={"$set": {"content": content, "content_codec": used_codec}},
+            )
+            recompressed_count += 1
+            logger.debug(f"Content of the source file '{source['file_name']}' re-encoded with {used_codec}.")
+
+        return recompressed_count
@@ -5,3 +5,23 @@ class AnalyzerInitializationError(PLEXError):
     def __init__(self, message: str = "Failed to construct the LLM from provided configs"):
         self.message = message
         super().__init__(self.message)
+
+
+class AnalysisJobNotFoundError(PLEXError):
+    def __init__(self, message: str = "The analysis job does not exist"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class LLMRateLimitedError(PLEXError):
+    def __init__(self, message: str = "The LLM API rate limit was exceeded", retry_after: float = 0.0):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class LLMUnavailableError(PLEXError):
+    def __init__(self, message: str = "The LLM API is currently unavailable", retry_after: float = 0.0):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
@@ -23,3 +23,15 @@ class CSVParsingError(PLEXError):
     def __init__(self, message: str = "Could not parse the CSV file data"):
         self.message = message
         super().__init__(self.message)
+
+
+class InvalidEvaluationManifestError(PLEXError):
+    def __init__(self, message: str = "The evaluation manifest is not valid"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class TooManyEvaluationPairsError(PLEXError):
+    def __init__(self, message: str = "Too many extracted and reference data pairs are specified"):
+        self.message = message
+        super().__init__(self.message)
@@ -35,3 +35,45 @@ class SourceFilePersistError(PLEXError):
     def __init__(self, message: str = "Failed to persist the source file"):
         self.message = message
         super().__init__(self.message)
+
+
+class PageLimitExceededError(PLEXError):
+    def __init__(self, message: str = "The source file exceeds the maximum number of pages"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class MalformedSourceFileError(PLEXError):
+    def __init__(self, message: str = "The source file is malformed"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ConversionTimeoutError(PLEXError):
+    def __init__(self, message: str = "The source file could not be converted in time"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ConversionPoolSaturatedError(PLEXError):
+    def __init__(self, message: str = "The server is busy converting other source files"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class SourceFileTooLargeError(PLEXError):
+    def __init__(self, message: str = "The source file exceeds the maximum upload size"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidQueryParameterError(PLEXError):
+    def __init__(self, message: str = "The provided query parameters are invalid"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class TooManySourceFilesError(PLEXError):
+    def __init__(self, message: str = "Too many source files are attached"):
+        self.message = message
+        super().__init__(self.message)
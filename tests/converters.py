@@ -0,0 +1,10 @@
+import time
+
+
+# kept apart from the tests, since the spawned conversion
+# processes import the module of the converter they run
+def convert(source: str, file_extension: str, max_pages: int) -> str:
+    if file_extension == "hang":
+        time.sleep(60)
+
+    return source.upper()
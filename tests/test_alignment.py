@@ -0,0 +1,39 @@
+from plex.core.alignment import align_labels
+from plex.core.alignment import NGramIndex
+from plex.core.alignment import normalize_label
+
+
+def test_normalize_label() -> None:
+    assert normalize_label("  Profit / (Loss) for the Period ") == "profit loss for the period"
+
+
+def test_ngram_index_search() -> None:
+    index = NGramIndex(["Revenue", "Cost of sales", "Administrative expenses"])
+
+    matches = index.search("Admin. expenses", threshold=0.6)
+
+    assert [position for _, position in matches] == [2]
+    assert index.search("Dividends paid", threshold=0.6) == []
+
+
+def test_align_labels() -> None:
+    labels = ["REVENUE", "Cost of Sales", "Gross profit (loss)", "Admin expenses", "Dividends paid", "Revenue"]
+    reference_labels = ["Revenue", "Cost of sales", "Gross profit", "Administrative expenses", "Finance costs"]
+
+    alignment = align_labels(labels, reference_labels, threshold=0.6)
+
+    # identical labels take precedence over the ones
+    # equal once normalized, and dissimilar ones stay unaligned
+    assert alignment[5] == (0, 1.0)
+    assert alignment[1] == (1, 1.0)
+    assert alignment[2][0] == 2
+    assert alignment[3][0] == 3
+    assert 0.6 <= alignment[3][1] < alignment[2][1] < 1.0
+    assert 0 not in alignment
+    assert 4 not in alignment
+
+
+def test_align_labels_one_to_one() -> None:
+    alignment = align_labels(["Finance cost", "Finance costs"], ["Finance costs", "Finance income"], threshold=0.6)
+
+    assert alignment == {1: (0, 1.0)}
@@ -0,0 +1,70 @@
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+from converters import convert
+
+from plex.core.conversion import ConversionPool
+from plex.shared.exceptions.source import ConversionPoolSaturatedError
+from plex.shared.exceptions.source import ConversionTimeoutError
+
+
+@pytest.fixture
+def pool() -> Iterator[ConversionPool]:
+    # started like the server listeners do,
+    # without running a Sanic app
+    pool = ConversionPool(processes=2, queue_size=0, timeout=5.0)
+    pool._executor = pool._create_executor()
+    pool._slots = asyncio.Semaphore(pool.processes + pool.queue_size)
+    yield pool
+
+    for executor in list(pool._in_flight):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _wait_for_free_slots(pool: ConversionPool) -> int:
+    # slots are released by the callbacks of the
+    # futures, which the executor thread schedules
+    for _ in range(50):
+        if pool._slots._value == pool.processes + pool.queue_size:
+            break
+        await asyncio.sleep(0.1)
+
+    return pool._slots._value
+
+
+def test_conversion_pool_fails_fast_when_saturated(pool: ConversionPool) -> None:
+    async def run() -> None:
+        conversions = [asyncio.create_task(pool._submit(convert, "a", "txt", wait=False)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(ConversionPoolSaturatedError):
+            await pool._submit(convert, "b", "txt", wait=False)
+
+        assert await asyncio.gather(*conversions) == ["A", "A"]
+        assert await pool._submit(convert, "c", "txt", wait=False) == "C"
+
+    asyncio.run(run())
+
+
+def test_conversion_pool_frees_the_slots_of_stuck_conversions(pool: ConversionPool) -> None:
+    async def run() -> None:
+        assert await asyncio.gather(*(pool._submit(convert, "a", "txt", wait=True) for _ in range(2))) == ["A", "A"]
+        stuck_executor = pool._executor
+        pool.timeout = 1.0
+
+        with pytest.raises(ConversionTimeoutError):
+            await pool._submit(convert, "b", "hang", wait=True)
+
+        # the stuck process is terminated once the other
+        # conversions of its pool had the time to finish
+        await asyncio.gather(*pool._retirements)
+
+        assert await _wait_for_free_slots(pool) == 2
+        assert stuck_executor not in pool._in_flight
+        assert pool._executor is not stuck_executor
+
+        pool.timeout = 5.0
+        assert await pool._submit(convert, "c", "txt", wait=True) == "C"
+
+    asyncio.run(run())
@@ -0,0 +1,181 @@
+import json
+import zipfile
+from io import BytesIO
+
+import pytest
+from sanic.request import File
+
+from benchmarks.synthetic import PROFIT_AND_LOSS_STATEMENT
+from benchmarks.synthetic import reference_csv
+from plex.core.evaluation import aggregate_evaluations
+from plex.core.evaluation import evaluate_pair
+from plex.core.evaluation import read_evaluation_archive
+from plex.core.evaluation import read_evaluation_manifest
+from plex.shared.exceptions.results import DataFileNotSpecifiedError
+from plex.shared.exceptions.results import InvalidEvaluationManifestError
+
+
+def _archive(files: dict[str, bytes]) -> bytes:
+    body = BytesIO()
+    with zipfile.ZipFile(body, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+
+    return body.getvalue()
+
+
+def _reference_file(name: str) -> File:
+    return File(type="text/csv", body=reference_csv(), name=name)
+
+
+def test_read_evaluation_manifest() -> None:
+    manifest = json.dumps(
+        [
+            {"source": "b.pdf", "extracted_data": [["Line Item", "2024"]], "reference": "b.csv"},
+            {"extracted_data": [["Line Item", "2024"]], "reference": "a.csv"},
+        ],
+    )
+
+    pairs = read_evaluation_manifest(manifest, attachments=[_reference_file("a.csv"), _reference_file("b.csv")])
+
+    assert [(pair["source"], pair["reference"]) for pair in pairs] == [("b.pdf", "b.csv"), ("Unknown", "a.csv")]
+    assert pairs[0]["reference_body"] == reference_csv()
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [
+        "not json",
+        json.dumps({"extracted_data": [], "reference": "a.csv"}),
+        json.dumps([["a.csv"]]),
+        json.dumps([{"source": "a.pdf", "reference": "a.csv"}]),
+        json.dumps([{"extracted_data": [], "reference": "missing.csv"}]),
+    ],
+)
+def test_read_evaluation_manifest_rejects_malformed_manifests(manifest: str) -> None:
+    with pytest.raises(InvalidEvaluationManifestError):
+        read_evaluation_manifest(manifest, attachments=[_reference_file("a.csv")])
+
+
+def test_read_evaluation_archive() -> None:
+    body = _archive(
+        {
+            "q2/b.json": b"[]",
+            "q2/b.csv": b"b",
+            "a.json": b"[]",
+            "a.csv": b"a",
+            "__MACOSX/.a.json": b"",
+            "notes.txt": b"ignored",
+        },
+    )
+
+    pairs = read_evaluation_archive(body, max_size=1024)
+
+    assert [(pair["source"], pair["reference"], pair["reference_body"]) for pair in pairs] == [
+        ("a", "a.csv", b"a"),
+        ("b", "b.csv", b"b"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"not a zip file",
+        _archive({"a.json": b"[]", "a.csv": b"a", "b.json": b"[]"}),
+        _archive({"a.json": b"[]", "q2/a.csv": b"a"}),
+        _archive({"a.json": b"[]", "a.csv": b"a" * 2048}),
+    ],
+)
+def test_read_evaluation_archive_rejects_malformed_archives(body: bytes) -> None:
+    with pytest.raises(InvalidEvaluationManifestError):
+        read_evaluation_archive(body, max_size=1024)
+
+
+def test_evaluate_pair() -> None:
+    pair = {
+        "source": "a.pdf",
+        "reference": "a.csv",
+        "extracted_data": json.dumps(PROFIT_AND_LOSS_STATEMENT).encode(),
+        "reference_body": reference_csv(),
+    }
+
+    evaluation = evaluate_pair(pair)
+
+    assert evaluation["extracted_data_from"] == "a.pdf"
+    assert evaluation["f1-score"] == 1.0
+
+
+@pytest.mark.parametrize("extracted_data", [b"[[", '{"Revenue": 1}', "[1, 2]"])
+def test_evaluate_pair_rejects_malformed_extracted_data(extracted_data: str | bytes) -> None:
+    pair = {
+        "source": "a.pdf",
+        "reference": "a.csv",
+        "extracted_data": extracted_data,
+        "reference_body": reference_csv(),
+    }
+
+    with pytest.raises(InvalidEvaluationManifestError):
+        evaluate_pair(pair)
+
+
+def test_evaluate_pair_rejects_empty_data() -> None:
+    pair = {"source": "a.pdf", "reference": "a.csv", "extracted_data": [], "reference_body": reference_csv()}
+
+    with pytest.raises(DataFileNotSpecifiedError):
+        evaluate_pair(pair)
+
+
+def test_aggregate_evaluations() -> None:
+    evaluations = [
+        {
+            "precision": 1.0,
+            "recall": 0.5,
+            "f1-score": 2 / 3,
+            "true_positives": 2,
+            "false_positives": 0,
+            "false_negatives": 2,
+            "tolerant": {
+                "precision": 1.0,
+                "recall": 1.0,
+                "f1-score": 1.0,
+                "true_positives": 4,
+                "false_positives": 0,
+                "false_negatives": 0,
+            },
+        },
+        {
+            "precision": 0.5,
+            "recall": 1.0,
+            "f1-score": 2 / 3,
+            "true_positives": 8,
+            "false_positives": 8,
+            "false_negatives": 0,
+            "tolerant": {
+                "precision": 0.5,
+                "recall": 1.0,
+                "f1-score": 2 / 3,
+                "true_positives": 8,
+                "false_positives": 8,
+                "false_negatives": 0,
+            },
+        },
+    ]
+
+    aggregate = aggregate_evaluations(evaluations)
+
+    # micro averages weigh the larger second table more
+    assert aggregate["evaluated"] == 2
+    assert aggregate["micro"]["precision"] == pytest.approx(10 / 18)
+    assert aggregate["micro"]["recall"] == pytest.approx(10 / 12)
+    assert aggregate["macro"]["precision"] == pytest.approx(0.75)
+    assert aggregate["macro"]["f1-score"] == pytest.approx(2 / 3)
+    assert aggregate["tolerant"]["micro"]["true_positives"] == 12
+    assert aggregate["tolerant"]["macro"]["recall"] == pytest.approx(1.0)
+
+
+def test_aggregate_evaluations_of_nothing() -> None:
+    aggregate = aggregate_evaluations([])
+
+    assert aggregate["evaluated"] == 0
+    assert aggregate["micro"]["f1-score"] == 0
+    assert aggregate["macro"]["f1-score"] == 0
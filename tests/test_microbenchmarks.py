@@ -0,0 +1,73 @@
+from typing import Any
+
+import pytest
+
+from benchmarks.microbenchmarks import _find_regressions
+from benchmarks.microbenchmarks import _scaling_exponents
+
+
+def _result(name: str, size: int, median_seconds: float, peak_memory_bytes: int) -> dict[str, Any]:
+    return {"name": name, "size": size, "median_seconds": median_seconds, "peak_memory_bytes": peak_memory_bytes}
+
+
+def test_find_regressions() -> None:
+    baseline = {
+        "results": [
+            _result("load_csv", 100, median_seconds=0.1, peak_memory_bytes=1000),
+            _result("load_csv", 1000, median_seconds=1.0, peak_memory_bytes=10000),
+            _result("flatten_table", 100, median_seconds=0.1, peak_memory_bytes=1000),
+        ],
+    }
+    results = [
+        _result("load_csv", 100, median_seconds=0.2, peak_memory_bytes=1050),
+        _result("load_csv", 1000, median_seconds=1.2, peak_memory_bytes=12000),
+        _result("flatten_table", 100, median_seconds=0.05, peak_memory_bytes=500),
+        _result("flatten_table", 1000, median_seconds=10.0, peak_memory_bytes=100000),
+    ]
+
+    regressions = _find_regressions(results, baseline=baseline, time_threshold=0.25, memory_threshold=0.1)
+
+    # improvements, increases within the thresholds and
+    # sizes missing from the baseline are not flagged
+    assert regressions == [
+        {
+            "name": "load_csv",
+            "size": 100,
+            "metric": "median_seconds",
+            "baseline": 0.1,
+            "current": 0.2,
+            "ratio": 2.0,
+        },
+        {
+            "name": "load_csv",
+            "size": 1000,
+            "metric": "peak_memory_bytes",
+            "baseline": 10000,
+            "current": 12000,
+            "ratio": 1.2,
+        },
+    ]
+
+
+def test_find_regressions_within_noise() -> None:
+    baseline = {"results": [_result("generate_content_hash", 10, median_seconds=0.0001, peak_memory_bytes=0)]}
+    results = [_result("generate_content_hash", 10, median_seconds=0.0009, peak_memory_bytes=100)]
+
+    # timings differing by less than the noise of the machine, and
+    # memory compared with an empty baseline, can not regress
+    assert _find_regressions(results, baseline=baseline, time_threshold=0.25, memory_threshold=0.1) == []
+    assert _find_regressions(results, baseline={}, time_threshold=0.25, memory_threshold=0.1) == []
+
+
+def test_scaling_exponents() -> None:
+    results = [
+        *(_result("linear", size, median_seconds=size * 1e-6, peak_memory_bytes=0) for size in (10, 100, 1000)),
+        *(_result("quadratic", size, median_seconds=size**2 * 1e-6, peak_memory_bytes=0) for size in (10, 100)),
+        _result("single", 10, median_seconds=1.0, peak_memory_bytes=0),
+    ]
+
+    exponents = _scaling_exponents(results)
+
+    assert exponents["linear"] == pytest.approx(1.0)
+    assert exponents["quadratic"] == pytest.approx(2.0)
+    assert exponents["single"] is None
@@ -0,0 +1,119 @@
+import pytest
+
+from plex.core.constants import LATEST_AVAILABLE_QUARTER
+from plex.core.retrieval import detect_quarter_labels
+from plex.core.retrieval import resolve_quarter_months
+from plex.core.retrieval import select_shared_content
+from plex.core.retrieval import split_into_chunks
+from plex.core.retrieval import split_into_windows
+
+PROFIT_AND_LOSS_ROWS = [
+    ("Revenue", "1,250,400"),
+    ("Cost of sales", "(812,760)"),
+    ("Gross profit", "437,640"),
+    ("Profit before tax", "245,710"),
+    ("Income tax expense", "(73,713)"),
+    ("Profit for the period", "171,997"),
+]
+NOTES = "\n\n".join(["The Group continued to invest in its distribution network during the period."] * 12)
+
+
+def _table(label: str, rows: list[tuple[str, str]]) -> str:
+    return "\n".join([f"| Line Item | {label} |", "|---|---|", *(f"| {item} | {value} |" for item, value in rows)])
+
+
+def _report() -> str:
+    return "\f".join(
+        [
+            f"# Interim Report\n\n{NOTES}",
+            "## Statement of Financial Position\n\n"
+            + _table("As at 30 June 2024", [("Total assets", "9,120,000"), ("Total equity", "9,120,000")]),
+            "## Statement of Profit or Loss\n\n" + _table("3 months to 30 June 2024", PROFIT_AND_LOSS_ROWS),
+            f"## Notes\n\n{NOTES}",
+            "## Statement of Profit or Loss\n\n" + _table("3 months to 31 March 2024", PROFIT_AND_LOSS_ROWS),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "quarter, months",
+    [
+        ("Q3", {"sep"}),
+        ("q1 2024", {"mar"}),
+        ("3 months to Sep 30th", {"sep"}),
+        ("3 months to 30th September", {"sep"}),
+        ("Quarter ended Sept. 30", {"sep"}),
+        ("3 months to 31st Dec", {"dec"}),
+        (LATEST_AVAILABLE_QUARTER, set()),
+    ],
+)
+def test_resolve_quarter_months(quarter: str, months: set[str]) -> None:
+    assert resolve_quarter_months(quarter) == months
+
+
+@pytest.mark.parametrize("quarter", ["Summary quarter", "Primary quarter", "Decimal quarter", "Marketing", "Mary"])
+def test_resolve_quarter_months_ignores_words_holding_months(quarter: str) -> None:
+    assert resolve_quarter_months(quarter) == set()
+
+
+def test_detect_quarter_labels() -> None:
+    text = "3 Months to 30th Sep 2024 | 3 months ended 31st\nMarch 2024 | Quarter ended the 30th of June"
+
+    assert detect_quarter_labels(text) == ["jun", "mar", "sep"]
+
+
+def test_detect_quarter_labels_ignores_words_holding_months() -> None:
+    assert detect_quarter_labels("3 months to summary | quarter ended decimal | quarter to marketing") == []
+
+
+def test_split_into_chunks_splits_pages() -> None:
+    content = _report()
+    chunks = split_into_chunks(content)
+
+    assert [chunk["page"] for chunk in chunks] == [1, 2, 3, 4, 5]
+    assert [chunk["kind"] for chunk in chunks] == ["page", "table", "table", "page", "table"]
+    assert [chunk["quarters"] for chunk in chunks] == [[], [], ["jun"], [], ["mar"]]
+    assert content[chunks[2]["start"] : chunks[2]["end"]].startswith("## Statement of Profit or Loss")
+
+
+def test_split_into_chunks_keeps_tables_of_large_pages_whole() -> None:
+    table = _table("3 months to 30 June 2024", PROFIT_AND_LOSS_ROWS)
+    content = f"{NOTES}\n\n{table}\n\n{NOTES}"
+    chunks = split_into_chunks(content, max_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(chunk["tokens"] <= 100 for chunk in chunks)
+    assert any(table in content[chunk["start"] : chunk["end"]] for chunk in chunks)
+
+
+@pytest.mark.parametrize("quarter, label", [("Q2", "30 June 2024"), ("Q1", "31 March 2024")])
+def test_select_shared_content_selects_the_requested_statement(quarter: str, label: str) -> None:
+    selected_content = select_shared_content(_report(), [quarter], token_budget=70)
+
+    assert selected_content.startswith("## Statement of Profit or Loss")
+    assert label in selected_content
+    assert "Total assets" not in selected_content
+    assert "distribution network" not in selected_content
+
+
+def test_select_shared_content_joins_the_statements_of_all_quarters() -> None:
+    selected_content = select_shared_content(_report(), ["Q1", "Q2"], token_budget=70)
+
+    assert selected_content.index("30 June 2024") < selected_content.index("[...]")
+    assert selected_content.index("[...]") < selected_content.index("31 March 2024")
+
+
+def test_select_shared_content_falls_back_to_the_full_content() -> None:
+    content = "\f".join([NOTES, NOTES])
+
+    assert select_shared_content(content, ["Q2"], token_budget=70) == content
+    assert select_shared_content(_report(), ["Q2"], token_budget=10_000) == _report()
+
+
+def test_split_into_windows_covers_all_chunks() -> None:
+    content = _report()
+    windows = split_into_windows(content, max_tokens=300)
+
+    assert len(windows) > 1
+    assert "# Interim Report" in windows[0]
+    assert "31 March 2024" in windows[-1]
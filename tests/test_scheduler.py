@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from plex.core.langchain.scheduler import CircuitBreaker
+from plex.core.langchain.scheduler import LLMScheduler
+from plex.core.langchain.scheduler import TokenBucket
+from plex.shared.exceptions.analyzer import LLMRateLimitedError
+from plex.shared.exceptions.analyzer import LLMUnavailableError
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def _rate_limit_error(retry_after: str | None = None) -> openai.RateLimitError:
+    response = httpx.Response(
+        429,
+        headers={"retry-after": retry_after} if retry_after else {},
+        request=httpx.Request("POST", "https://llm.test/chat/completions"),
+    )
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_starts_full_and_refills_over_time() -> None:
+    async def run() -> list[float]:
+        # 600 per minute refill one token every 0.1s
+        bucket = TokenBucket(capacity_per_minute=600)
+        started_at = time.monotonic()
+        await bucket.acquire(600)
+        drained_at = time.monotonic()
+        await bucket.acquire(2)
+        return [drained_at - started_at, time.monotonic() - drained_at]
+
+    drain_seconds, refill_seconds = asyncio.run(run())
+
+    assert drain_seconds < 0.05
+    assert 0.15 <= refill_seconds < 0.5
+
+
+def test_token_bucket_serves_waiters_in_order() -> None:
+    async def run() -> list[int]:
+        bucket = TokenBucket(capacity_per_minute=600)
+        await bucket.acquire(600)
+        served: list[int] = []
+
+        async def wait(waiter: int) -> None:
+            await bucket.acquire(1)
+            served.append(waiter)
+
+        await asyncio.gather(*(wait(waiter) for waiter in range(5)))
+        return served
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+
+
+def test_token_bucket_does_not_wait_forever() -> None:
+    async def run() -> None:
+        # unlimited buckets never wait, and amounts
+        # larger than the capacity are capped to it
+        await TokenBucket(capacity_per_minute=0).acquire(10**9)
+        await asyncio.wait_for(TokenBucket(capacity_per_minute=600).acquire(10**9), timeout=0.5)
+
+    asyncio.run(run())
+
+
+def test_circuit_breaker_opens_after_consecutive_failures(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.record_success()
+
+    for _ in range(3):
+        assert breaker.state == "closed"
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == "open"
+    clock.now += 10
+    with pytest.raises(LLMUnavailableError) as error:
+        breaker.before_call()
+
+    assert error.value.retry_after == pytest.approx(20)
+
+
+def test_circuit_breaker_lets_a_single_trial_through(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.state == "half-open"
+    breaker.before_call()
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    # a failed trial opens the circuit again
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_circuit_breaker_releases_cancelled_trials(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    breaker.release_trial()
+    breaker.before_call()
+
+
+def _scheduler(**kwargs: float) -> LLMScheduler:
+    return LLMScheduler(
+        **{
+            "max_concurrency": 2,
+            "requests_per_minute": 0,
+            "tokens_per_minute": 0,
+            "max_retries": 2,
+            "retry_base_delay": 0.01,
+            "retry_max_delay": 0.05,
+            "failure_threshold": 10,
+            "reset_timeout": 30,
+            **kwargs,
+        },
+    )
+
+
+def test_scheduler_retries_transient_failures() -> None:
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise _rate_limit_error(retry_after="0")
+        return "extracted"
+
+    assert asyncio.run(_scheduler().run(call, estimated_tokens=100)) == "extracted"
+    assert len(attempts) == 3
+
+
+def test_scheduler_gives_up_with_the_retry_after_of_the_api() -> None:
+    async def call() -> str:
+        raise _rate_limit_error(retry_after="0.02")
+
+    with pytest.raises(LLMRateLimitedError) as error:
+        asyncio.run(_scheduler(max_retries=1).run(call, estimated_tokens=100))
+
+    assert error.value.retry_after == pytest.approx(0.02)
+
+
+def test_scheduler_does_not_retry_errors_of_the_request() -> None:
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(len(attempts))
+        raise ValueError("invalid request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(_scheduler().run(call, estimated_tokens=100))
+
+    assert len(attempts) == 1
+
+
+def test_scheduler_fails_fast_once_the_circuit_opens() -> None:
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(len(attempts))
+        raise _rate_limit_error(retry_after="0")
+
+    scheduler = _scheduler(failure_threshold=2, max_retries=5)
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(scheduler.run(call, estimated_tokens=100))
+
+    assert len(attempts) == 2
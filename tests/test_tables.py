@@ -0,0 +1,126 @@
+import pytest
+
+from plex.core.constants import LATEST_AVAILABLE_QUARTER
+from plex.core.tables import extract_profit_and_loss_table
+from plex.core.tables import parse_markdown_tables
+
+HEADER = ["Line Item", "3 months to 30 June 2024", "3 months to 30 June 2023", "Change %", "3 months to 31 March 2024"]
+ROWS = [
+    ["Revenue", "1,250", "1,108", "12.8", "1,100"],
+    ["Cost of sales", "(812)", "(731)", "11.1", "(700)"],
+    ["Gross Profit", "438", "377", "16.1", "400"],
+    ["Profit before tax", "246", "195", "26.2", "210"],
+    ["Income tax expense", "(74)", "(58)", "26.2", "(60)"],
+    ["Profit for the period", "172", "137", "26.2", "150"],
+]
+
+
+def _table(
+    header: list[str] = HEADER,
+    rows: list[list[str]] = ROWS,
+    context: str = "Statement of Profit or Loss",
+) -> str:
+    lines = [context, "", f"| {' | '.join(header)} |", "|" + "---|" * len(header)]
+    lines.extend(f"| {' | '.join(row)} |" for row in rows)
+    return "\n".join(lines) + "\n\n"
+
+
+def _columns(rows: list[list[str]], *columns: int) -> list[list[str]]:
+    return [[row[column] for column in (0, *columns)] for row in rows]
+
+
+def test_parse_markdown_tables() -> None:
+    tables = parse_markdown_tables("Intro\n\n| a | b \\| c |\n|:--|--:|\n| 1 | 2 |\nSome text\n| x |")
+
+    assert tables == [
+        {"context": "Intro", "rows": [["a", "b | c"], ["1", "2"]]},
+        {"context": "Some text", "rows": [["x"]]},
+    ]
+
+
+@pytest.mark.parametrize("quarter", ["Q2", "3 months to 30th June"])
+def test_extract_profit_and_loss_table_of_quarter(quarter: str) -> None:
+    extraction = extract_profit_and_loss_table(_table(), quarter=quarter)
+
+    # the change column next to the quarter columns is kept
+    assert extraction == {"extracted_items": _columns([HEADER, *ROWS], 1, 2, 3), "confidence": 1.0}
+
+
+def test_extract_profit_and_loss_table_of_other_quarter() -> None:
+    extraction = extract_profit_and_loss_table(_table(), quarter="Q1")
+
+    assert extraction == {"extracted_items": _columns([HEADER, *ROWS], 4), "confidence": 1.0}
+    assert extract_profit_and_loss_table(_table(), quarter="Q3") is None
+
+
+@pytest.mark.parametrize("quarter", [LATEST_AVAILABLE_QUARTER, "Summary quarter", "Primary statements"])
+def test_extract_profit_and_loss_table_of_latest_quarter(quarter: str) -> None:
+    extraction = extract_profit_and_loss_table(_table(), quarter=quarter)
+
+    # the latest quarter and its comparative are kept,
+    # while the previous quarter of the year is not
+    assert extraction is not None
+    assert extraction["extracted_items"] == _columns([HEADER, *ROWS], 1, 2, 3)
+
+
+def test_extract_profit_and_loss_table_of_quarters_without_years() -> None:
+    header = ["Line Item", "3 months to 30 June", "3 months to 31 March"]
+    rows = _columns(ROWS, 1, 4)
+    content = _table(header, rows=rows)
+
+    assert extract_profit_and_loss_table(content, quarter=LATEST_AVAILABLE_QUARTER) is None
+    assert extract_profit_and_loss_table(content, quarter="Q1")["extracted_items"] == _columns([header, *rows], 2)
+
+
+def test_extract_profit_and_loss_table_of_group_columns() -> None:
+    content = (
+        "| | Group | | Company | |\n"
+        "| Line Item | 3 months to 30 June 2024 | 3 months to 30 June 2023 | 3 months to 30 June 2024 "
+        "| 3 months to 30 June 2023 |\n"
+        "|---|---|---|---|---|\n"
+    )
+    content += "".join(f"| {row[0]} | {row[1]} | {row[2]} | {row[4]} | {row[4]} |\n" for row in ROWS)
+
+    extraction = extract_profit_and_loss_table(content, quarter="Q2")
+
+    assert extraction["extracted_items"] == [
+        ["Line Item", "Group 3 months to 30 June 2024", "Group 3 months to 30 June 2023"],
+        *_columns(ROWS, 1, 2),
+    ]
+
+
+def test_extract_profit_and_loss_table_of_selected_line_items() -> None:
+    extraction = extract_profit_and_loss_table(_table(), quarter="Q1", selected_extraction=True)
+
+    assert extraction["extracted_items"] == _columns([HEADER, ROWS[2], ROWS[3], ROWS[5]], 4)
+
+
+def test_extract_profit_and_loss_table_confidence() -> None:
+    # statements missing some of the line items are trusted less
+    extraction = extract_profit_and_loss_table(_table(rows=ROWS[1:]), quarter="Q1")
+    assert extraction["confidence"] == 0.9
+
+    extraction = extract_profit_and_loss_table(_table(rows=[ROWS[0], ROWS[3], ROWS[5]]), quarter="Q1")
+    assert extraction["confidence"] == pytest.approx(0.8)
+
+    assert extract_profit_and_loss_table(_table(rows=ROWS[4:]), quarter="Q1") is None
+
+
+def test_extract_profit_and_loss_table_of_other_statements() -> None:
+    rows = [*ROWS, ["Cash flows from operating activities", "1", "2", "3", "4"]]
+
+    assert extract_profit_and_loss_table(_table(rows=rows), quarter="Q1") is None
+
+
+def test_extract_profit_and_loss_table_of_several_statements() -> None:
+    company_rows = [[row[0], *reversed(row[1:])] for row in ROWS]
+    content = _table(rows=company_rows, context="Company statement") + _table(context="Consolidated statement")
+
+    extraction = extract_profit_and_loss_table(content, quarter="Q1")
+
+    assert extraction == {"extracted_items": _columns([HEADER, *ROWS], 4), "confidence": 1.0}
+
+    # statements which can not be told apart are not trusted
+    extraction = extract_profit_and_loss_table(_table() + _table(rows=company_rows), quarter="Q1")
+
+    assert extraction["confidence"] == 0.5
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import random
+from collections.abc import Iterator
+from types import SimpleNamespace
+
+import pytest
+
+from plex.core.uploads import MAX_PART_HEADERS_SIZE
+from plex.core.uploads import MultipartFileParser
+from plex.core.uploads import spool_upload
+from plex.shared.exceptions.source import SourceFileNotSpecifiedError
+from plex.shared.exceptions.source import SourceFileTooLargeError
+
+BOUNDARY = "----plexboundary42"
+# file content resembling the delimiter, to catch
+# delimiters wrongly detected across chunk edges
+FILE_CONTENT = b"%PDF-1.4\r\n" + b"\r\n--" + BOUNDARY.encode()[:-1] + b"\r\n--\r\n" + bytes(range(256)) * 40 + b"\r\n"
+
+
+def _part(headers: str, content: bytes) -> bytes:
+    return f"--{BOUNDARY}\r\n{headers}\r\n\r\n".encode() + content + b"\r\n"
+
+
+def _multipart_body(content: bytes = FILE_CONTENT, field_name: str = "attachments") -> bytes:
+    return b"".join(
+        [
+            b"preamble to be ignored\r\n",
+            _part('Content-Disposition: form-data; name="attachments"', b"a plain field of the same name"),
+            _part('Content-Disposition: form-data; name="other"; filename="other.pdf"', b"another file"),
+            _part(
+                f'Content-Disposition: form-data; name="{field_name}"; filename="report.pdf"\r\n'
+                "Content-Type: application/pdf",
+                content,
+            ),
+            _part('Content-Disposition: form-data; name="attachments"; filename="second.pdf"', b"a second file"),
+            f"--{BOUNDARY}--\r\n".encode(),
+        ],
+    )
+
+
+def _split(body: bytes, sizes: Iterator[int]) -> list[bytes]:
+    chunks, start = [], 0
+    while start < len(body):
+        size = next(sizes)
+        chunks.append(body[start : start + size])
+        start += size
+
+    return chunks
+
+
+def _feed(chunks: list[bytes]) -> tuple[MultipartFileParser, bytes]:
+    parser = MultipartFileParser(boundary=BOUNDARY, field_name="attachments")
+    return parser, b"".join(parser.feed(chunk) for chunk in chunks)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, len(BOUNDARY), len(BOUNDARY) + 5, 64, 1000, 1 << 20])
+def test_multipart_file_parser_with_fixed_chunks(chunk_size: int) -> None:
+    body = _multipart_body()
+    parser, content = _feed([body[i : i + chunk_size] for i in range(0, len(body), chunk_size)])
+
+    assert content == FILE_CONTENT
+    assert parser.file_name == "report.pdf"
+    assert parser.completed
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_multipart_file_parser_with_random_chunks(seed: int) -> None:
+    generator = random.Random(seed)
+    parser, content = _feed(_split(_multipart_body(), iter(lambda: generator.randint(1, 100), None)))
+
+    assert content == FILE_CONTENT
+    assert parser.file_name == "report.pdf"
+
+
+def test_multipart_file_parser_without_the_requested_file() -> None:
+    parser = MultipartFileParser(boundary=BOUNDARY, field_name="attachments")
+    content = parser.feed(_multipart_body(field_name="unrelated"))
+
+    # the first file of the field comes after the unrelated one
+    assert content == b"a second file"
+    assert parser.file_name == "second.pdf"
+
+    parser = MultipartFileParser(boundary=BOUNDARY, field_name="missing")
+    assert parser.feed(_multipart_body()) == b""
+    assert not parser.completed
+
+
+def test_multipart_file_parser_rejects_oversized_part_headers() -> None:
+    parser = MultipartFileParser(boundary=BOUNDARY, field_name="attachments")
+
+    with pytest.raises(SourceFileNotSpecifiedError):
+        parser.feed(f"--{BOUNDARY}\r\n".encode() + b"X-Header: " + b"x" * MAX_PART_HEADERS_SIZE)
+
+
+class _Stream:
+    def __init__(self, chunks: list[bytes]) -> None:
+        self._chunks = iter(chunks)
+
+    async def read(self) -> bytes | None:
+        return next(self._chunks, None)
+
+
+def _request(body: bytes, chunk_size: int = 100) -> SimpleNamespace:
+    return SimpleNamespace(
+        headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}", "content-length": str(len(body))},
+        stream=_Stream([body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]),
+    )
+
+
+def test_spool_upload_hashes_the_raw_file() -> None:
+    upload = asyncio.run(spool_upload(_request(_multipart_body()), field_name="attachments", max_size=1 << 20))
+
+    try:
+        assert upload.file_name == "report.pdf"
+        assert upload.file_extension == "pdf"
+        assert upload.file_size == len(FILE_CONTENT)
+        assert upload.raw_hash == hashlib.sha256(FILE_CONTENT).hexdigest()
+        with open(upload.path, "rb") as file:
+            assert file.read() == FILE_CONTENT
+
+    finally:
+        upload.close()
+
+
+def test_spool_upload_limits_the_file_size() -> None:
+    request = _request(_multipart_body())
+    # chunked requests do not declare their length
+    del request.headers["content-length"]
+
+    with pytest.raises(SourceFileTooLargeError):
+        asyncio.run(spool_upload(request, field_name="attachments", max_size=len(FILE_CONTENT) - 1))
+
+
+def test_spool_upload_requires_the_file() -> None:
+    with pytest.raises(SourceFileNotSpecifiedError):
+        asyncio.run(spool_upload(_request(_multipart_body()), field_name="missing", max_size=1 << 20))
@@ -0,0 +1,340 @@
+from io import BytesIO
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+from sanic.request import File
+
+from benchmarks.synthetic import financial_statement_pdf
+from benchmarks.synthetic import PROFIT_AND_LOSS_STATEMENT
+from benchmarks.synthetic import perturb_table
+from benchmarks.synthetic import profit_and_loss_table
+from benchmarks.synthetic import ragged_table
+from plex.core.utils import align_tables
+from plex.core.utils import convert_bytes_to_markdown
+from plex.core.utils import convert_data_to_dict
+from plex.core.utils import count_pdf_pages
+from plex.core.utils import evaluate_extracted_vs_reference
+from plex.core.utils import f1_score
+from plex.core.utils import flatten_table
+from plex.core.utils import load_csv
+from plex.core.utils import match_values
+from plex.core.utils import parse_financial_numbers
+from plex.core.utils import precision_score
+from plex.core.utils import recall_score
+from plex.shared.exceptions.results import ColumnCountMismatchError
+from plex.shared.exceptions.results import CSVParsingError
+from plex.shared.exceptions.results import InsufficientDataPointsError
+from plex.shared.exceptions.source import MalformedSourceFileError
+from plex.shared.exceptions.source import PageLimitExceededError
+
+
+@pytest.mark.parametrize("pages", [1, 3])
+def test_count_pdf_pages(pages: int) -> None:
+    assert count_pdf_pages(BytesIO(financial_statement_pdf(pages=pages))) == pages
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"", b"not a pdf at all", financial_statement_pdf(pages=2)[:200], b"%PDF-1.4\ntrailer\n<< /Root 1 0 R >>\n%%EOF"],
+)
+def test_count_pdf_pages_rejects_malformed_files(body: bytes) -> None:
+    with pytest.raises(MalformedSourceFileError):
+        count_pdf_pages(BytesIO(body))
+
+
+def test_convert_bytes_to_markdown_limits_pages() -> None:
+    body = financial_statement_pdf(pages=3)
+
+    with pytest.raises(PageLimitExceededError):
+        convert_bytes_to_markdown(body, file_extension="pdf", max_pages=2)
+
+    assert "Statement of Profit or Loss" in convert_bytes_to_markdown(body, file_extension="pdf", max_pages=3)
+
+
+def _former_evaluation(extracted_data: list[list[str]], reference_data: list[list[str]]) -> dict[str, Any]:
+    # the evaluation of the flattened dictionaries,
+    # as it was before it was vectorized
+    if extracted_data and reference_data:
+        if len(extracted_data[0]) != len(reference_data[0]):
+            raise ColumnCountMismatchError
+
+    extracted_dict = convert_data_to_dict(extracted_data)
+    reference_dict = convert_data_to_dict(reference_data)
+
+    y_true = []
+    y_pred = []
+    for item in set(reference_dict).union(extracted_dict):
+        if item in reference_dict and item in extracted_dict:
+            y_true.append(1)
+            y_pred.append(int(reference_dict[item] == extracted_dict[item]))
+        elif item in reference_dict:
+            y_true.append(1)
+            y_pred.append(0)
+        else:
+            y_true.append(0)
+            y_pred.append(1)
+
+    return {
+        "precision": precision_score(y_true, y_pred),
+        "recall": recall_score(y_true, y_pred),
+        "f1-score": f1_score(y_true, y_pred),
+    }
+
+
+def _assert_same_scores(extracted_data: list[list[str]], reference_data: list[list[str]]) -> None:
+    expected = _former_evaluation(extracted_data, reference_data)
+
+    # the reference is either the nested list of the LLM output
+    # format, or the frame `load_csv` parses the reference CSV to
+    for reference in (reference_data, pd.DataFrame(reference_data[1:], columns=reference_data[0])):
+        evaluation = evaluate_extracted_vs_reference(
+            extracted_data,
+            reference,
+            source="source.pdf",
+            reference="reference.csv",
+            fuzzy_alignment=False,
+        )
+        assert {score: evaluation[score] for score in expected} == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_evaluation_matches_former_evaluation(seed: int) -> None:
+    reference = profit_and_loss_table(rows=30, columns=4, seed=seed)
+
+    _assert_same_scores(reference, reference)
+    _assert_same_scores(perturb_table(reference, change_rate=0.3, seed=seed), reference)
+    _assert_same_scores(reference[:-5] + profit_and_loss_table(rows=5, columns=4, seed=seed + 100)[1:], reference)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_evaluation_matches_former_evaluation_of_ragged_rows(seed: int) -> None:
+    reference = profit_and_loss_table(rows=20, columns=3, seed=seed)
+    extracted = ragged_table(rows=20, columns=3, seed=seed)
+
+    _assert_same_scores(extracted, reference)
+
+
+def test_evaluation_matches_former_evaluation_of_irregular_cells() -> None:
+    reference = [
+        ["Line Item", "2024", "2023"],
+        ["Revenue", "1,000", "900"],
+        ["Cost of sales", "(400)", ""],
+        ["Gross profit", "600", "  "],
+        ["Other income", "-", "12"],
+        ["Revenue", "1,100", "950"],
+    ]
+    extracted = [
+        ["Line Item", "2024", "2023"],
+        ["REVENUE", "1,100", " 950 "],
+        ["cost of sales", "(400)", "-"],
+        ["Gross profit", "", "-"],
+        ["Gross profit", "600", "-"],
+        ["Finance costs", "(20)", "(15)"],
+        ["Other income", "-"],
+    ]
+
+    _assert_same_scores(extracted, reference)
+
+
+def test_evaluation_rejects_tables_like_former_evaluation() -> None:
+    reference = profit_and_loss_table(rows=3, columns=2)
+    extracted = profit_and_loss_table(rows=3, columns=3)
+
+    with pytest.raises(ColumnCountMismatchError):
+        _former_evaluation(extracted, reference)
+
+    with pytest.raises(ColumnCountMismatchError):
+        evaluate_extracted_vs_reference(extracted, reference, source="", reference="", fuzzy_alignment=False)
+
+    with pytest.raises(InsufficientDataPointsError):
+        _former_evaluation(reference[:1], reference)
+
+    with pytest.raises(InsufficientDataPointsError):
+        evaluate_extracted_vs_reference(reference[:1], reference, source="", reference="", fuzzy_alignment=False)
+
+
+@pytest.mark.parametrize(
+    ("value", "number"),
+    [
+        ("1,234", 1234.0),
+        ("(1,234)", -1234.0),
+        ("  42  ", 42.0),
+        (".5", 0.5),
+        ("+7", 7.0),
+        ("\u22125", -5.0),
+        ("$1.2k", 1200.0),
+        ("$-3", -3.0),
+        ("-$4m", -4_000_000.0),
+        ("1.5bn", 1_500_000_000.0),
+        ("3 thousand", 3000.0),
+        ("USD 1,000", 1000.0),
+        ("Rs. 100", 100.0),
+        ("12.5%", 12.5),
+        ("(12.5%)", -12.5),
+    ],
+)
+def test_parse_financial_numbers(value: str, number: float) -> None:
+    assert parse_financial_numbers(np.array([value]))[0] == number
+
+
+@pytest.mark.parametrize("value", ["", "-", "nil", "abc", "(1,234", "1,234)"])
+def test_parse_financial_numbers_of_other_values(value: str) -> None:
+    assert np.isnan(parse_financial_numbers(np.array([value]))[0])
+
+
+def test_parse_financial_numbers_of_mixed_values() -> None:
+    numbers = parse_financial_numbers(np.array(["1,000", "n/a", "(2.5m)", "15%"]))
+
+    np.testing.assert_array_equal(numbers, [1000.0, np.nan, -2_500_000.0, 15.0])
+    assert parse_financial_numbers(np.array([], dtype=str)).dtype == np.float64
+
+
+def test_match_values() -> None:
+    extracted = pd.DataFrame({"value": ["1,000", "1,001", "1,100", "(5)", "1.2m", "-", "abc", "inf"]})
+    reference = pd.DataFrame({"value": ["1,000", "1,000", "1,000", "-5", "1,200,000", "-", "abd", "1e400"]})
+
+    exact, tolerant = match_values(extracted, reference, absolute_tolerance=1.0, relative_tolerance=0.0)
+    np.testing.assert_array_equal(exact, [True, False, False, False, False, True, False, False])
+    np.testing.assert_array_equal(tolerant, [True, True, False, True, True, True, False, False])
+
+    # the relative tolerance is taken from the reference value
+    _, tolerant = match_values(extracted, reference, absolute_tolerance=0.0, relative_tolerance=0.1)
+    np.testing.assert_array_equal(tolerant, [True, True, True, True, True, True, False, False])
+
+    _, tolerant = match_values(extracted, reference, absolute_tolerance=0.0, relative_tolerance=0.0)
+    np.testing.assert_array_equal(tolerant, exact | [False, False, False, True, True, False, False, False])
+
+
+def _csv_file(body: bytes) -> File:
+    return File(type="text/csv", body=body, name="reference.csv")
+
+
+@pytest.mark.parametrize("delimiter", [",", ";", "\t", "|"])
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "cp1252", "latin-1"])
+def test_load_csv(encoding: str, delimiter: str) -> None:
+    text = "Line Item;2024;2023\nRevenue;1000.50;\nCo\u00fbt des ventes;(400);0300\n".replace(";", delimiter)
+
+    frame = load_csv(_csv_file(text.encode(encoding)))
+
+    # values are kept as they are written
+    assert frame.columns.tolist() == ["Line Item", "2024", "2023"]
+    assert frame.to_numpy().tolist() == [["Revenue", "1000.50", ""], ["Co\u00fbt des ventes", "(400)", "0300"]]
+
+
+def test_load_csv_of_windows_code_page() -> None:
+    frame = load_csv(_csv_file("Line Item;2024\nRevenue \u20ac;\u20ac1,000\n".encode("cp1252")))
+
+    assert frame.to_numpy().tolist() == [["Revenue \u20ac", "\u20ac1,000"]]
+
+
+def test_load_csv_of_quoted_values() -> None:
+    frame = load_csv(_csv_file(b'Line Item,2024,2023\nRevenue,"1,000","(2,000)"\n'))
+
+    assert frame.to_numpy().tolist() == [["Revenue", "1,000", "(2,000)"]]
+
+
+def test_load_csv_of_long_files() -> None:
+    rows = profit_and_loss_table(rows=2000, columns=3)
+    body = "\n".join(";".join(row) for row in rows).encode()
+
+    frame = load_csv(_csv_file(body))
+
+    assert frame.columns.tolist() == rows[0]
+    assert frame.to_numpy().tolist() == rows[1:]
+
+
+@pytest.mark.parametrize("body", [b"", b'Line Item,2024\nRevenue,"1,000\n'])
+def test_load_csv_rejects_malformed_files(body: bytes) -> None:
+    with pytest.raises(CSVParsingError):
+        load_csv(_csv_file(body))
+
+
+def test_align_tables() -> None:
+    reference = [["Line Item", "2024", "2023"], ["Revenue", "100", "90"], ["Administrative expenses", "(10)", "(9)"]]
+    extracted = [
+        ["Line Item", "2023", "2024", "Notes"],
+        ["Admin expenses", "(9)", "(10)", "4"],
+        ["Dividends", "1", "2", ""],
+    ]
+
+    aligned_cells, report = align_tables(
+        flatten_table(extracted),
+        flatten_table(reference),
+        extracted_header=extracted[0],
+        reference_header=reference[0],
+        threshold=0.6,
+    )
+
+    # the unaligned notes column is moved past
+    # the columns of both tables
+    assert aligned_cells.to_numpy().tolist() == [
+        ["administrative expenses", 2, "(9)"],
+        ["administrative expenses", 1, "(10)"],
+        ["administrative expenses", 4, "4"],
+        ["dividends", 2, "1"],
+        ["dividends", 1, "2"],
+        ["dividends", 4, "-"],
+    ]
+    assert report["line_items"] == 1
+    assert [item["extracted"] for item in report["fuzzy_line_items"]] == ["admin expenses"]
+    assert report["columns"] == [
+        {"extracted": "2023", "reference": "2023"},
+        {"extracted": "2024", "reference": "2024"},
+    ]
+
+
+def test_evaluation_with_fuzzy_alignment() -> None:
+    header, *rows = PROFIT_AND_LOSS_STATEMENT
+    extracted = [
+        [header[0], header[2], header[1], header[3]],
+        *(
+            [line_item.replace("Profit Before Tax", "Profit before taxation").upper(), previous, current, change]
+            for line_item, current, previous, change in reversed(rows)
+        ),
+    ]
+
+    evaluation = evaluate_extracted_vs_reference(
+        extracted,
+        PROFIT_AND_LOSS_STATEMENT,
+        source="source.pdf",
+        reference="reference.csv",
+        fuzzy_alignment=True,
+    )
+
+    assert evaluation["f1-score"] == 1.0
+    assert evaluation["alignment"]["line_items"] == len(rows)
+    assert [item["reference"] for item in evaluation["alignment"]["fuzzy_line_items"]] == ["profit before tax"]
+
+    # without alignment, only the change column and
+    # the reworded line item are compared as they are
+    evaluation = evaluate_extracted_vs_reference(
+        extracted,
+        PROFIT_AND_LOSS_STATEMENT,
+        source="source.pdf",
+        reference="reference.csv",
+        fuzzy_alignment=False,
+    )
+
+    assert evaluation["true_positives"] == len(rows) - 1
+    assert "alignment" not in evaluation
+
+
+def test_evaluation_with_fuzzy_alignment_of_different_columns() -> None:
+    header, *rows = PROFIT_AND_LOSS_STATEMENT
+    extracted = [[header[0], header[1], "Notes", header[2]], *([row[0], row[1], "1", row[2]] for row in rows)]
+
+    evaluation = evaluate_extracted_vs_reference(
+        extracted,
+        pd.DataFrame(rows, columns=header),
+        source="source.pdf",
+        reference="reference.csv",
+        fuzzy_alignment=True,
+    )
+
+    # the notes are extra values, and the
+    # change column is missing from the extraction
+    assert evaluation["true_positives"] == 2 * len(rows)
+    assert evaluation["false_positives"] == len(rows)
+    assert evaluation["false_negatives"] == len(rows)